@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+import types
+
+import pytest
+
+from capyface_commons.grpc_service import admission
+from capyface_commons.grpc_service.admission import PriorityAdmission, AdmissionRejected
+
+TARGET = "10.0.0.1:50051"
+
+def _wait_queued(controller, count, timeout=5):
+    """Chờ tới khi có count call trong hàng đợi của TARGET"""
+    deadline = time.monotonic() + timeout
+    while controller.snapshot()[TARGET]["queued"] != count:
+        assert time.monotonic() < deadline, controller.snapshot()
+        time.sleep(0.001)
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+def bench_handoff_by_priority():
+    """Slot được giao cho call priority cao nhất, cùng priority thì FIFO"""
+    controller = PriorityAdmission(max_concurrency=1)
+    controller.acquire(TARGET)
+    order = []
+    
+    def call(name, priority):
+        controller.acquire(TARGET, priority=priority)
+        order.append(name)
+        controller.release(TARGET)
+    
+    threads = []
+    for name, priority in [("low", "low"), ("normal-1", "normal"), ("high", "high"), ("normal-2", "normal")]:
+        threads.append(_start(call, name, priority))
+        _wait_queued(controller, len(threads))
+    
+    controller.release(TARGET)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["high", "normal-1", "normal-2", "low"]
+    assert controller.snapshot()[TARGET]["in_flight"] == 0
+
+def bench_eviction_when_queue_full():
+    controller = PriorityAdmission(max_concurrency=1, max_queue=1)
+    controller.acquire(TARGET)
+    results = {}
+    
+    def call(name, priority):
+        try:
+            controller.acquire(TARGET, priority=priority)
+        except AdmissionRejected as e:
+            results[name] = e.reason
+            return
+        results[name] = "admitted"
+        controller.release(TARGET)
+    
+    low = _start(call, "low", "low")
+    _wait_queued(controller, 1)
+    high = _start(call, "high", "high")
+    low.join(5)
+    assert results == {"low": "evicted by higher priority call"}
+    
+    # Hàng đợi đầy và call mới không có priority cao hơn: bị từ chối ngay
+    with pytest.raises(AdmissionRejected, match="queue full"):
+        controller.acquire(TARGET, priority="high")
+    
+    controller.release(TARGET)
+    high.join(5)
+    assert results["high"] == "admitted"
+    snapshot = controller.snapshot()[TARGET]
+    assert (snapshot["in_flight"], snapshot["dropped"], snapshot["rejected"]) == (0, 1, 1)
+
+def bench_ewma_rejects_unmeetable_deadline():
+    controller = PriorityAdmission(max_concurrency=1)
+    controller.acquire(TARGET)
+    controller.release(TARGET, latency=0.2)
+    controller.acquire(TARGET)
+    
+    # Thời gian còn lại nhỏ hơn latency EWMA: bị loại ngay, không vào hàng đợi
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected, match="deadline cannot be met"):
+        controller.acquire(TARGET, deadline=time.monotonic() + 0.1)
+    assert time.monotonic() - started < 0.05
+    
+    # Chờ trong hàng đợi tới khi thời gian còn lại không đủ cho một call
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected, match="deadline cannot be met"):
+        controller.acquire(TARGET, deadline=time.monotonic() + 0.35)
+    assert 0.1 < time.monotonic() - started < 0.3
+    
+    snapshot = controller.snapshot()[TARGET]
+    assert (snapshot["queued"], snapshot["dropped"], snapshot["in_flight"]) == (0, 2, 1)
+    controller.release(TARGET)
+    assert controller.snapshot()[TARGET]["in_flight"] == 0
+
+def bench_slot_handed_off_as_wait_times_out(monkeypatch):
+    """release giao slot đúng lúc wait hết timeout: call vẫn được nhận, slot không bị mất"""
+    controller = None
+    
+    class RacyEvent(threading.Event):
+        def wait(self, timeout=None):
+            controller.release(TARGET)
+            return False
+    
+    monkeypatch.setattr(admission, "threading", types.SimpleNamespace(Event=RacyEvent, Lock=threading.Lock))
+    controller = PriorityAdmission(max_concurrency=1)
+    controller.acquire(TARGET)
+    controller.acquire(TARGET, deadline=time.monotonic() + 1)
+    
+    snapshot = controller.snapshot()[TARGET]
+    assert (snapshot["in_flight"], snapshot["queued"], snapshot["admitted"], snapshot["dropped"]) == (1, 0, 2, 0)
+    controller.release(TARGET)
+    assert controller.snapshot()[TARGET]["in_flight"] == 0
+
+def bench_in_flight_never_exceeds_limit():
+    controller = PriorityAdmission(max_concurrency=4, max_queue=1000)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+    peak_in_flight = [0]
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(50):
+            controller.acquire(TARGET, priority=rng.choice(["high", "normal", "low"]))
+            in_flight = controller.snapshot()[TARGET]["in_flight"]
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                peak_in_flight[0] = max(peak_in_flight[0], in_flight)
+            time.sleep(rng.random() * 0.001)
+            with lock:
+                active[0] -= 1
+            controller.release(TARGET, latency=0.001)
+    
+    threads = [_start(worker, seed) for seed in range(16)]
+    for thread in threads:
+        thread.join(30)
+    
+    snapshot = controller.snapshot()[TARGET]
+    assert 1 < peak[0] <= 4
+    assert peak_in_flight[0] <= 4
+    assert (snapshot["in_flight"], snapshot["queued"], snapshot["admitted"]) == (0, 0, 800)
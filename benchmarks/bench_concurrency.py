@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from utils import record_percentiles
+
+THREAD_COUNTS = [1, 2, 4, 8, 16, 32]
+CALLS_PER_THREAD = 50
+
+def _run_threads(gateway, threads, latencies, method_name="AreFriends"):
+    def worker():
+        for _ in range(CALLS_PER_THREAD):
+            started = time.perf_counter()
+            gateway.call("friendship_service", method_name, user1_id="1", user2_id="2")
+            latencies.append(time.perf_counter() - started)
+    
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+def _report_throughput(benchmark, threads):
+    # --benchmark-disable: hàm chỉ chạy một lần, không có stats
+    if benchmark.stats is None:
+        return
+    total_calls = threads * CALLS_PER_THREAD
+    benchmark.extra_info["threads"] = threads
+    benchmark.extra_info["calls_per_second"] = round(total_calls / benchmark.stats.stats.mean, 1)
+
+@pytest.mark.parametrize("threads", THREAD_COUNTS)
+def bench_concurrent_calls(benchmark, gateway, threads):
+    """Throughput của ServiceGateway.call khi nhiều thread gọi đồng thời"""
+    gateway.call("friendship_service", "AreFriends", user1_id="1", user2_id="2")
+    latencies = []
+    
+    benchmark.pedantic(_run_threads, args=(gateway, threads, latencies), rounds=5)
+    
+    _report_throughput(benchmark, threads)
+    record_percentiles(benchmark, latencies)
+
+@pytest.mark.parametrize("threads", [8, 32])
+def bench_concurrent_calls_batched(benchmark, gateway, threads):
+    """Như bench_concurrent_calls nhưng bật micro-batching cho AreFriends"""
+    gateway.enable_batching("friendship_service", "AreFriends", window=0.001)
+    latencies = []
+    
+    benchmark.pedantic(_run_threads, args=(gateway, threads, latencies), rounds=5)
+    
+    _report_throughput(benchmark, threads)
+    record_percentiles(benchmark, latencies)
+
+@pytest.mark.parametrize("threads", [16, 64])
+def bench_cold_start_concurrent(benchmark, gateway, threads):
+    """Nhiều thread cùng gọi khi cache của gateway còn trống"""
+    from utils import reset_gateway
+    
+    def run():
+        barrier = threading.Barrier(threads)
+        
+        def worker():
+            barrier.wait()
+            gateway.call("friendship_service", "AreFriends", user1_id="1", user2_id="2")
+        
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    
+    benchmark.pedantic(run, setup=reset_gateway, rounds=5)
+    benchmark.extra_info["channels"] = len(gateway.channels)
+    assert len(gateway.channels) == 1, "concurrent cold start created duplicate channels"
+
+@pytest.mark.parametrize("threads", [64])
+def bench_stub_cache_stress(benchmark, gateway, threads):
+    """
+    Stress cache channel/stub: tất cả thread bắt đầu cùng lúc khi cache trống (cold path)
+    rồi tiếp tục gọi liên tục (warm path); không được có lỗi hay channel trùng
+    """
+    from utils import reset_gateway
+    errors = []
+    
+    def run():
+        barrier = threading.Barrier(threads)
+        
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(CALLS_PER_THREAD):
+                    gateway.call("friendship_service", "AreFriends", user1_id="1", user2_id="2")
+            except Exception as e:
+                errors.append(e)
+        
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    
+    benchmark.pedantic(run, setup=reset_gateway, rounds=5)
+    benchmark.extra_info["channels"] = len(gateway.channels)
+    assert not errors, errors[:3]
+    assert len(gateway.channels) == 1, "concurrent cold start created duplicate channels"
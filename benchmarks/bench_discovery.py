@@ -0,0 +1,23 @@
+from capyface_commons.generated import user_service_pb2_grpc
+from capyface_commons.grpc_service import GrpcServer
+from capyface_commons.grpc_service.proto_discovery import ProtoDiscovery
+
+from utils import UserServicer
+
+def bench_proto_discovery(benchmark, registry):
+    """Thời gian ProtoDiscovery quét package generated và đăng ký toàn bộ services"""
+    benchmark(ProtoDiscovery(registry).discover_and_register)
+
+def bench_server_boot(benchmark, registry):
+    """Thời gian GrpcServer khởi động (bind, health, đăng ký registry) và shutdown"""
+    def boot():
+        server = GrpcServer(
+            host="127.0.0.1", port=0, advertise_host="127.0.0.1",
+            enable_reflection=False, registry=registry, grace_period=0
+        )
+        server.add_servicer(user_service_pb2_grpc.add_UserServiceServicer_to_server,
+                            UserServicer(), "bench_user_service")
+        server.start()
+        server.stop()
+    
+    benchmark.pedantic(boot, rounds=10)
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from capyface_commons.grpc_service import iter_friend_ids
+
+from utils import record_percentiles, reset_gateway
+
+UNARY_CALLS = [
+    ("user_service", "ValidateToken", {"token": "token"}),
+    ("friendship_service", "AreFriends", {"user1_id": "1", "user2_id": "2"}),
+    ("media_service", "GetDownloadUrl", {"media_id": "media-1"}),
+    ("friendship_service", "GetFriends", {"user_id": "1"}),
+]
+
+@pytest.mark.parametrize(
+    "service_name,method_name,kwargs", UNARY_CALLS,
+    ids=[f"{service}.{method}" for service, method, _ in UNARY_CALLS]
+)
+def bench_call(benchmark, gateway, service_name, method_name, kwargs):
+    """Latency và throughput của ServiceGateway.call trên warm path"""
+    gateway.call(service_name, method_name, **kwargs)
+    latencies = []
+    
+    def call():
+        started = time.perf_counter()
+        gateway.call(service_name, method_name, **kwargs)
+        latencies.append(time.perf_counter() - started)
+    
+    benchmark(call)
+    record_percentiles(benchmark, latencies)
+
+@pytest.mark.parametrize("mode", ["kwargs", "request", "raw"])
+def bench_call_proxy(benchmark, gateway, mode):
+    """So sánh tạo request từ kwargs, truyền message tạo sẵn và call_raw với bytes đã serialize"""
+    from capyface_commons.generated import friendship_service_pb2
+    
+    request = friendship_service_pb2.AreFriendsRequest(user1_id="1", user2_id="2")
+    payload = request.SerializeToString()
+    calls = {
+        "kwargs": lambda: gateway.call("friendship_service", "AreFriends", user1_id="1", user2_id="2"),
+        "request": lambda: gateway.call("friendship_service", "AreFriends", request=request),
+        "raw": lambda: gateway.call_raw("friendship_service", "AreFriends", payload),
+    }
+    calls[mode]()
+    benchmark(calls[mode])
+
+def bench_call_cold(benchmark, gateway):
+    """Call đầu tiên sau khi xóa cache: lấy instance, tạo channel, import stub, kết nối"""
+    benchmark.pedantic(
+        lambda: gateway.call("user_service", "ValidateToken", token="token"),
+        setup=reset_gateway,
+        rounds=30
+    )
+
+@pytest.mark.parametrize("stream", [True, False], ids=["StreamFriends", "GetFriendsPage"])
+def bench_iter_friend_ids(benchmark, gateway, stream):
+    """Duyệt 1000 friend ids theo trang 100 qua streaming hoặc phân trang"""
+    benchmark(lambda: sum(1 for _ in iter_friend_ids("1", page_size=100, stream=stream)))
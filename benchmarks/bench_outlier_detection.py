@@ -0,0 +1,95 @@
+import grpc
+import pytest
+
+from capyface_commons.grpc_service import outlier_detection
+from capyface_commons.grpc_service.outlier_detection import OutlierDetector
+from capyface_commons.grpc_service.records import InstanceRecord
+
+SERVICE = "user_service"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(outlier_detection, "time", clock)
+    return clock
+
+def _instances(count):
+    return [InstanceRecord(f"i{i}", "10.0.0.1", 5000 + i) for i in range(count)]
+
+def _fail(detector, target, times, code=grpc.StatusCode.UNAVAILABLE):
+    for _ in range(times):
+        detector.record_failure(SERVICE, target, code)
+
+def bench_consecutive_errors_eject(clock):
+    detector = OutlierDetector(consecutive_errors=3, latency_factor=None, base_ejection_time=30)
+    instances = _instances(4)
+    detector.filter(SERVICE, instances)
+    target = instances[0].target
+    
+    # Lỗi của request (không thuộc error_codes) không được tính, thành công reset bộ đếm
+    _fail(detector, target, 5, code=grpc.StatusCode.NOT_FOUND)
+    _fail(detector, target, 2)
+    detector.record_success(SERVICE, target, 0.01)
+    _fail(detector, target, 2)
+    assert not detector.is_ejected(SERVICE, target)
+    
+    _fail(detector, target, 1)
+    assert detector.is_ejected(SERVICE, target)
+    assert [i.target for i in detector.filter(SERVICE, instances)] == [i.target for i in instances[1:]]
+    
+    clock.now += 31
+    assert not detector.is_ejected(SERVICE, target)
+    assert len(detector.filter(SERVICE, instances)) == 4
+
+def bench_max_ejection_percent(clock):
+    detector = OutlierDetector(consecutive_errors=1, latency_factor=None, max_ejection_percent=50)
+    instances = _instances(4)
+    detector.filter(SERVICE, instances)
+    
+    for instance in instances:
+        _fail(detector, instance.target, 1)
+    ejected = [i.target for i in instances if detector.is_ejected(SERVICE, i.target)]
+    assert len(ejected) == 2
+    assert len(detector.filter(SERVICE, instances)) == 2
+    
+    # Danh sách instance co lại sau khi eject: filter không bao giờ trả về rỗng
+    only_ejected = [i for i in instances if i.target in ejected]
+    assert detector.filter(SERVICE, only_ejected) == only_ejected
+
+def bench_ejection_backoff_and_decay(clock):
+    detector = OutlierDetector(
+        consecutive_errors=1, latency_factor=None, base_ejection_time=30, max_ejection_time=100,
+        max_ejection_percent=100
+    )
+    target = _instances(1)[0].target
+    
+    def eject():
+        _fail(detector, target, 1)
+        return round(detector.snapshot()[SERVICE][target]["ejected_for"])
+    
+    # Thời gian eject tăng gấp đôi mỗi lần, tối đa max_ejection_time
+    durations = []
+    for _ in range(4):
+        durations.append(eject())
+        clock.now += durations[-1] + 1
+    assert durations == [30, 60, 100, 100]
+    assert detector.snapshot()[SERVICE][target]["ejection_count"] == 4
+    
+    # Mỗi base_ejection_time hoạt động bình thường sau khi được nhận lại giảm số lần eject đi 1
+    clock.now += 30
+    detector.record_success(SERVICE, target, 0.01)
+    assert detector.snapshot()[SERVICE][target]["ejection_count"] == 3
+    detector.record_success(SERVICE, target, 0.01)
+    assert detector.snapshot()[SERVICE][target]["ejection_count"] == 3
+    for _ in range(2):
+        clock.now += 31
+        detector.record_success(SERVICE, target, 0.01)
+    assert detector.snapshot()[SERVICE][target]["ejection_count"] == 1
+    assert eject() == 60
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import grpc
+import pytest
+import redis
+
+from capyface_commons.grpc_service import RateLimiter, RateLimitExceeded
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+class BrokenRedis:
+    """Client Redis giả: mọi lần chạy script đều lỗi kết nối"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def register_script(self, script):
+        def run(keys, args):
+            self.calls += 1
+            raise redis.ConnectionError("connection refused")
+        return run
+
+def bench_local_bucket_fail_fast():
+    limiter = RateLimiter("local", rate=10, burst=2, block=False)
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        limiter.acquire()
+    
+    assert exc_info.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    assert 0 < exc_info.value.retry_after <= 0.1
+    snapshot = limiter.snapshot()
+    assert (snapshot["allowed"], snapshot["rejected"], snapshot["distributed"]) == (2, 1, False)
+
+def bench_block_waits_for_quota():
+    limiter = RateLimiter("block", rate=20, burst=1, block=True, max_wait=1)
+    limiter.acquire()
+    waited = limiter.acquire()
+    assert 0.02 < waited < 0.5
+    
+    # max_wait nhỏ hơn thời gian cần chờ: raise ngay, không sleep
+    started = time.monotonic()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(max_wait=0.001)
+    assert time.monotonic() - started < 0.02
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(block=False)
+
+def bench_shared_quota_across_pods(fake_redis):
+    """Hai limiter (hai pod) cùng key dùng chung quota GCRA trong Redis"""
+    pod_a = RateLimiter("shared", rate=1, burst=2, redis_client=fake_redis, block=False)
+    pod_b = RateLimiter("shared", rate=1, burst=2, redis_client=fake_redis, block=False)
+    pod_a.acquire()
+    pod_a.acquire()
+    
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        pod_b.acquire()
+    assert 0.5 < exc_info.value.retry_after <= 1
+    # Quota chung hết: token local của pod B được trả lại
+    assert pod_b._bucket._tokens == pytest.approx(2, abs=0.1)
+    assert pod_b.snapshot()["distributed"]
+    
+    # Key khác có quota riêng
+    RateLimiter("other", rate=1, burst=2, redis_client=fake_redis, block=False).acquire()
+
+def bench_redis_failure_falls_back_to_local():
+    client = BrokenRedis()
+    limiter = RateLimiter("fallback", rate=1, burst=2, redis_client=client, block=False, unavailable_backoff=5)
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+    
+    # Redis chỉ được thử một lần trong unavailable_backoff, sau đó giới hạn bằng token bucket local
+    assert client.calls == 1
+    assert limiter.snapshot()["allowed"] == 2
+
+def bench_counters_are_thread_safe():
+    limiter = RateLimiter("threads", rate=1_000_000, burst=1_000_000, block=False)
+    
+    def worker():
+        for _ in range(2000):
+            limiter.acquire()
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.snapshot()["allowed"] == 16000
@@ -0,0 +1,41 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def bench_get_service_config(benchmark, registry, servers):
+    benchmark(registry.get_service_config, "user_service")
+
+def bench_get_instances(benchmark, registry, servers):
+    benchmark(registry.get_instances, "user_service")
+
+def bench_get_all_services(benchmark, registry, servers):
+    benchmark(registry.get_all_services)
+
+def bench_register_instance(benchmark, registry):
+    benchmark(registry.register_instance, "bench_service", "127.0.0.1", 1, instance_id="bench")
+
+def bench_import_with_unreachable_cluster(tmp_path):
+    """REDIS_CLUSTER=1 với Redis không truy cập được: import không lỗi, cấu hình được phục vụ từ snapshot"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        dead_port = sock.getsockname()[1]
+    snapshot = tmp_path / "registry.json"
+    snapshot.write_text(json.dumps({
+        "services": {"user_service": {"host": "10.0.0.9", "port": 50051, "use_tls": False, "methods": {}}},
+        "instances": {},
+    }))
+    env = dict(
+        os.environ, REDIS_CLUSTER="1", REDIS_HOST="127.0.0.1", REDIS_PORT=str(dead_port),
+        REGISTRY_SNAPSHOT_PATH=str(snapshot), PYTHONPATH=ROOT,
+    )
+    script = (
+        "from capyface_commons.grpc_service import service_registry\n"
+        "print(service_registry.get_service_config('user_service').host)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "10.0.0.9"
@@ -0,0 +1,40 @@
+import threading
+import time
+
+import grpc
+import pytest
+
+from capyface_commons.grpc_service import TokenValidationCache, TokenValidationTimeout
+
+class SlowGateway:
+    """Gateway giả: ValidateToken chậm hơn timeout của request"""
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.started = threading.Event()
+    
+    def _get_default_timeout(self, service_name, method_name):
+        return 0.2
+    
+    def call(self, service_name, method_name, timeout=None, **kwargs):
+        self.started.set()
+        time.sleep(self.delay)
+        raise RuntimeError("leader failed")
+
+def bench_follower_waits_at_most_timeout():
+    """Request chờ RPC của request khác cho cùng token bị DEADLINE_EXCEEDED sau timeout của nó"""
+    gateway = SlowGateway(delay=1)
+    cache = TokenValidationCache(gateway=gateway)
+    leader = threading.Thread(target=lambda: pytest.raises(RuntimeError, cache.validate, "token"))
+    leader.start()
+    assert gateway.started.wait(5)
+    
+    started = time.monotonic()
+    with pytest.raises(TokenValidationTimeout) as exc_info:
+        cache.validate("token")
+    elapsed = time.monotonic() - started
+    leader.join()
+    
+    assert isinstance(exc_info.value, grpc.RpcError)
+    assert exc_info.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+    assert 0.15 < elapsed < 0.8
@@ -0,0 +1,84 @@
+import os
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+import redis
+
+from capyface_commons.generated import friendship_service_pb2_grpc, media_service_pb2_grpc, user_service_pb2_grpc
+from capyface_commons.grpc_service import service_registry, service_gateway, GrpcServer
+
+from utils import UserServicer, FriendshipServicer, MediaServicer, reset_gateway
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="session")
+def redis_client():
+    """
+    Redis cho benchmark, theo thứ tự ưu tiên:
+    CAPYFACE_BENCH_REDIS_URL -> redis-server local trên PATH -> fakeredis
+    """
+    url = os.environ.get("CAPYFACE_BENCH_REDIS_URL")
+    if url:
+        yield redis.Redis.from_url(url, decode_responses=True)
+        return
+    
+    if shutil.which("redis-server"):
+        port = _free_port()
+        process = subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL
+        )
+        client = redis.Redis(port=port, decode_responses=True)
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                time.sleep(0.1)
+        yield client
+        process.terminate()
+        process.wait()
+        return
+    
+    fakeredis = pytest.importorskip("fakeredis")
+    yield fakeredis.FakeRedis(decode_responses=True)
+
+@pytest.fixture(scope="session")
+def registry(redis_client):
+    original = service_registry.redis
+    service_registry.redis = redis_client
+    yield service_registry
+    service_registry.redis = original
+
+@pytest.fixture(scope="session")
+def servers(registry):
+    """Khởi động in-process gRPC server cho UserService, FriendshipService, MediaService"""
+    started = []
+    for add_to_server, servicer, service_name in [
+        (user_service_pb2_grpc.add_UserServiceServicer_to_server, UserServicer(), "user_service"),
+        (friendship_service_pb2_grpc.add_FriendshipServiceServicer_to_server, FriendshipServicer(), "friendship_service"),
+        (media_service_pb2_grpc.add_MediaServiceServicer_to_server, MediaServicer(), "media_service"),
+    ]:
+        server = GrpcServer(
+            host="127.0.0.1", port=0, advertise_host="127.0.0.1",
+            enable_reflection=False, registry=registry, grace_period=1
+        )
+        server.add_servicer(add_to_server, servicer, service_name)
+        started.append(server.start())
+    
+    yield started
+    
+    for server in started:
+        server.stop()
+
+@pytest.fixture
+def gateway(servers):
+    reset_gateway()
+    yield service_gateway
+    reset_gateway()
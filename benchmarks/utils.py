@@ -0,0 +1,75 @@
+from capyface_commons.generated import friendship_service_pb2, friendship_service_pb2_grpc
+from capyface_commons.generated import media_service_pb2, media_service_pb2_grpc
+from capyface_commons.generated import user_service_pb2, user_service_pb2_grpc
+from capyface_commons.grpc_service import service_gateway
+
+FRIEND_IDS = [f"user-{i}" for i in range(1000)]
+
+class UserServicer(user_service_pb2_grpc.UserServiceServicer):
+    def ValidateToken(self, request, context):
+        return user_service_pb2.ValidateTokenResponse(
+            is_valid=True,
+            user=user_service_pb2.User(id="1", username="capy", email="capy@example.com")
+        )
+    
+    def GetUsersByIds(self, request, context):
+        return user_service_pb2.GetUsersByIdsResponse(users={
+            user_id: user_service_pb2.User(id=user_id, username=f"capy-{user_id}")
+            for user_id in request.user_ids
+        })
+
+class FriendshipServicer(friendship_service_pb2_grpc.FriendshipServiceServicer):
+    def GetFriends(self, request, context):
+        return friendship_service_pb2.GetFriendsResponse(friend_ids=FRIEND_IDS)
+    
+    def GetFriendsPage(self, request, context):
+        page_size = request.page_size or 100
+        start = int(request.cursor or 0)
+        end = min(start + page_size, len(FRIEND_IDS))
+        return friendship_service_pb2.FriendsPage(
+            friend_ids=FRIEND_IDS[start:end],
+            next_cursor=str(end) if end < len(FRIEND_IDS) else ""
+        )
+    
+    def StreamFriends(self, request, context):
+        page_size = request.page_size or 100
+        for start in range(0, len(FRIEND_IDS), page_size):
+            yield friendship_service_pb2.FriendsPage(friend_ids=FRIEND_IDS[start:start + page_size])
+    
+    def AreFriends(self, request, context):
+        return friendship_service_pb2.AreFriendsResponse(are_friends=True)
+    
+    def BatchAreFriends(self, request, context):
+        return friendship_service_pb2.BatchAreFriendsResponse(are_friends=[True] * len(request.pairs))
+
+class MediaServicer(media_service_pb2_grpc.MediaServiceServicer):
+    def GetDownloadUrl(self, request, context):
+        return media_service_pb2.GetDownloadUrlResponse(
+            download_url=f"https://cdn.example.com/{request.media_id}", expires_in=3600
+        )
+    
+    def BatchGetDownloadUrls(self, request, context):
+        return media_service_pb2.BatchGetDownloadUrlsResponse(urls={
+            media_id: media_service_pb2.GetDownloadUrlResponse(
+                download_url=f"https://cdn.example.com/{media_id}", expires_in=3600
+            )
+            for media_id in request.media_ids
+        })
+
+def reset_gateway():
+    """Xóa toàn bộ cache của gateway để đo lại cold path"""
+    for channel in service_gateway.channels.values():
+        channel.close()
+    service_gateway.channels.clear()
+    service_gateway.stubs.clear()
+    service_gateway._instances.clear()
+    service_gateway.batchers.clear()
+
+def record_percentiles(benchmark, latencies):
+    """Ghi latency percentiles (ms) vào extra_info của benchmark"""
+    if not latencies:
+        return
+    latencies = sorted(latencies)
+    for percentile in (50, 90, 99, 99.9):
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        benchmark.extra_info[f"p{percentile}_ms"] = round(latencies[index] * 1000, 3)
@@ -0,0 +1,5 @@
+from capyface_commons.grpc_service.histogram import LatencyHistogram
+from .loadgen import LoadGenerator, LoadResult, RpcCall, load_mix
+from .replay import TrafficReplayer
+
+__all__ = ['LatencyHistogram', 'LoadGenerator', 'LoadResult', 'RpcCall', 'load_mix', 'TrafficReplayer']
\ No newline at end of file
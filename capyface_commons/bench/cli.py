@@ -0,0 +1,136 @@
+import argparse
+import json
+import logging
+import sys
+
+from .loadgen import (
+    LoadGenerator, RpcCall, load_mix, CLOSED_LOOP, OPEN_LOOP, THREAD_WORKERS, ASYNC_WORKERS
+)
+from .replay import TrafficReplayer
+
+def _add_run_parser(subparsers):
+    parser = subparsers.add_parser(
+        'run',
+        help='Chạy RPC mix qua ServiceGateway tới các service đã đăng ký trong registry'
+    )
+    parser.add_argument(
+        '--call', action='append', default=[], metavar='SPEC',
+        help='Call dạng [weight*]service.Method[=json_kwargs], có thể lặp lại. '
+             'Ví dụ: 3*user_service.ValidateToken=\'{"token": "abc"}\''
+    )
+    parser.add_argument('--mix', help='File JSON/YAML mô tả RPC mix')
+    parser.add_argument('--mode', choices=[CLOSED_LOOP, OPEN_LOOP], default=CLOSED_LOOP)
+    parser.add_argument('--rate', type=float, help='Số call mỗi giây (open loop)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Số worker/thread')
+    parser.add_argument('--workers', choices=[THREAD_WORKERS, ASYNC_WORKERS], default=THREAD_WORKERS)
+    parser.add_argument('--duration', type=float, default=10, help='Thời gian chạy (giây)')
+    parser.add_argument('--warmup', type=float, default=0, help='Thời gian warmup (giây)')
+    parser.add_argument('--timeout', type=float, help='Timeout mỗi call (giây)')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--hdr-output', help='Ghi percentile distribution (HdrHistogram format) ra file')
+    parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON')
+    parser.set_defaults(handler=_run)
+
+def _run(args):
+    mix = [RpcCall.parse(spec) for spec in args.call]
+    if args.mix:
+        mix.extend(load_mix(args.mix))
+    if not mix:
+        raise SystemExit("Cần ít nhất một --call hoặc --mix")
+    
+    generator = LoadGenerator(
+        mix,
+        mode=args.mode,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        duration=args.duration,
+        warmup=args.warmup,
+        workers=args.workers,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    result = generator.run()
+    _print_result(result, args)
+    return 0
+
+def _print_result(result, args, recorded=None):
+    if args.json:
+        output = result.to_dict()
+        if recorded is not None:
+            output = {"replay": output, "recorded": recorded.to_dict()}
+        print(json.dumps(output, indent=2))
+    else:
+        if recorded is not None:
+            print(f"Recorded:\n{recorded.summary()}\n\nReplay:")
+        print(result.summary())
+    
+    if args.hdr_output:
+        with open(args.hdr_output, 'w') as f:
+            for name, histogram in sorted(result.histograms.items()):
+                f.write(f"# {name}\n{histogram.format_distribution()}\n\n")
+            f.write(f"# TOTAL\n{result.total.format_distribution()}\n")
+
+def _add_replay_parser(subparsers):
+    parser = subparsers.add_parser(
+        'replay',
+        help='Phát lại traffic đã ghi bằng ServiceGateway.start_recording'
+    )
+    parser.add_argument('log', help='File log của TrafficRecorder')
+    parser.add_argument(
+        '--speed', type=float, default=1.0,
+        help='Hệ số tốc độ so với lúc ghi (1/sample_rate để tái tạo toàn bộ traffic), 0 để nhanh nhất có thể'
+    )
+    parser.add_argument('--concurrency', type=int, default=32, help='Số call đồng thời tối đa')
+    parser.add_argument('--timeout', type=float, help='Timeout mỗi call (giây)')
+    parser.add_argument('--limit', type=int, help='Số call tối đa được phát lại')
+    parser.add_argument('--service', action='append', help='Chỉ phát lại call tới service này, có thể lặp lại')
+    parser.add_argument(
+        '--registry', metavar='FILE',
+        help='File registry JSON/YAML trỏ tới các stub server local thay vì registry Redis'
+    )
+    parser.add_argument('--compare', action='store_true', help='In kèm latency và lỗi lúc ghi')
+    parser.add_argument('--hdr-output', help='Ghi percentile distribution (HdrHistogram format) ra file')
+    parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON')
+    parser.set_defaults(handler=_replay)
+
+def _replay(args):
+    gateway = None
+    if args.registry:
+        from capyface_commons.grpc_service import service_gateway, FileServiceRegistry
+        service_gateway.use_registry(FileServiceRegistry(args.registry))
+        gateway = service_gateway
+    
+    replayer = TrafficReplayer(
+        args.log,
+        gateway=gateway,
+        speed=args.speed,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        limit=args.limit,
+        services=args.service,
+    )
+    result = replayer.run()
+    _print_result(result, args, replayer.recorded() if args.compare else None)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='capyface-bench',
+        description='Load generator cho các RPC path giữa các CapyFace services'
+    )
+    parser.add_argument('-v', '--verbose', action='store_true')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    _add_run_parser(subparsers)
+    _add_replay_parser(subparsers)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s %(name)s %(levelname)s %(message)s'
+    )
+    return args.handler(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
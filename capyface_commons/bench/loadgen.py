@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent import futures
+
+import grpc
+
+from capyface_commons.grpc_service.histogram import LatencyHistogram
+
+logger = logging.getLogger('capyface.bench')
+
+CLOSED_LOOP = "closed"
+OPEN_LOOP = "open"
+THREAD_WORKERS = "thread"
+ASYNC_WORKERS = "async"
+
+class RpcCall:
+    """Một loại call trong RPC mix"""
+    
+    __slots__ = ('service_name', 'method_name', 'weight', 'kwargs')
+    
+    def __init__(self, service_name, method_name, weight=1, kwargs=None):
+        self.service_name = service_name
+        self.method_name = method_name
+        self.weight = weight
+        self.kwargs = kwargs or {}
+    
+    @property
+    def name(self):
+        return f"{self.service_name}.{self.method_name}"
+    
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parse call spec dạng [weight*]service.Method[=json_kwargs]
+        
+        Ví dụ: 3*user_service.ValidateToken={"token": "abc"}
+        """
+        weight = 1
+        target, _, kwargs_json = spec.partition('=')
+        if '*' in target:
+            weight_text, target = target.split('*', 1)
+            weight = float(weight_text)
+        
+        service_name, _, method_name = target.strip().rpartition('.')
+        if not service_name or not method_name:
+            raise ValueError(f"Invalid call spec: {spec}")
+        
+        kwargs = json.loads(kwargs_json) if kwargs_json else {}
+        return cls(service_name, method_name, weight, kwargs)
+
+def load_mix(path):
+    """
+    Đọc RPC mix từ file JSON (hoặc YAML, cần capyface-commons[yaml]), dạng list:
+    [{"service": "user_service", "method": "ValidateToken", "weight": 3, "kwargs": {...}}]
+    """
+    from capyface_commons.grpc_service.registry_base import load_yaml
+    
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            entries = load_yaml(f)
+        else:
+            entries = json.load(f)
+    
+    return [
+        RpcCall(entry["service"], entry["method"], entry.get("weight", 1), entry.get("kwargs"))
+        for entry in entries
+    ]
+
+class LoadResult:
+    """Kết quả load test: histogram latency và lỗi theo từng loại call"""
+    
+    def __init__(self):
+        self.histograms = {}
+        self.errors = Counter()
+        self.elapsed = 0
+        self._lock = threading.Lock()
+    
+    def record(self, call_name, latency, error=None):
+        with self._lock:
+            histogram = self.histograms.get(call_name)
+            if histogram is None:
+                histogram = self.histograms[call_name] = LatencyHistogram()
+            histogram.record(latency)
+            if error is not None:
+                self.errors[(call_name, error)] += 1
+    
+    @property
+    def total(self):
+        total = LatencyHistogram()
+        for histogram in self.histograms.values():
+            total.merge(histogram)
+        return total
+    
+    def summary(self):
+        """Bảng tổng hợp theo từng loại call (latency tính bằng ms)"""
+        lines = [
+            f"{'call':<40} {'count':>8} {'errors':>7} {'rps':>9} {'p50':>9} {'p90':>9} "
+            f"{'p99':>9} {'p99.9':>9} {'max':>9}"
+        ]
+        rows = sorted(self.histograms.items()) + [("TOTAL", self.total)]
+        for name, histogram in rows:
+            errors = sum(count for (call_name, _), count in self.errors.items()
+                         if name in ("TOTAL", call_name))
+            rps = histogram.total_count / self.elapsed if self.elapsed else 0
+            percentiles = " ".join(
+                f"{histogram.percentile(p) / 1000:9.3f}" for p in (50, 90, 99, 99.9, 100)
+            )
+            lines.append(f"{name:<40} {histogram.total_count:8d} {errors:7d} {rps:9.1f} {percentiles}")
+        
+        if self.errors:
+            lines.append("")
+            lines.append("Errors:")
+            for (call_name, error), count in self.errors.most_common():
+                lines.append(f"  {call_name:<40} {error:<24} {count}")
+        
+        return "\n".join(lines)
+    
+    def to_dict(self):
+        return {
+            "elapsed": self.elapsed,
+            "calls": {
+                name: {
+                    "count": histogram.total_count,
+                    "mean_ms": histogram.mean / 1000,
+                    **{f"p{p}_ms": histogram.percentile(p) / 1000 for p in (50, 90, 99, 99.9, 100)},
+                }
+                for name, histogram in self.histograms.items()
+            },
+            "errors": [
+                {"call": call_name, "error": error, "count": count}
+                for (call_name, error), count in self.errors.items()
+            ],
+        }
+
+class LoadGenerator:
+    """
+    Chạy RPC mix qua ServiceGateway để đo capacity với đúng client library của các service
+    
+    - closed loop: concurrency worker gọi liên tục, call sau bắt đầu khi call trước xong
+    - open loop: call được phát ra với tốc độ cố định (rate/s) bất kể server nhanh hay chậm;
+      latency tính từ thời điểm call lẽ ra được phát ra nên không bị coordinated omission
+    """
+    
+    def __init__(self, mix, gateway=None, mode=CLOSED_LOOP, concurrency=8, rate=None,
+                 duration=10, warmup=0, workers=THREAD_WORKERS, timeout=None, seed=None):
+        """
+        Args:
+            mix: List RpcCall
+            gateway: ServiceGateway, mặc định là singleton service_gateway
+            mode: closed hoặc open
+            concurrency: Số worker (closed loop) hoặc số thread thực hiện call tối đa (open loop)
+            rate: Số call mỗi giây (bắt buộc với open loop)
+            duration: Thời gian chạy (giây), không tính warmup
+            warmup: Thời gian chạy trước khi bắt đầu ghi nhận (giây)
+            workers: thread hoặc async (asyncio điều phối, call chạy trong thread pool
+                vì ServiceGateway là sync)
+            timeout: Timeout mỗi call (giây), mặc định theo gateway
+            seed: Seed cho việc chọn call ngẫu nhiên theo trọng số
+        """
+        if not mix:
+            raise ValueError("RPC mix is empty")
+        if mode == OPEN_LOOP and not rate:
+            raise ValueError("Open-loop mode requires a rate")
+        if gateway is None:
+            from capyface_commons.grpc_service import service_gateway
+            gateway = service_gateway
+        
+        self.mix = mix
+        self.gateway = gateway
+        self.mode = mode
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.warmup = warmup
+        self.workers = workers
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self._weights = [call.weight for call in mix]
+        self._random_lock = threading.Lock()
+    
+    def _choose(self):
+        with self._random_lock:
+            return self.random.choices(self.mix, weights=self._weights)[0]
+    
+    def _execute(self, call, result, scheduled_at=None):
+        """Thực hiện một call và ghi nhận latency/lỗi"""
+        started = time.perf_counter() if scheduled_at is None else scheduled_at
+        error = None
+        try:
+            self.gateway.call(call.service_name, call.method_name, timeout=self.timeout, **call.kwargs)
+        except grpc.RpcError as e:
+            error = e.code().name
+        except Exception as e:
+            error = type(e).__name__
+        if result is not None:
+            result.record(call.name, time.perf_counter() - started, error)
+    
+    def run(self):
+        """Chạy warmup (nếu có) rồi load test, trả về LoadResult"""
+        if self.warmup:
+            logger.info(f"Warming up for {self.warmup}s")
+            self._run_phase(self.warmup, None)
+        
+        result = LoadResult()
+        logger.info(f"Running {self.mode}-loop load for {self.duration}s with {self.workers} workers")
+        started = time.perf_counter()
+        self._run_phase(self.duration, result)
+        result.elapsed = time.perf_counter() - started
+        return result
+    
+    def _run_phase(self, duration, result):
+        if self.workers == ASYNC_WORKERS:
+            asyncio.run(self._run_async(duration, result))
+        elif self.mode == OPEN_LOOP:
+            self._run_open_threads(duration, result)
+        else:
+            self._run_closed_threads(duration, result)
+    
+    def _run_closed_threads(self, duration, result):
+        deadline = time.perf_counter() + duration
+        
+        def worker():
+            while time.perf_counter() < deadline:
+                self._execute(self._choose(), result)
+        
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    def _run_open_threads(self, duration, result):
+        interval = 1.0 / self.rate
+        started = time.perf_counter()
+        total = int(duration * self.rate)
+        
+        with futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for i in range(total):
+                scheduled_at = started + i * interval
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._execute, self._choose(), result, scheduled_at)
+    
+    async def _run_async(self, duration, result):
+        loop = asyncio.get_running_loop()
+        executor = futures.ThreadPoolExecutor(max_workers=self.concurrency)
+        started = time.perf_counter()
+        
+        try:
+            if self.mode == OPEN_LOOP:
+                interval = 1.0 / self.rate
+                tasks = []
+                for i in range(int(duration * self.rate)):
+                    scheduled_at = started + i * interval
+                    delay = scheduled_at - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    tasks.append(loop.run_in_executor(
+                        executor, self._execute, self._choose(), result, scheduled_at
+                    ))
+                await asyncio.gather(*tasks)
+            else:
+                deadline = started + duration
+                
+                async def worker():
+                    while time.perf_counter() < deadline:
+                        await loop.run_in_executor(executor, self._execute, self._choose(), result)
+                
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            executor.shutdown(wait=True)
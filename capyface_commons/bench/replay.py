@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+from .loadgen import LoadResult
+
+logger = logging.getLogger('capyface.bench')
+
+class TrafficReplayer:
+    """
+    Phát lại file log của TrafficRecorder qua ServiceGateway.call_raw (request đã serialize được gửi
+    nguyên vẹn, không parse protobuf) để đo thay đổi về cache, batching, concurrency với traffic thật
+    
+    - speed > 0: call được phát theo khoảng cách thời gian lúc ghi chia cho speed (open loop);
+      latency tính từ thời điểm call lẽ ra được phát nên không bị coordinated omission.
+      Log ghi với sample_rate thì speed=1/sample_rate tái tạo tốc độ của toàn bộ traffic.
+    - speed = 0: phát nhanh nhất có thể với concurrency call đồng thời (closed loop).
+    """
+    
+    def __init__(self, path, gateway=None, speed=1.0, concurrency=32, timeout=None, limit=None, services=None):
+        """
+        Args:
+            path: File log của TrafficRecorder
+            gateway: ServiceGateway, mặc định là singleton service_gateway
+            speed: Hệ số tốc độ so với lúc ghi, 0 để phát nhanh nhất có thể
+            concurrency: Số thread thực hiện call tối đa
+            timeout: Timeout mỗi call (giây), mặc định theo gateway
+            limit: Số call tối đa được phát lại
+            services: Chỉ phát lại call tới các service này
+        """
+        if speed < 0:
+            raise ValueError(f"Invalid speed: {speed}")
+        if gateway is None:
+            from capyface_commons.grpc_service import service_gateway
+            gateway = service_gateway
+        
+        self.path = path
+        self.gateway = gateway
+        self.speed = speed
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.limit = limit
+        self.services = set(services) if services else None
+    
+    def _records(self):
+        from capyface_commons.grpc_service.traffic_recorder import TrafficLogReader
+        
+        count = 0
+        with TrafficLogReader(self.path) as log:
+            for record in log:
+                if self.services is not None and record.service_name not in self.services:
+                    continue
+                if self.limit is not None and count >= self.limit:
+                    return
+                count += 1
+                yield record
+    
+    def recorded(self):
+        """Latency và lỗi lúc ghi, dạng LoadResult để so sánh với kết quả replay"""
+        result = LoadResult()
+        for record in self._records():
+            error = None if record.code == grpc.StatusCode.OK else record.code.name
+            result.record(record.name, record.latency, error)
+            result.elapsed = record.offset
+        return result
+    
+    def _execute(self, record, result, scheduled_at=None):
+        started = time.perf_counter() if scheduled_at is None else scheduled_at
+        error = None
+        try:
+            self.gateway.call_raw(record.service_name, record.method_name, record.payload, timeout=self.timeout)
+        except grpc.RpcError as e:
+            error = e.code().name
+        except Exception as e:
+            error = type(e).__name__
+        result.record(record.name, time.perf_counter() - started, error)
+    
+    def run(self):
+        """Phát lại log, trả về LoadResult"""
+        result = LoadResult()
+        logger.info(f"Replaying {self.path} at speed {self.speed or 'max'} with concurrency {self.concurrency}")
+        started = time.perf_counter()
+        if self.speed:
+            self._run_scheduled(result, started)
+        else:
+            self._run_max_speed(result)
+        result.elapsed = time.perf_counter() - started
+        return result
+    
+    def _run_scheduled(self, result, started):
+        with futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            first_offset = None
+            for record in self._records():
+                if first_offset is None:
+                    first_offset = record.offset
+                scheduled_at = started + (record.offset - first_offset) / self.speed
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._execute, record, result, max(scheduled_at, started))
+    
+    def _run_max_speed(self, result):
+        records = self._records()
+        lock = threading.Lock()
+        
+        def worker():
+            while True:
+                with lock:
+                    record = next(records, None)
+                if record is None:
+                    return
+                self._execute(record, result)
+        
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
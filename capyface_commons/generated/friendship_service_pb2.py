@@ -25,7 +25,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x18\x66riendship_service.proto\x12\x13\x63\x61pyface.friendship\x1a\x1bgoogle/protobuf/empty.proto\"$\n\x11GetFriendsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\"(\n\x12GetFriendsResponse\x12\x12\n\nfriend_ids\x18\x01 \x03(\t\"6\n\x11\x43reateUserRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\x12\x10\n\x08username\x18\x02 \x01(\t\"7\n\x11\x41reFriendsRequest\x12\x10\n\x08user1_id\x18\x01 \x01(\t\x12\x10\n\x08user2_id\x18\x02 \x01(\t\")\n\x12\x41reFriendsResponse\x12\x13\n\x0b\x61re_friends\x18\x01 \x01(\x08\x32\xa5\x02\n\x11\x46riendshipService\x12_\n\nGetFriends\x12&.capyface.friendship.GetFriendsRequest\x1a\'.capyface.friendship.GetFriendsResponse\"\x00\x12N\n\nCreateUser\x12&.capyface.friendship.CreateUserRequest\x1a\x16.google.protobuf.Empty\"\x00\x12_\n\nAreFriends\x12&.capyface.friendship.AreFriendsRequest\x1a\'.capyface.friendship.AreFriendsResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x18\x66riendship_service.proto\x12\x13\x63\x61pyface.friendship\x1a\x1bgoogle/protobuf/empty.proto\"$\n\x11GetFriendsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\"(\n\x12GetFriendsResponse\x12\x12\n\nfriend_ids\x18\x01 \x03(\t\"6\n\x11\x43reateUserRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\x12\x10\n\x08username\x18\x02 \x01(\t\"7\n\x11\x41reFriendsRequest\x12\x10\n\x08user1_id\x18\x01 \x01(\t\x12\x10\n\x08user2_id\x18\x02 \x01(\t\")\n\x12\x41reFriendsResponse\x12\x13\n\x0b\x61re_friends\x18\x01 \x01(\x08\"K\n\x15GetFriendsPageRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\x12\x0e\n\x06\x63ursor\x18\x02 \x01(\t\x12\x11\n\tpage_size\x18\x03 \x01(\x05\":\n\x14StreamFriendsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\x12\x11\n\tpage_size\x18\x02 \x01(\x05\"6\n\x0b\x46riendsPage\x12\x12\n\nfriend_ids\x18\x01 \x03(\t\x12\x13\n\x0bnext_cursor\x18\x02 \x01(\t\"O\n\x16\x42\x61tchAreFriendsRequest\x12\x35\n\x05pairs\x18\x01 \x03(\x0b\x32&.capyface.friendship.AreFriendsRequest\".\n\x17\x42\x61tchAreFriendsResponse\x12\x13\n\x0b\x61re_friends\x18\x01 \x03(\x08\x32\xd9\x04\n\x11\x46riendshipService\x12_\n\nGetFriends\x12&.capyface.friendship.GetFriendsRequest\x1a\'.capyface.friendship.GetFriendsResponse\"\x00\x12N\n\nCreateUser\x12&.capyface.friendship.CreateUserRequest\x1a\x16.google.protobuf.Empty\"\x00\x12_\n\nAreFriends\x12&.capyface.friendship.AreFriendsRequest\x1a\'.capyface.friendship.AreFriendsResponse\"\x00\x12`\n\x0eGetFriendsPage\x12*.capyface.friendship.GetFriendsPageRequest\x1a .capyface.friendship.FriendsPage\"\x00\x12`\n\rStreamFriends\x12).capyface.friendship.StreamFriendsRequest\x1a .capyface.friendship.FriendsPage\"\x00\x30\x01\x12n\n\x0f\x42\x61tchAreFriends\x12+.capyface.friendship.BatchAreFriendsRequest\x1a,.capyface.friendship.BatchAreFriendsResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -42,6 +42,16 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_AREFRIENDSREQUEST']._serialized_end=269
   _globals['_AREFRIENDSRESPONSE']._serialized_start=271
   _globals['_AREFRIENDSRESPONSE']._serialized_end=312
-  _globals['_FRIENDSHIPSERVICE']._serialized_start=315
-  _globals['_FRIENDSHIPSERVICE']._serialized_end=608
+  _globals['_GETFRIENDSPAGEREQUEST']._serialized_start=314
+  _globals['_GETFRIENDSPAGEREQUEST']._serialized_end=389
+  _globals['_STREAMFRIENDSREQUEST']._serialized_start=391
+  _globals['_STREAMFRIENDSREQUEST']._serialized_end=449
+  _globals['_FRIENDSPAGE']._serialized_start=451
+  _globals['_FRIENDSPAGE']._serialized_end=505
+  _globals['_BATCHAREFRIENDSREQUEST']._serialized_start=507
+  _globals['_BATCHAREFRIENDSREQUEST']._serialized_end=586
+  _globals['_BATCHAREFRIENDSRESPONSE']._serialized_start=588
+  _globals['_BATCHAREFRIENDSRESPONSE']._serialized_end=634
+  _globals['_FRIENDSHIPSERVICE']._serialized_start=637
+  _globals['_FRIENDSHIPSERVICE']._serialized_end=1238
 # @@protoc_insertion_point(module_scope)
@@ -50,6 +50,21 @@ class FriendshipServiceStub(object):
                 request_serializer=friendship__service__pb2.AreFriendsRequest.SerializeToString,
                 response_deserializer=friendship__service__pb2.AreFriendsResponse.FromString,
                 _registered_method=True)
+        self.GetFriendsPage = channel.unary_unary(
+                '/capyface.friendship.FriendshipService/GetFriendsPage',
+                request_serializer=friendship__service__pb2.GetFriendsPageRequest.SerializeToString,
+                response_deserializer=friendship__service__pb2.FriendsPage.FromString,
+                _registered_method=True)
+        self.StreamFriends = channel.unary_stream(
+                '/capyface.friendship.FriendshipService/StreamFriends',
+                request_serializer=friendship__service__pb2.StreamFriendsRequest.SerializeToString,
+                response_deserializer=friendship__service__pb2.FriendsPage.FromString,
+                _registered_method=True)
+        self.BatchAreFriends = channel.unary_unary(
+                '/capyface.friendship.FriendshipService/BatchAreFriends',
+                request_serializer=friendship__service__pb2.BatchAreFriendsRequest.SerializeToString,
+                response_deserializer=friendship__service__pb2.BatchAreFriendsResponse.FromString,
+                _registered_method=True)
 
 
 class FriendshipServiceServicer(object):
@@ -73,6 +88,27 @@ class FriendshipServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetFriendsPage(self, request, context):
+        """Lấy danh sách bạn bè theo trang (cursor + page_size)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamFriends(self, request, context):
+        """Stream danh sách bạn bè theo từng trang, dùng cho user có rất nhiều bạn bè
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BatchAreFriends(self, request, context):
+        """Kiểm tra nhiều cặp user trong một RPC
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_FriendshipServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -91,6 +127,21 @@ def add_FriendshipServiceServicer_to_server(servicer, server):
                     request_deserializer=friendship__service__pb2.AreFriendsRequest.FromString,
                     response_serializer=friendship__service__pb2.AreFriendsResponse.SerializeToString,
             ),
+            'GetFriendsPage': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetFriendsPage,
+                    request_deserializer=friendship__service__pb2.GetFriendsPageRequest.FromString,
+                    response_serializer=friendship__service__pb2.FriendsPage.SerializeToString,
+            ),
+            'StreamFriends': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamFriends,
+                    request_deserializer=friendship__service__pb2.StreamFriendsRequest.FromString,
+                    response_serializer=friendship__service__pb2.FriendsPage.SerializeToString,
+            ),
+            'BatchAreFriends': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchAreFriends,
+                    request_deserializer=friendship__service__pb2.BatchAreFriendsRequest.FromString,
+                    response_serializer=friendship__service__pb2.BatchAreFriendsResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'capyface.friendship.FriendshipService', rpc_method_handlers)
@@ -182,3 +233,84 @@ class FriendshipService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetFriendsPage(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/capyface.friendship.FriendshipService/GetFriendsPage',
+            friendship__service__pb2.GetFriendsPageRequest.SerializeToString,
+            friendship__service__pb2.FriendsPage.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamFriends(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/capyface.friendship.FriendshipService/StreamFriends',
+            friendship__service__pb2.StreamFriendsRequest.SerializeToString,
+            friendship__service__pb2.FriendsPage.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def BatchAreFriends(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/capyface.friendship.FriendshipService/BatchAreFriends',
+            friendship__service__pb2.BatchAreFriendsRequest.SerializeToString,
+            friendship__service__pb2.BatchAreFriendsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
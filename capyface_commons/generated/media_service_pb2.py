@@ -24,13 +24,15 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13media_service.proto\x12\x0e\x63\x61pyface.media\"P\n\x17RequestUploadUrlRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x14\n\x0c\x63ontent_type\x18\x02 \x01(\t\x12\r\n\x05title\x18\x03 \x01(\t\"^\n\x18RequestUploadUrlResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\x12\n\nupload_url\x18\x02 \x01(\t\x12\x0e\n\x06s3_key\x18\x03 \x01(\t\x12\x12\n\nexpires_in\x18\x04 \x01(\x05\"<\n\x14\x43onfirmUploadRequest\x12\x10\n\x08media_id\x18\x01 \x01(\t\x12\x12\n\nsize_bytes\x18\x02 \x01(\x03\"q\n\x15\x43onfirmUploadResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\r\n\x05title\x18\x02 \x01(\t\x12\x14\n\x0c\x63ontent_type\x18\x03 \x01(\t\x12\x12\n\nsize_bytes\x18\x04 \x01(\x03\x12\x13\n\x0buploaded_at\x18\x05 \x01(\t\")\n\x15GetDownloadUrlRequest\x12\x10\n\x08media_id\x18\x01 \x01(\t\"~\n\x16GetDownloadUrlResponse\x12\x14\n\x0c\x64ownload_url\x18\x01 \x01(\t\x12\x12\n\nexpires_in\x18\x02 \x01(\x05\x12\x10\n\x08\x66ilename\x18\x03 \x01(\t\x12\x14\n\x0c\x63ontent_type\x18\x04 \x01(\t\x12\x12\n\nsize_bytes\x18\x05 \x01(\x03\x32\xba\x02\n\x0cMediaService\x12g\n\x10RequestUploadUrl\x12\'.capyface.media.RequestUploadUrlRequest\x1a(.capyface.media.RequestUploadUrlResponse\"\x00\x12^\n\rConfirmUpload\x12$.capyface.media.ConfirmUploadRequest\x1a%.capyface.media.ConfirmUploadResponse\"\x00\x12\x61\n\x0eGetDownloadUrl\x12%.capyface.media.GetDownloadUrlRequest\x1a&.capyface.media.GetDownloadUrlResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13media_service.proto\x12\x0e\x63\x61pyface.media\"P\n\x17RequestUploadUrlRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x14\n\x0c\x63ontent_type\x18\x02 \x01(\t\x12\r\n\x05title\x18\x03 \x01(\t\"^\n\x18RequestUploadUrlResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\x12\n\nupload_url\x18\x02 \x01(\t\x12\x0e\n\x06s3_key\x18\x03 \x01(\t\x12\x12\n\nexpires_in\x18\x04 \x01(\x05\"<\n\x14\x43onfirmUploadRequest\x12\x10\n\x08media_id\x18\x01 \x01(\t\x12\x12\n\nsize_bytes\x18\x02 \x01(\x03\"q\n\x15\x43onfirmUploadResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\r\n\x05title\x18\x02 \x01(\t\x12\x14\n\x0c\x63ontent_type\x18\x03 \x01(\t\x12\x12\n\nsize_bytes\x18\x04 \x01(\x03\x12\x13\n\x0buploaded_at\x18\x05 \x01(\t\")\n\x15GetDownloadUrlRequest\x12\x10\n\x08media_id\x18\x01 \x01(\t\"~\n\x16GetDownloadUrlResponse\x12\x14\n\x0c\x64ownload_url\x18\x01 \x01(\t\x12\x12\n\nexpires_in\x18\x02 \x01(\x05\x12\x10\n\x08\x66ilename\x18\x03 \x01(\t\x12\x14\n\x0c\x63ontent_type\x18\x04 \x01(\t\x12\x12\n\nsize_bytes\x18\x05 \x01(\x03\"0\n\x1b\x42\x61tchGetDownloadUrlsRequest\x12\x11\n\tmedia_ids\x18\x01 \x03(\t\"\xb9\x01\n\x1c\x42\x61tchGetDownloadUrlsResponse\x12\x44\n\x04urls\x18\x01 \x03(\x0b\x32\x36.capyface.media.BatchGetDownloadUrlsResponse.UrlsEntry\x1aS\n\tUrlsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x35\n\x05value\x18\x02 \x01(\x0b\x32&.capyface.media.GetDownloadUrlResponse:\x02\x38\x01\x32\xaf\x03\n\x0cMediaService\x12g\n\x10RequestUploadUrl\x12\'.capyface.media.RequestUploadUrlRequest\x1a(.capyface.media.RequestUploadUrlResponse\"\x00\x12^\n\rConfirmUpload\x12$.capyface.media.ConfirmUploadRequest\x1a%.capyface.media.ConfirmUploadResponse\"\x00\x12\x61\n\x0eGetDownloadUrl\x12%.capyface.media.GetDownloadUrlRequest\x1a&.capyface.media.GetDownloadUrlResponse\"\x00\x12s\n\x14\x42\x61tchGetDownloadUrls\x12+.capyface.media.BatchGetDownloadUrlsRequest\x1a,.capyface.media.BatchGetDownloadUrlsResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'media_service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_BATCHGETDOWNLOADURLSRESPONSE_URLSENTRY']._loaded_options = None
+  _globals['_BATCHGETDOWNLOADURLSRESPONSE_URLSENTRY']._serialized_options = b'8\001'
   _globals['_REQUESTUPLOADURLREQUEST']._serialized_start=39
   _globals['_REQUESTUPLOADURLREQUEST']._serialized_end=119
   _globals['_REQUESTUPLOADURLRESPONSE']._serialized_start=121
@@ -43,6 +45,12 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_GETDOWNLOADURLREQUEST']._serialized_end=435
   _globals['_GETDOWNLOADURLRESPONSE']._serialized_start=437
   _globals['_GETDOWNLOADURLRESPONSE']._serialized_end=563
-  _globals['_MEDIASERVICE']._serialized_start=566
-  _globals['_MEDIASERVICE']._serialized_end=880
+  _globals['_BATCHGETDOWNLOADURLSREQUEST']._serialized_start=565
+  _globals['_BATCHGETDOWNLOADURLSREQUEST']._serialized_end=613
+  _globals['_BATCHGETDOWNLOADURLSRESPONSE']._serialized_start=616
+  _globals['_BATCHGETDOWNLOADURLSRESPONSE']._serialized_end=801
+  _globals['_BATCHGETDOWNLOADURLSRESPONSE_URLSENTRY']._serialized_start=718
+  _globals['_BATCHGETDOWNLOADURLSRESPONSE_URLSENTRY']._serialized_end=801
+  _globals['_MEDIASERVICE']._serialized_start=804
+  _globals['_MEDIASERVICE']._serialized_end=1235
 # @@protoc_insertion_point(module_scope)
@@ -49,6 +49,11 @@ class MediaServiceStub(object):
                 request_serializer=media__service__pb2.GetDownloadUrlRequest.SerializeToString,
                 response_deserializer=media__service__pb2.GetDownloadUrlResponse.FromString,
                 _registered_method=True)
+        self.BatchGetDownloadUrls = channel.unary_unary(
+                '/capyface.media.MediaService/BatchGetDownloadUrls',
+                request_serializer=media__service__pb2.BatchGetDownloadUrlsRequest.SerializeToString,
+                response_deserializer=media__service__pb2.BatchGetDownloadUrlsResponse.FromString,
+                _registered_method=True)
 
 
 class MediaServiceServicer(object):
@@ -84,6 +89,15 @@ class MediaServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def BatchGetDownloadUrls(self, request, context):
+        """
+        Yêu cầu URL tải xuống cho nhiều tệp tin trong một RPC
+        @param media_ids Danh sách ID của các tệp tin
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MediaServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -102,6 +116,11 @@ def add_MediaServiceServicer_to_server(servicer, server):
                     request_deserializer=media__service__pb2.GetDownloadUrlRequest.FromString,
                     response_serializer=media__service__pb2.GetDownloadUrlResponse.SerializeToString,
             ),
+            'BatchGetDownloadUrls': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchGetDownloadUrls,
+                    request_deserializer=media__service__pb2.BatchGetDownloadUrlsRequest.FromString,
+                    response_serializer=media__service__pb2.BatchGetDownloadUrlsResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'capyface.media.MediaService', rpc_method_handlers)
@@ -193,3 +212,30 @@ class MediaService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def BatchGetDownloadUrls(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/capyface.media.MediaService/BatchGetDownloadUrls',
+            media__service__pb2.BatchGetDownloadUrlsRequest.SerializeToString,
+            media__service__pb2.BatchGetDownloadUrlsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -24,19 +24,27 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12user_service.proto\x12\rcapyface.user\"%\n\x14ValidateTokenRequest\x12\r\n\x05token\x18\x01 \x01(\t\"L\n\x15ValidateTokenResponse\x12\x10\n\x08is_valid\x18\x01 \x01(\x08\x12!\n\x04user\x18\x02 \x01(\x0b\x32\x13.capyface.user.User\"\x88\x01\n\x04User\x12\n\n\x02id\x18\x01 \x01(\t\x12\x10\n\x08username\x18\x02 \x01(\t\x12\r\n\x05\x65mail\x18\x03 \x01(\t\x12\r\n\x05phone\x18\x04 \x01(\t\x12\x12\n\nfirst_name\x18\x05 \x01(\t\x12\x11\n\tlast_name\x18\x06 \x01(\t\x12\x0e\n\x06gender\x18\x07 \x01(\t\x12\r\n\x05\x62irth\x18\x08 \x01(\t2k\n\x0bUserService\x12\\\n\rValidateToken\x12#.capyface.user.ValidateTokenRequest\x1a$.capyface.user.ValidateTokenResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12user_service.proto\x12\rcapyface.user\"%\n\x14ValidateTokenRequest\x12\r\n\x05token\x18\x01 \x01(\t\"L\n\x15ValidateTokenResponse\x12\x10\n\x08is_valid\x18\x01 \x01(\x08\x12!\n\x04user\x18\x02 \x01(\x0b\x32\x13.capyface.user.User\"\x88\x01\n\x04User\x12\n\n\x02id\x18\x01 \x01(\t\x12\x10\n\x08username\x18\x02 \x01(\t\x12\r\n\x05\x65mail\x18\x03 \x01(\t\x12\r\n\x05phone\x18\x04 \x01(\t\x12\x12\n\nfirst_name\x18\x05 \x01(\t\x12\x11\n\tlast_name\x18\x06 \x01(\t\x12\x0e\n\x06gender\x18\x07 \x01(\t\x12\r\n\x05\x62irth\x18\x08 \x01(\t\"(\n\x14GetUsersByIdsRequest\x12\x10\n\x08user_ids\x18\x01 \x03(\t\"\x9a\x01\n\x15GetUsersByIdsResponse\x12>\n\x05users\x18\x01 \x03(\x0b\x32/.capyface.user.GetUsersByIdsResponse.UsersEntry\x1a\x41\n\nUsersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\"\n\x05value\x18\x02 \x01(\x0b\x32\x13.capyface.user.User:\x02\x38\x01\x32\xc9\x01\n\x0bUserService\x12\\\n\rValidateToken\x12#.capyface.user.ValidateTokenRequest\x1a$.capyface.user.ValidateTokenResponse\"\x00\x12\\\n\rGetUsersByIds\x12#.capyface.user.GetUsersByIdsRequest\x1a$.capyface.user.GetUsersByIdsResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'user_service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_GETUSERSBYIDSRESPONSE_USERSENTRY']._loaded_options = None
+  _globals['_GETUSERSBYIDSRESPONSE_USERSENTRY']._serialized_options = b'8\001'
   _globals['_VALIDATETOKENREQUEST']._serialized_start=37
   _globals['_VALIDATETOKENREQUEST']._serialized_end=74
   _globals['_VALIDATETOKENRESPONSE']._serialized_start=76
   _globals['_VALIDATETOKENRESPONSE']._serialized_end=152
   _globals['_USER']._serialized_start=155
   _globals['_USER']._serialized_end=291
-  _globals['_USERSERVICE']._serialized_start=293
-  _globals['_USERSERVICE']._serialized_end=400
+  _globals['_GETUSERSBYIDSREQUEST']._serialized_start=293
+  _globals['_GETUSERSBYIDSREQUEST']._serialized_end=333
+  _globals['_GETUSERSBYIDSRESPONSE']._serialized_start=336
+  _globals['_GETUSERSBYIDSRESPONSE']._serialized_end=490
+  _globals['_GETUSERSBYIDSRESPONSE_USERSENTRY']._serialized_start=425
+  _globals['_GETUSERSBYIDSRESPONSE_USERSENTRY']._serialized_end=490
+  _globals['_USERSERVICE']._serialized_start=493
+  _globals['_USERSERVICE']._serialized_end=694
 # @@protoc_insertion_point(module_scope)
@@ -39,6 +39,11 @@ class UserServiceStub(object):
                 request_serializer=user__service__pb2.ValidateTokenRequest.SerializeToString,
                 response_deserializer=user__service__pb2.ValidateTokenResponse.FromString,
                 _registered_method=True)
+        self.GetUsersByIds = channel.unary_unary(
+                '/capyface.user.UserService/GetUsersByIds',
+                request_serializer=user__service__pb2.GetUsersByIdsRequest.SerializeToString,
+                response_deserializer=user__service__pb2.GetUsersByIdsResponse.FromString,
+                _registered_method=True)
 
 
 class UserServiceServicer(object):
@@ -51,6 +56,13 @@ class UserServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetUsersByIds(self, request, context):
+        """Lấy thông tin nhiều người dùng trong một RPC
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_UserServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -59,6 +71,11 @@ def add_UserServiceServicer_to_server(servicer, server):
                     request_deserializer=user__service__pb2.ValidateTokenRequest.FromString,
                     response_serializer=user__service__pb2.ValidateTokenResponse.SerializeToString,
             ),
+            'GetUsersByIds': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetUsersByIds,
+                    request_deserializer=user__service__pb2.GetUsersByIdsRequest.FromString,
+                    response_serializer=user__service__pb2.GetUsersByIdsResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'capyface.user.UserService', rpc_method_handlers)
@@ -96,3 +113,30 @@ class UserService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetUsersByIds(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/capyface.user.UserService/GetUsersByIds',
+            user__service__pb2.GetUsersByIdsRequest.SerializeToString,
+            user__service__pb2.GetUsersByIdsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
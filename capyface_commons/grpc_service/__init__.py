@@ -1,4 +1,28 @@
 from .service_registry import service_registry, RedisServiceRegistry
+from .registry_base import BaseServiceRegistry
+from .records import ServiceRecord, MethodRecord, InstanceRecord
+from .registry_backends import InMemoryServiceRegistry, FileServiceRegistry, LayeredServiceRegistry
 from .service_gateway import service_gateway, ServiceGateway
+from .pagination import iter_friend_ids, iter_friend_id_pages
+from .batching import BatchSpec, BatchItemNotFound, BatchDeadlineExceeded
+from .server import GrpcServer, AioGrpcServer
+from .load_shedding import (
+    AdaptiveConcurrencyLimiter, LoadSheddingInterceptor, AioLoadSheddingInterceptor
+)
+from .load_balancer import LoadBalancer
+from .rate_limiting import RateLimiter, RateLimitExceeded
+from .admission import PriorityAdmission, AdmissionRejected
+from .traffic_recorder import TrafficRecorder, TrafficLogReader
+from .shared_snapshot import SharedRegistrySnapshot
+from .token_cache import TokenValidationCache, TokenValidationTimeout
 
-__all__ = ['service_registry', 'RedisServiceRegistry', 'service_gateway', 'ServiceGateway']
\ No newline at end of file
+__all__ = [
+    'service_registry', 'RedisServiceRegistry', 'BaseServiceRegistry', 'ServiceRecord', 'MethodRecord',
+    'InstanceRecord', 'InMemoryServiceRegistry',
+    'FileServiceRegistry', 'LayeredServiceRegistry', 'service_gateway', 'ServiceGateway',
+    'iter_friend_ids', 'iter_friend_id_pages', 'BatchSpec', 'BatchItemNotFound', 'BatchDeadlineExceeded',
+    'GrpcServer', 'AioGrpcServer', 'AdaptiveConcurrencyLimiter', 'LoadSheddingInterceptor',
+    'AioLoadSheddingInterceptor', 'LoadBalancer', 'RateLimiter', 'RateLimitExceeded',
+    'PriorityAdmission', 'AdmissionRejected', 'TrafficRecorder', 'TrafficLogReader', 'SharedRegistrySnapshot',
+    'TokenValidationCache', 'TokenValidationTimeout',
+]
\ No newline at end of file
@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import threading
+import time
+
+import grpc
+
+# Priority của call, số nhỏ hơn được ưu tiên hơn
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITIES = {"high": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "low": PRIORITY_LOW}
+
+def normalize_priority(priority):
+    """Chuyển priority dạng tên ("high", "normal", "low") hoặc None sang số"""
+    if priority is None:
+        return PRIORITY_NORMAL
+    if isinstance(priority, str):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Invalid priority: {priority}")
+        return PRIORITIES[priority]
+    return priority
+
+class AdmissionRejected(grpc.RpcError):
+    """Call bị loại ở hàng đợi phía client (hàng đợi đầy hoặc không kịp deadline), code RESOURCE_EXHAUSTED"""
+    
+    def __init__(self, target, reason):
+        super().__init__(f"Call to {target} rejected by client admission: {reason}")
+        self.target = target
+        self.reason = reason
+    
+    def code(self):
+        return grpc.StatusCode.RESOURCE_EXHAUSTED
+    
+    def details(self):
+        return str(self)
+
+class _Waiter:
+    __slots__ = ('deadline', 'event', 'admitted', 'reason')
+    
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.event = threading.Event()
+        # None: đang chờ, True: được giao slot, False: bị loại
+        self.admitted = None
+        self.reason = None
+
+class _TargetState:
+    __slots__ = ('in_flight', 'queue', 'ewma', 'admitted', 'dropped', 'rejected')
+    
+    def __init__(self):
+        self.in_flight = 0
+        # Heap (priority, sequence, _Waiter)
+        self.queue = []
+        self.ewma = 0.0
+        self.admitted = 0
+        self.dropped = 0
+        self.rejected = 0
+
+class PriorityAdmission:
+    """
+    Giới hạn số call đồng thời tới mỗi target, call vượt giới hạn chờ trong hàng đợi theo priority
+    
+    - Slot được giải phóng thì giao cho call đang chờ có priority cao nhất, cùng priority thì FIFO.
+    - Call đang chờ bị loại khi thời gian còn lại tới deadline nhỏ hơn latency EWMA của target
+      (không thể hoàn thành kịp), thay vì chiếm slot rồi timeout.
+    - Hàng đợi đầy thì call mới có priority cao hơn đẩy call có priority thấp nhất ra,
+      ngược lại call mới bị từ chối ngay.
+    
+    Call bị loại nhận AdmissionRejected (RESOURCE_EXHAUSTED), không bị gateway retry.
+    """
+    
+    def __init__(self, max_concurrency=64, max_queue=256, alpha=0.1):
+        """
+        Args:
+            max_concurrency: Số call đồng thời tối đa tới mỗi target
+            max_queue: Số call chờ tối đa của mỗi target
+            alpha: Hệ số EWMA latency của target
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"Invalid max concurrency: {max_concurrency}")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.alpha = alpha
+        self._targets = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+    
+    def _get_state(self, target):
+        state = self._targets.get(target)
+        if state is None:
+            state = self._targets[target] = _TargetState()
+        return state
+    
+    def _drop(self, state, waiter, reason):
+        """Loại call đang chờ (gọi khi đang giữ lock)"""
+        waiter.admitted = False
+        waiter.reason = reason
+        state.dropped += 1
+        waiter.event.set()
+    
+    def acquire(self, target, priority=None, deadline=None):
+        """
+        Xin slot gọi target, chờ trong hàng đợi nếu target đã đạt max_concurrency
+        
+        Args:
+            target: "host:port" của instance
+            priority: PRIORITY_HIGH/NORMAL/LOW hoặc "high"/"normal"/"low", mặc định normal
+            deadline: Deadline của call theo time.monotonic(), None nếu không có
+        
+        Raises:
+            AdmissionRejected: Hàng đợi đầy, bị call priority cao hơn đẩy ra hoặc không kịp deadline
+        """
+        priority = normalize_priority(priority)
+        with self._lock:
+            state = self._get_state(target)
+            if state.in_flight < self.max_concurrency and not state.queue:
+                state.in_flight += 1
+                state.admitted += 1
+                return
+            
+            if deadline is not None and deadline - time.monotonic() < state.ewma:
+                state.dropped += 1
+                raise AdmissionRejected(target, "deadline cannot be met")
+            
+            if len(state.queue) >= self.max_queue:
+                worst = max(state.queue)
+                if worst[0] <= priority:
+                    state.rejected += 1
+                    raise AdmissionRejected(target, "queue full")
+                state.queue.remove(worst)
+                heapq.heapify(state.queue)
+                self._drop(state, worst[2], "evicted by higher priority call")
+            
+            waiter = _Waiter(deadline)
+            entry = (priority, next(self._sequence), waiter)
+            heapq.heappush(state.queue, entry)
+        
+        # Chờ tới khi được giao slot, hoặc tới lúc thời gian còn lại không đủ cho một call
+        timeout = None if deadline is None else max(0, deadline - time.monotonic() - state.ewma)
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if waiter.admitted is None:
+                    state.queue.remove(entry)
+                    heapq.heapify(state.queue)
+                    self._drop(state, waiter, "deadline cannot be met")
+        
+        if not waiter.admitted:
+            raise AdmissionRejected(target, waiter.reason)
+    
+    def release(self, target, latency=None):
+        """
+        Trả slot sau khi call tới target kết thúc, giao slot cho call đang chờ có priority cao nhất
+        
+        Args:
+            target: "host:port" của instance
+            latency: Latency của call (giây), None nếu call lỗi
+        """
+        with self._lock:
+            state = self._targets[target]
+            if latency is not None:
+                state.ewma = latency if not state.ewma else state.ewma + self.alpha * (latency - state.ewma)
+            
+            now = time.monotonic()
+            while state.queue:
+                _, _, waiter = heapq.heappop(state.queue)
+                if waiter.deadline is not None and waiter.deadline - now < state.ewma:
+                    self._drop(state, waiter, "deadline cannot be met")
+                    continue
+                # Slot được chuyển thẳng cho call đang chờ, in_flight không đổi
+                waiter.admitted = True
+                state.admitted += 1
+                waiter.event.set()
+                return
+            state.in_flight -= 1
+    
+    def snapshot(self):
+        """Trạng thái hàng đợi theo target"""
+        with self._lock:
+            return {
+                target: {
+                    "in_flight": state.in_flight,
+                    "queued": len(state.queue),
+                    "admitted": state.admitted,
+                    "dropped": state.dropped,
+                    "rejected": state.rejected,
+                    "ewma_ms": round(state.ewma * 1000, 3),
+                }
+                for target, state in self._targets.items()
+            }
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+from capyface_commons.generated import friendship_service_pb2
+from capyface_commons.generated import media_service_pb2
+
+from .admission import normalize_priority
+
+logger = logging.getLogger('capyface.batching')
+
+class BatchItemNotFound(LookupError):
+    """Phần tử không có trong response của batch RPC"""
+
+class BatchDeadlineExceeded(grpc.RpcError):
+    """Hết timeout của call trước khi batch RPC chứa nó hoàn thành, code DEADLINE_EXCEEDED"""
+    
+    def code(self):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+    
+    def details(self):
+        return str(self)
+
+class BatchSpec:
+    """
+    Mô tả cách gộp các call đơn lẻ thành một batch RPC
+    
+    Args:
+        batch_method: Tên batch method trên cùng service
+        build_request: Hàm nhận list kwargs của các call đơn lẻ, trả về kwargs cho batch request
+        split_response: Hàm nhận (batch_response, list kwargs), trả về list kết quả
+            cùng thứ tự; phần tử là Exception sẽ được raise cho call tương ứng
+    """
+    
+    def __init__(self, batch_method, build_request, split_response):
+        self.batch_method = batch_method
+        self.build_request = build_request
+        self.split_response = split_response
+
+class _Batch:
+    """Các call đang chờ được gộp trong cùng một cửa sổ"""
+    
+    __slots__ = ('items', 'priority')
+    
+    def __init__(self):
+        self.items = []
+        # Priority cao nhất (số nhỏ nhất) trong các call của batch
+        self.priority = None
+
+class MicroBatcher:
+    """
+    Gộp các call đồng thời tới cùng một method trong một cửa sổ thời gian ngắn thành một batch RPC
+    
+    Không dùng background thread: call đầu tiên của mỗi batch (leader) chờ hết cửa sổ
+    rồi tự thực hiện batch RPC. Nếu batch đầy trước khi hết cửa sổ, call làm đầy batch
+    sẽ thực hiện RPC ngay.
+    """
+    
+    def __init__(self, gateway, service_name, spec, window=0.002, max_batch_size=100):
+        """
+        Args:
+            gateway: ServiceGateway dùng để gọi batch RPC
+            service_name: Tên service
+            spec: BatchSpec
+            window: Thời gian tối đa chờ gộp call (giây)
+            max_batch_size: Số call tối đa trong một batch
+        """
+        self.gateway = gateway
+        self.service_name = service_name
+        self.spec = spec
+        self.window = window
+        self.max_batch_size = max_batch_size
+        
+        self._lock = threading.Lock()
+        self._current = None
+    
+    def submit(self, timeout=None, priority=None, **kwargs):
+        """
+        Gửi một call đơn lẻ và chờ kết quả từ batch RPC
+        
+        Args:
+            timeout: Timeout của call (giây), cũng là timeout cho batch RPC nếu call này thực hiện RPC
+            priority: Priority của call; batch RPC đi qua priority admission với priority cao nhất trong batch
+            kwargs: Các tham số của call đơn lẻ
+        
+        Returns:
+            Response tương ứng với call
+        
+        Raises:
+            BatchDeadlineExceeded: Batch RPC chưa hoàn thành khi hết timeout của call
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        future = futures.Future()
+        full_batch = None
+        
+        with self._lock:
+            batch = self._current
+            is_leader = batch is None
+            if is_leader:
+                batch = self._current = _Batch()
+            batch.items.append((kwargs, future))
+            priority = normalize_priority(priority)
+            if batch.priority is None or priority < batch.priority:
+                batch.priority = priority
+            
+            if len(batch.items) >= self.max_batch_size:
+                self._current = None
+                full_batch = batch
+        
+        if full_batch is not None:
+            self._execute(full_batch, self._remaining(deadline))
+        elif is_leader:
+            # Chờ các call khác tham gia, trừ khi batch đã được thực hiện vì đầy
+            futures.wait([future], timeout=self.window)
+            with self._lock:
+                if self._current is batch:
+                    self._current = None
+                else:
+                    batch = None
+            if batch is not None:
+                self._execute(batch, self._remaining(deadline))
+        
+        # Call không thực hiện RPC chỉ chờ tới hết timeout của chính nó, không theo timeout của leader
+        try:
+            return future.result(timeout=self._remaining(deadline))
+        except futures.TimeoutError:
+            raise BatchDeadlineExceeded(
+                f"Batch call {self.service_name}.{self.spec.batch_method} did not complete within {timeout}s"
+            ) from None
+    
+    @staticmethod
+    def _remaining(deadline):
+        return None if deadline is None else max(0, deadline - time.monotonic())
+    
+    def _execute(self, batch, timeout):
+        """Thực hiện batch RPC và phân phối kết quả cho từng call"""
+        call_kwargs = [kwargs for kwargs, _ in batch.items]
+        
+        try:
+            # Không lấy thêm quota rate limit cho batch RPC, mỗi call đơn lẻ đã lấy khi vào gateway.call
+            response = self.gateway._call_unary(
+                self.service_name,
+                self.spec.batch_method,
+                timeout,
+                priority=batch.priority,
+                **self.spec.build_request(call_kwargs)
+            )
+            results = self.spec.split_response(response, call_kwargs)
+            if len(results) != len(call_kwargs):
+                raise ValueError(
+                    f"{self.spec.batch_method} returned {len(results)} results for {len(call_kwargs)} calls"
+                )
+        except Exception as e:
+            logger.warning(f"Batch call {self.service_name}.{self.spec.batch_method} failed: {e}")
+            for _, future in batch.items:
+                future.set_exception(e)
+            return
+        
+        logger.debug(f"Batched {len(call_kwargs)} calls into {self.service_name}.{self.spec.batch_method}")
+        for (_, future), result in zip(batch.items, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+def _split_are_friends(response, call_kwargs):
+    return [
+        friendship_service_pb2.AreFriendsResponse(are_friends=are_friends)
+        for are_friends in response.are_friends
+    ]
+
+def _split_download_urls(response, call_kwargs):
+    results = []
+    for kwargs in call_kwargs:
+        media_id = kwargs["media_id"]
+        if media_id in response.urls:
+            # Copy ra message độc lập để không giữ tham chiếu tới cả batch response
+            result = media_service_pb2.GetDownloadUrlResponse()
+            result.CopyFrom(response.urls[media_id])
+            results.append(result)
+        else:
+            results.append(BatchItemNotFound(f"Media {media_id} not found"))
+    return results
+
+# BatchSpec mặc định theo tên method đơn lẻ
+DEFAULT_BATCH_SPECS = {
+    "AreFriends": BatchSpec(
+        batch_method="BatchAreFriends",
+        build_request=lambda call_kwargs: {"pairs": call_kwargs},
+        split_response=_split_are_friends,
+    ),
+    "GetDownloadUrl": BatchSpec(
+        batch_method="BatchGetDownloadUrls",
+        build_request=lambda call_kwargs: {
+            # Loại bỏ media_id trùng lặp nhưng giữ nguyên thứ tự
+            "media_ids": list(dict.fromkeys(kwargs["media_id"] for kwargs in call_kwargs))
+        },
+        split_response=_split_download_urls,
+    ),
+}
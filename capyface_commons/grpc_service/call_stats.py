@@ -0,0 +1,164 @@
+import threading
+import time
+
+from .histogram import LatencyHistogram
+
+class MethodLatency:
+    """
+    Thống kê latency online của một method: EWMA và percentile trên cửa sổ trượt
+    
+    Percentile được tính từ hai histogram xoay vòng (cửa sổ hiện tại và cửa sổ trước),
+    nên phản ánh latency của 1-2 window gần nhất với bộ nhớ cố định.
+    """
+    
+    def __init__(self, window=60, alpha=0.1):
+        """
+        Args:
+            window: Độ dài mỗi cửa sổ histogram (giây)
+            alpha: Hệ số EWMA
+        """
+        self.window = window
+        self.alpha = alpha
+        self.ewma = None
+        self.count = 0
+        self._current = LatencyHistogram()
+        self._previous = LatencyHistogram()
+        self._rotate_at = time.monotonic() + window
+        # Percentile được cache vì tính từ histogram tốn O(số bucket)
+        self._percentiles = {}
+        self._percentiles_expire_at = 0
+        self._lock = threading.Lock()
+    
+    def record(self, latency):
+        """Ghi nhận latency (giây) của một call thành công"""
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._rotate_at:
+                self._previous = self._current
+                self._current = LatencyHistogram()
+                self._rotate_at = now + self.window
+            self._current.record(latency)
+            self.ewma = latency if self.ewma is None else self.ewma + self.alpha * (latency - self.ewma)
+            self.count += 1
+    
+    @property
+    def samples(self):
+        """Số mẫu trong cửa sổ hiện tại và cửa sổ trước"""
+        return self._current.total_count + self._previous.total_count
+    
+    def percentile(self, percentile, max_age=1.0):
+        """
+        Latency (giây) tại percentile, None nếu chưa có mẫu
+        
+        Args:
+            percentile: 0-100
+            max_age: Dùng lại giá trị đã tính trong khoảng này (giây)
+        """
+        now = time.monotonic()
+        if now < self._percentiles_expire_at and percentile in self._percentiles:
+            return self._percentiles[percentile]
+        
+        with self._lock:
+            if now >= self._percentiles_expire_at:
+                self._percentiles = {}
+                self._percentiles_expire_at = now + max_age
+            histogram = LatencyHistogram().merge(self._previous).merge(self._current)
+            value = histogram.percentile(percentile) / 1_000_000 if histogram.total_count else None
+            self._percentiles[percentile] = value
+            return value
+
+class AdaptiveTimeout:
+    """
+    Timeout theo latency thực tế của từng method: percentile × multiplier, giới hạn trong [min, max]
+    
+    Khi method chưa có đủ min_samples mẫu thì dùng timeout mặc định của gateway.
+    """
+    
+    def __init__(self, percentile=99, multiplier=3, min_timeout=0.05, max_timeout=None, min_samples=100):
+        """
+        Args:
+            percentile: Percentile latency làm cơ sở
+            multiplier: Hệ số nhân
+            min_timeout: Timeout tối thiểu (giây)
+            max_timeout: Timeout tối đa (giây), mặc định là default_timeout của gateway
+            min_samples: Số mẫu tối thiểu trước khi áp dụng
+        """
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+    
+    def timeout_for(self, latency, default_timeout):
+        """
+        Args:
+            latency: MethodLatency của method, None nếu chưa có
+            default_timeout: Timeout mặc định của gateway
+        """
+        if latency is None or latency.samples < self.min_samples:
+            return default_timeout
+        value = latency.percentile(self.percentile)
+        if value is None:
+            return default_timeout
+        max_timeout = self.max_timeout or default_timeout
+        return min(max_timeout, max(self.min_timeout, value * self.multiplier))
+
+class CallStats:
+    """Latency theo method và số request đang chờ (outstanding) theo target của ServiceGateway"""
+    
+    def __init__(self, window=60):
+        """
+        Args:
+            window: Độ dài cửa sổ histogram latency (giây)
+        """
+        self.window = window
+        # (service_name, method_name) -> MethodLatency
+        self.methods = {}
+        # target -> số request đang chờ
+        self.outstanding = {}
+        self._lock = threading.Lock()
+    
+    def get_method(self, service_name, method_name):
+        return self.methods.get((service_name, method_name))
+    
+    def begin(self, target):
+        """Đánh dấu bắt đầu một request tới target"""
+        with self._lock:
+            self.outstanding[target] = self.outstanding.get(target, 0) + 1
+    
+    def end(self, target, service_name=None, method_name=None, latency=None):
+        """
+        Đánh dấu request tới target kết thúc
+        
+        Args:
+            latency: Latency (giây) nếu call thành công, None nếu lỗi (không ghi nhận latency
+                để timeout/lỗi không kéo percentile theo)
+        """
+        with self._lock:
+            self.outstanding[target] = self.outstanding.get(target, 1) - 1
+            if latency is None:
+                return
+            method = self.methods.get((service_name, method_name))
+            if method is None:
+                method = self.methods[(service_name, method_name)] = MethodLatency(window=self.window)
+        method.record(latency)
+    
+    def snapshot(self, timeout_policy=None, default_timeout=None):
+        """Thống kê hiện tại (latency theo ms) dạng dict"""
+        methods = {}
+        for (service_name, method_name), latency in list(self.methods.items()):
+            p50, p99 = latency.percentile(50), latency.percentile(99)
+            stats = {
+                "count": latency.count,
+                "ewma_ms": round(latency.ewma * 1000, 3),
+                "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+                "p99_ms": round(p99 * 1000, 3) if p99 is not None else None,
+            }
+            if timeout_policy is not None:
+                stats["timeout_ms"] = round(timeout_policy.timeout_for(latency, default_timeout) * 1000, 3)
+            methods[f"{service_name}.{method_name}"] = stats
+        
+        return {
+            "methods": methods,
+            "outstanding": {target: count for target, count in self.outstanding.items() if count},
+        }
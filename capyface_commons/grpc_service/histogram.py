@@ -0,0 +1,114 @@
+import math
+
+class LatencyHistogram:
+    """
+    Histogram latency kiểu HDR (log-linear): mỗi khoảng [2^k, 2^(k+1)) được chia thành
+    sub_buckets bucket đều nhau, nên sai số tương đối luôn nhỏ hơn 1/sub_buckets
+    với bộ nhớ cố định, không phụ thuộc số lượng mẫu.
+    
+    Giá trị được lưu theo micro giây.
+    """
+    
+    def __init__(self, significant_digits=2, max_value_us=3600 * 1000 * 1000):
+        """
+        Args:
+            significant_digits: Số chữ số có nghĩa cần giữ (2 -> sai số < 1%)
+            max_value_us: Giá trị lớn nhất có thể ghi nhận (micro giây), lớn hơn sẽ bị cắt
+        """
+        self.significant_digits = significant_digits
+        self.max_value_us = max_value_us
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.sub_bucket_count = 1 << self.sub_bucket_bits
+        self.counts = {}
+        self.total_count = 0
+        self.min_value = None
+        self.max_value = 0
+        self.sum = 0
+    
+    def _index(self, value):
+        if value < self.sub_bucket_count:
+            return value
+        exponent = value.bit_length() - self.sub_bucket_bits
+        return (exponent << self.sub_bucket_bits) + (value >> exponent)
+    
+    def _value_at(self, index):
+        """Giá trị lớn nhất thuộc bucket index (làm tròn lên như HdrHistogram)"""
+        exponent = index >> self.sub_bucket_bits
+        if exponent == 0:
+            return index
+        sub_bucket = index - (exponent << self.sub_bucket_bits)
+        return ((sub_bucket + 1) << exponent) - 1
+    
+    def record(self, seconds):
+        """Ghi nhận một latency (giây)"""
+        value = min(self.max_value_us, max(0, int(seconds * 1_000_000)))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total_count += 1
+        self.sum += value
+        self.max_value = max(self.max_value, value)
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+    
+    def merge(self, other):
+        """Cộng dồn histogram khác (cùng significant_digits) vào histogram này"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self.sum += other.sum
+        self.max_value = max(self.max_value, other.max_value)
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        return self
+    
+    @property
+    def mean(self):
+        return self.sum / self.total_count if self.total_count else 0
+    
+    def _percentile_with_count(self, percentile):
+        """Trả về (giá trị tại percentile, số mẫu tích lũy tới bucket đó)"""
+        target = max(1, math.ceil(self.total_count * percentile / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._value_at(index), self.max_value), seen
+        return self.max_value, seen
+    
+    def percentile(self, percentile):
+        """Giá trị (micro giây) tại percentile (0-100)"""
+        if not self.total_count:
+            return 0
+        return self._percentile_with_count(percentile)[0]
+    
+    def percentile_distribution(self, ticks_per_half_distance=5):
+        """
+        Bảng phân bố percentile giống output của HdrHistogram
+        (Value, Percentile, TotalCount, 1/(1-Percentile))
+        """
+        rows = []
+        if not self.total_count:
+            return rows
+        
+        percentile = 0.0
+        while True:
+            value, count = self._percentile_with_count(percentile)
+            if count >= self.total_count:
+                rows.append((value, 1.0, count))
+                break
+            rows.append((value, percentile / 100, count))
+            # Khoảng cách giảm một nửa mỗi khi tiến gần 100%, giống HdrHistogram
+            half_distance = 2 ** int(math.log2(100 / (100 - percentile)) + 1)
+            percentile = min(100, percentile + 100 / (half_distance * ticks_per_half_distance))
+        return rows
+    
+    def format_distribution(self, unit_divisor=1000.0):
+        """Định dạng percentile distribution thành text, mặc định đơn vị mili giây"""
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>18}", ""]
+        for value, percentile, count in self.percentile_distribution():
+            inverse = f"{1 / (1 - percentile):.2f}" if percentile < 1 else ""
+            lines.append(f"{value / unit_divisor:12.3f} {percentile:14.12f} {count:10d} {inverse:>18}")
+        lines.append(
+            f"#[Mean = {self.mean / unit_divisor:.3f}, Max = {self.max_value / unit_divisor:.3f}, "
+            f"Total count = {self.total_count}]"
+        )
+        return "\n".join(lines)
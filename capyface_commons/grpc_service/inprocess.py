@@ -0,0 +1,358 @@
+import logging
+import time
+
+import grpc
+
+logger = logging.getLogger('capyface.inprocess')
+
+# Host/port giả của instance in-process trong ServiceGateway (target "inprocess:0")
+INPROCESS_HOST = "inprocess"
+INPROCESS_PORT = 0
+
+class InProcessRpcError(grpc.RpcError):
+    """Lỗi của call in-process, cùng interface code()/details() với lỗi của grpc"""
+    
+    def __init__(self, code, details=""):
+        super().__init__(f"{code}: {details}")
+        self._code = code
+        self._details = details
+    
+    def code(self):
+        return self._code
+    
+    def details(self):
+        return self._details
+    
+    def trailing_metadata(self):
+        return ()
+    
+    def initial_metadata(self):
+        return ()
+    
+    def debug_error_string(self):
+        return f"in-process call failed with {self._code}: {self._details}"
+
+class _Abort(Exception):
+    """Exception nội bộ khi servicer gọi context.abort()"""
+
+class _ServicerContext:
+    """ServicerContext tối giản cho servicer được gọi trực tiếp trong process"""
+    
+    def __init__(self, metadata=None, timeout=None):
+        self._metadata = tuple(metadata or ())
+        self._deadline = time.monotonic() + timeout if timeout is not None else None
+        self._code = None
+        self._details = None
+        self._trailing_metadata = ()
+        self._callbacks = []
+        self._cancelled = False
+    
+    def invocation_metadata(self):
+        return self._metadata
+    
+    def peer(self):
+        return INPROCESS_HOST
+    
+    def peer_identities(self):
+        return None
+    
+    def peer_identity_key(self):
+        return None
+    
+    def auth_context(self):
+        return {}
+    
+    def time_remaining(self):
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+    
+    def is_active(self):
+        return not self._cancelled and (self._deadline is None or time.monotonic() < self._deadline)
+    
+    def cancel(self):
+        self._cancelled = True
+    
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+        return True
+    
+    def abort(self, code, details):
+        self._code = code
+        self._details = details
+        raise _Abort()
+    
+    def abort_with_status(self, status):
+        self._trailing_metadata = status.trailing_metadata
+        self.abort(status.code, status.details)
+    
+    def set_code(self, code):
+        self._code = code
+    
+    def set_details(self, details):
+        self._details = details
+    
+    def code(self):
+        return self._code
+    
+    def details(self):
+        return self._details
+    
+    def set_trailing_metadata(self, trailing_metadata):
+        self._trailing_metadata = tuple(trailing_metadata)
+    
+    def trailing_metadata(self):
+        return self._trailing_metadata
+    
+    def send_initial_metadata(self, initial_metadata):
+        pass
+    
+    def set_compression(self, compression):
+        pass
+    
+    def disable_next_message_compression(self):
+        pass
+    
+    def _check_deadline(self):
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            raise InProcessRpcError(grpc.StatusCode.DEADLINE_EXCEEDED, "Deadline Exceeded")
+    
+    def _error(self, exception=None):
+        """RpcError tương ứng với trạng thái servicer đặt, None nếu call thành công"""
+        if exception is not None and not isinstance(exception, _Abort):
+            if self._code is not None and self._code != grpc.StatusCode.OK:
+                return InProcessRpcError(self._code, self._details or str(exception))
+            return InProcessRpcError(grpc.StatusCode.UNKNOWN, f"Exception calling application: {exception}")
+        if self._code is not None and self._code != grpc.StatusCode.OK:
+            return InProcessRpcError(self._code, self._details or "")
+        return None
+    
+    def _finish(self):
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in in-process RPC callback: {e}")
+
+class _ResponseIterator:
+    """Iterator response của call streaming, có cancel() như grpc"""
+    
+    def __init__(self, responses, context, serializer):
+        self._responses = responses
+        self._context = context
+        self._serializer = serializer
+        self._done = False
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        try:
+            self._context._check_deadline()
+            response = next(self._responses)
+        except StopIteration:
+            self._close()
+            error = self._context._error()
+            if error is not None:
+                raise error
+            raise
+        except InProcessRpcError:
+            self._close()
+            raise
+        except Exception as e:
+            self._close()
+            raise self._context._error(e)
+        return self._serializer(response) if self._serializer else response
+    
+    def _close(self):
+        if not self._done:
+            self._done = True
+            self._context._finish()
+    
+    def cancel(self):
+        if not self._done:
+            self._context.cancel()
+            close = getattr(self._responses, 'close', None)
+            if close is not None:
+                close()
+            self._close()
+        return True
+    
+    def code(self):
+        return self._context._code or grpc.StatusCode.OK
+    
+    def details(self):
+        return self._context._details
+
+class _MultiCallable:
+    """
+    Callable của một method trên InProcessChannel
+    
+    Stub generated truyền request_serializer: request/response là message object và được
+    chuyển thẳng cho servicer không serialize. Không có serializer (call_raw): request/response
+    là bytes và được decode/encode bằng serializer của handler phía server.
+    """
+    
+    def __init__(self, channel, method, raw):
+        self._channel = channel
+        self._method = method
+        self._raw = raw
+    
+    def _prepare(self, kind, timeout, metadata):
+        handler = self._channel._get_handler(self._method)
+        behavior = getattr(handler, kind)
+        if behavior is None:
+            raise InProcessRpcError(grpc.StatusCode.UNIMPLEMENTED, f"Method {self._method} is not {kind}")
+        context = _ServicerContext(metadata, timeout)
+        context._check_deadline()
+        return handler, behavior, context
+    
+    def _decode_requests(self, handler, requests):
+        if self._raw and handler.request_deserializer:
+            return (handler.request_deserializer(request) for request in requests)
+        return iter(requests)
+    
+    def _decode_request(self, handler, request):
+        if self._raw and handler.request_deserializer:
+            return handler.request_deserializer(request)
+        return request
+    
+    def _response_serializer(self, handler):
+        return handler.response_serializer if self._raw else None
+    
+    def _unary_response(self, handler, behavior, context, request):
+        try:
+            response = behavior(request, context)
+        except Exception as e:
+            raise context._error(e)
+        finally:
+            context._finish()
+        error = context._error()
+        if error is not None:
+            raise error
+        serializer = self._response_serializer(handler)
+        return serializer(response) if serializer else response
+
+class _UnaryUnaryMultiCallable(_MultiCallable):
+    def __call__(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None,
+                 compression=None):
+        handler, behavior, context = self._prepare('unary_unary', timeout, metadata)
+        return self._unary_response(handler, behavior, context, self._decode_request(handler, request))
+    
+    def with_call(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None,
+                  compression=None):
+        return self(request, timeout=timeout, metadata=metadata), None
+
+class _UnaryStreamMultiCallable(_MultiCallable):
+    def __call__(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None,
+                 compression=None):
+        handler, behavior, context = self._prepare('unary_stream', timeout, metadata)
+        return _ResponseIterator(
+            iter(behavior(self._decode_request(handler, request), context)),
+            context, self._response_serializer(handler)
+        )
+
+class _StreamUnaryMultiCallable(_MultiCallable):
+    def __call__(self, request_iterator, timeout=None, metadata=None, credentials=None, wait_for_ready=None,
+                 compression=None):
+        handler, behavior, context = self._prepare('stream_unary', timeout, metadata)
+        return self._unary_response(handler, behavior, context, self._decode_requests(handler, request_iterator))
+    
+    def with_call(self, request_iterator, timeout=None, metadata=None, credentials=None, wait_for_ready=None,
+                  compression=None):
+        return self(request_iterator, timeout=timeout, metadata=metadata), None
+
+class _StreamStreamMultiCallable(_MultiCallable):
+    def __call__(self, request_iterator, timeout=None, metadata=None, credentials=None, wait_for_ready=None,
+                 compression=None):
+        handler, behavior, context = self._prepare('stream_stream', timeout, metadata)
+        return _ResponseIterator(
+            iter(behavior(self._decode_requests(handler, request_iterator), context)),
+            context, self._response_serializer(handler)
+        )
+
+class _HandlerCallDetails(grpc.HandlerCallDetails):
+    def __init__(self, method):
+        self.method = method
+        self.invocation_metadata = ()
+
+class InProcessChannel:
+    """
+    Channel gọi trực tiếp servicer đăng ký trong cùng process, không qua socket và không serialize
+    message (dùng cho các service đóng gói chung trong một process và cho test)
+    
+    Vừa đóng vai "server" cho hàm add_XxxServicer_to_server, vừa là channel cho stub generated:
+        
+        channel = InProcessChannel()
+        user_service_pb2_grpc.add_UserServiceServicer_to_server(UserServicer(), channel)
+        stub = user_service_pb2_grpc.UserServiceStub(channel)
+    
+    Servicer chạy trên thread của caller; server interceptor không được áp dụng, deadline
+    chỉ được kiểm tra trước khi gọi (servicer có thể đọc context.time_remaining()).
+    Request message được truyền cho servicer không copy, servicer không được sửa.
+    Chỉ hỗ trợ servicer sync (không hỗ trợ servicer async def).
+    """
+    
+    def __init__(self):
+        # Đường dẫn /package.Service/Method -> RpcMethodHandler
+        self._handlers = {}
+        self._generic_handlers = []
+    
+    # Interface server cho add_XxxServicer_to_server
+    
+    def add_generic_rpc_handlers(self, generic_rpc_handlers):
+        self._generic_handlers.extend(generic_rpc_handlers)
+    
+    def add_registered_method_handlers(self, service_name, method_handlers):
+        for method_name, handler in method_handlers.items():
+            self._handlers[f"/{service_name}/{method_name}"] = handler
+    
+    def _get_handler(self, method):
+        handler = self._handlers.get(method)
+        if handler is not None:
+            return handler
+        for generic_handler in self._generic_handlers:
+            handler = generic_handler.service(_HandlerCallDetails(method))
+            if handler is not None:
+                self._handlers[method] = handler
+                return handler
+        raise InProcessRpcError(grpc.StatusCode.UNIMPLEMENTED, f"Method not found: {method}")
+    
+    def has_service(self, full_service_name):
+        prefix = f"/{full_service_name}/"
+        return any(method.startswith(prefix) for method in self._handlers)
+    
+    # Interface grpc.Channel cho stub
+    
+    def unary_unary(self, method, request_serializer=None, response_deserializer=None,
+                    _registered_method=False):
+        return _UnaryUnaryMultiCallable(self, method, raw=request_serializer is None)
+    
+    def unary_stream(self, method, request_serializer=None, response_deserializer=None,
+                     _registered_method=False):
+        return _UnaryStreamMultiCallable(self, method, raw=request_serializer is None)
+    
+    def stream_unary(self, method, request_serializer=None, response_deserializer=None,
+                     _registered_method=False):
+        return _StreamUnaryMultiCallable(self, method, raw=request_serializer is None)
+    
+    def stream_stream(self, method, request_serializer=None, response_deserializer=None,
+                      _registered_method=False):
+        return _StreamStreamMultiCallable(self, method, raw=request_serializer is None)
+    
+    def subscribe(self, callback, try_to_connect=False):
+        callback(grpc.ChannelConnectivity.READY)
+    
+    def unsubscribe(self, callback):
+        pass
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
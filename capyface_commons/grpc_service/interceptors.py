@@ -0,0 +1,137 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+
+import grpc
+
+logger = logging.getLogger('capyface.interceptors')
+
+def wrap_rpc_handler(handler, wrapper):
+    """
+    Bọc behavior của RpcMethodHandler
+    
+    Args:
+        handler: grpc.RpcMethodHandler trả về từ continuation
+        wrapper: Hàm nhận (behavior, response_streaming), trả về behavior mới
+    
+    Returns:
+        RpcMethodHandler mới với behavior đã được bọc
+    """
+    if handler is None:
+        return None
+    
+    for field in ('unary_unary', 'unary_stream', 'stream_unary', 'stream_stream'):
+        behavior = getattr(handler, field)
+        if behavior is not None:
+            return handler._replace(**{field: wrapper(behavior, handler.response_streaming)})
+    
+    return handler
+
+class InFlightTracker:
+    """Đếm số RPC đang được xử lý và cho phép chờ tới khi hết RPC"""
+    
+    def __init__(self):
+        self._count = 0
+        self._condition = threading.Condition()
+    
+    @property
+    def count(self):
+        return self._count
+    
+    def begin(self):
+        with self._condition:
+            self._count += 1
+    
+    def end(self):
+        with self._condition:
+            self._count -= 1
+            if self._count == 0:
+                self._condition.notify_all()
+    
+    def wait_idle(self, timeout=None):
+        """
+        Chờ tới khi không còn RPC nào đang xử lý
+        
+        Returns:
+            True nếu đã hết RPC, False nếu hết timeout
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._count == 0, timeout=timeout)
+    
+    async def async_wait_idle(self, timeout=None, poll_interval=0.05):
+        """Phiên bản không block event loop của wait_idle"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._count > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(poll_interval)
+        return True
+
+class InFlightInterceptor(grpc.ServerInterceptor):
+    """Server interceptor theo dõi số RPC đang xử lý, dùng cho graceful drain"""
+    
+    def __init__(self, tracker):
+        self.tracker = tracker
+    
+    def intercept_service(self, continuation, handler_call_details):
+        return wrap_rpc_handler(continuation(handler_call_details), self._wrap)
+    
+    def _wrap(self, behavior, response_streaming):
+        tracker = self.tracker
+        
+        if response_streaming:
+            def tracked(request, context):
+                tracker.begin()
+                try:
+                    yield from behavior(request, context)
+                finally:
+                    tracker.end()
+        else:
+            def tracked(request, context):
+                tracker.begin()
+                try:
+                    return behavior(request, context)
+                finally:
+                    tracker.end()
+        
+        return tracked
+
+class AioInFlightInterceptor(grpc.aio.ServerInterceptor):
+    """Phiên bản grpc.aio của InFlightInterceptor"""
+    
+    def __init__(self, tracker):
+        self.tracker = tracker
+    
+    async def intercept_service(self, continuation, handler_call_details):
+        return wrap_rpc_handler(await continuation(handler_call_details), self._wrap)
+    
+    def _wrap(self, behavior, response_streaming):
+        tracker = self.tracker
+        
+        if response_streaming:
+            async def tracked(request, context):
+                tracker.begin()
+                try:
+                    result = behavior(request, context)
+                    if hasattr(result, '__aiter__'):
+                        async for response in result:
+                            yield response
+                    elif inspect.isawaitable(result):
+                        # Servicer gửi response qua context.write
+                        await result
+                finally:
+                    tracker.end()
+        else:
+            async def tracked(request, context):
+                tracker.begin()
+                try:
+                    result = behavior(request, context)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    return result
+                finally:
+                    tracker.end()
+        
+        return tracked
@@ -0,0 +1,108 @@
+import logging
+import random
+import time
+
+from .registry_base import locality_from_env
+
+logger = logging.getLogger('capyface.load_balancer')
+
+class LoadBalancer:
+    """
+    Chọn instance cho mỗi call của ServiceGateway
+    
+    Bỏ qua các instance đang shedding hoặc có utilization vượt ngưỡng (theo trạng thái
+    LoadSheddingInterceptor publish vào registry), sau đó chọn theo power-of-two-choices:
+    lấy ngẫu nhiên 2 instance và chọn instance có tải thấp hơn. Tải gồm số request
+    gateway này đang chờ ở instance (cập nhật tức thì) cộng utilization server báo về.
+    
+    Nếu biết locality của client, instance cùng zone được ưu tiên, rồi đến cùng region.
+    Traffic chỉ tràn sang zone/region khác khi phần trăm instance khỏe (không quá tải,
+    không bị eject) của zone dưới min_healthy_percent hoặc utilization trung bình
+    của zone từ spillover_utilization trở lên.
+    """
+    
+    def __init__(self, overload_threshold=0.9, load_stale_after=30, locality=None,
+                 min_healthy_percent=70, spillover_utilization=0.8):
+        """
+        Args:
+            overload_threshold: Utilization từ ngưỡng này trở lên coi là quá tải
+            load_stale_after: Bỏ qua trạng thái tải cũ hơn khoảng này (giây)
+            locality: Dict nhãn region/zone của client, mặc định đọc từ CAPYFACE_REGION/ZONE
+            min_healthy_percent: Phần trăm instance khỏe tối thiểu để giữ traffic trong zone/region
+            spillover_utilization: Utilization trung bình từ ngưỡng này trở lên thì tràn sang zone/region khác
+        """
+        self.overload_threshold = overload_threshold
+        self.load_stale_after = load_stale_after
+        self.locality = locality_from_env() if locality is None else locality
+        self.min_healthy_percent = min_healthy_percent
+        self.spillover_utilization = spillover_utilization
+    
+    def _get_load(self, instance):
+        load = instance.load
+        if not load or time.time() - load.get("updated_at", 0) > self.load_stale_after:
+            return None
+        return load
+    
+    def is_overloaded(self, instance):
+        load = self._get_load(instance)
+        if load is None:
+            return False
+        return load.get("shedding", False) or load.get("utilization", 0) >= self.overload_threshold
+    
+    def load_score(self, instance, outstanding=None):
+        """
+        Điểm tải của instance, càng thấp càng ưu tiên
+        
+        Args:
+            instance: InstanceRecord từ registry
+            outstanding: Dict target -> số request đang chờ phía client
+        """
+        load = self._get_load(instance)
+        score = load.get("utilization", 0) if load else 0
+        if outstanding:
+            score += outstanding.get(instance.target, 0)
+        return score
+    
+    def _select_locality(self, candidates, all_instances):
+        """Giữ lại các candidate cùng zone (hoặc cùng region) nếu nhóm đó đủ khỏe và chưa quá tải"""
+        for label in ("zone", "region"):
+            value = self.locality.get(label)
+            if not value:
+                continue
+            local = [instance for instance in candidates if instance.locality.get(label) == value]
+            if not local:
+                continue
+            total = sum(1 for instance in all_instances if instance.locality.get(label) == value)
+            if len(local) * 100 < total * self.min_healthy_percent:
+                continue
+            utilization = sum((self._get_load(instance) or {}).get("utilization", 0) for instance in local)
+            if utilization / len(local) >= self.spillover_utilization:
+                continue
+            return local
+        return candidates
+    
+    def pick(self, service_name, instances, outstanding=None, all_instances=None):
+        """
+        Chọn một instance
+        
+        Args:
+            service_name: Tên service
+            instances: List các InstanceRecord có thể chọn
+            outstanding: Dict target -> số request đang chờ phía client
+            all_instances: Toàn bộ instance trong registry kể cả đang bị eject,
+                dùng để tính phần trăm instance khỏe theo zone (mặc định là instances)
+        """
+        candidates = [instance for instance in instances if not self.is_overloaded(instance)]
+        if not candidates:
+            # Tất cả đều quá tải thì vẫn phải gửi đi, để server tự shed
+            logger.warning(f"All instances of {service_name} are overloaded")
+            candidates = instances
+        
+        if self.locality and len(candidates) > 1:
+            candidates = self._select_locality(candidates, all_instances or instances)
+        
+        if len(candidates) == 1:
+            return candidates[0]
+        
+        first, second = random.sample(candidates, 2)
+        return first if self.load_score(first, outstanding) <= self.load_score(second, outstanding) else second
@@ -0,0 +1,237 @@
+import inspect
+import logging
+import threading
+import time
+
+import grpc
+
+from .interceptors import wrap_rpc_handler
+
+logger = logging.getLogger('capyface.load_shedding')
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Giới hạn số RPC xử lý đồng thời, tự điều chỉnh theo kiểu AIMD
+    
+    - Tăng cộng (+1/limit mỗi RPC thành công, tức khoảng +1 mỗi "vòng" limit RPC)
+      khi limit đang được sử dụng và latency không vượt quá baseline.
+    - Giảm nhân (limit * backoff_ratio) khi latency vượt latency_tolerance lần baseline
+      hoặc khi RPC bị drop vì chờ trong hàng đợi quá lâu.
+    
+    Baseline là EWMA chậm của latency nên phản ánh latency lúc không quá tải.
+    """
+    
+    def __init__(self, initial_limit=20, min_limit=1, max_limit=1000,
+                 backoff_ratio=0.9, latency_tolerance=2.0, baseline_alpha=0.01):
+        """
+        Args:
+            initial_limit: Limit ban đầu
+            min_limit: Limit tối thiểu
+            max_limit: Limit tối đa
+            backoff_ratio: Hệ số giảm limit khi quá tải
+            latency_tolerance: Latency vượt quá bao nhiêu lần baseline thì coi là quá tải
+            baseline_alpha: Hệ số EWMA của baseline latency
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.baseline_alpha = baseline_alpha
+        
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.rejected = 0
+        self.last_rejected_at = 0.0
+        
+        self._last_decrease_at = 0.0
+        self._lock = threading.Lock()
+    
+    def try_acquire(self):
+        """Xin slot xử lý RPC, trả về False nếu đã đạt limit"""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                self.rejected += 1
+                self.last_rejected_at = time.monotonic()
+                return False
+            self.in_flight += 1
+            return True
+    
+    def release(self, latency):
+        """
+        Trả slot sau khi RPC hoàn thành
+        
+        Args:
+            latency: Thời gian xử lý RPC (giây), None với streaming RPC
+                vì thời gian của stream không phản ánh tải của server
+        """
+        with self._lock:
+            utilized = self.in_flight * 2 >= self.limit
+            self.in_flight -= 1
+            
+            if latency is None:
+                return
+            
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency += self.baseline_alpha * (latency - self.baseline_latency)
+            
+            if latency > self.latency_tolerance * self.baseline_latency:
+                self._decrease()
+            elif utilized:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+    
+    def on_drop(self):
+        """Ghi nhận RPC bị drop vì quá tải (chờ quá lâu trong hàng đợi)"""
+        with self._lock:
+            self.rejected += 1
+            self.last_rejected_at = time.monotonic()
+            self._decrease()
+    
+    def _decrease(self):
+        # Chỉ giảm tối đa một lần mỗi baseline latency để một đợt
+        # quá tải không làm limit sụp về min_limit ngay lập tức
+        now = time.monotonic()
+        if now - self._last_decrease_at < (self.baseline_latency or 0):
+            return
+        self._last_decrease_at = now
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+    
+    def snapshot(self, shedding_window=10):
+        """
+        Trạng thái hiện tại để publish vào registry
+        
+        Args:
+            shedding_window: Coi là đang shedding nếu có RPC bị từ chối trong khoảng này (giây)
+        """
+        limit = int(self.limit)
+        return {
+            "limit": limit,
+            "in_flight": self.in_flight,
+            "utilization": round(self.in_flight / limit, 3) if limit else 1.0,
+            "shedding": time.monotonic() - self.last_rejected_at < shedding_window,
+            "rejected": self.rejected,
+        }
+
+class _LoadSheddingMixin:
+    """Logic admission dùng chung cho interceptor sync và aio"""
+    
+    def __init__(self, limiter=None, target_queue_delay=0.05):
+        """
+        Args:
+            limiter: AdaptiveConcurrencyLimiter, mặc định tạo mới
+            target_queue_delay: Thời gian chờ tối đa trong hàng đợi trước khi bị từ chối (giây)
+        """
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.target_queue_delay = target_queue_delay
+    
+    def _check_admission(self, context, arrived_at):
+        """
+        Kiểm tra RPC có được xử lý không
+        
+        Returns:
+            None nếu được nhận, ngược lại là (status_code, details) để abort
+        """
+        remaining = context.time_remaining()
+        if remaining is not None and remaining <= 0:
+            # Client đã hết deadline khi RPC còn trong hàng đợi, xử lý tiếp là lãng phí
+            self.limiter.on_drop()
+            return grpc.StatusCode.DEADLINE_EXCEEDED, "Deadline expired while queued"
+        
+        queue_delay = time.monotonic() - arrived_at
+        if queue_delay > self.target_queue_delay:
+            self.limiter.on_drop()
+            return (grpc.StatusCode.RESOURCE_EXHAUSTED,
+                    f"Server overloaded: queued for {queue_delay * 1000:.0f}ms")
+        
+        if not self.limiter.try_acquire():
+            return grpc.StatusCode.RESOURCE_EXHAUSTED, "Server overloaded: concurrency limit reached"
+        
+        return None
+    
+    def snapshot(self):
+        return self.limiter.snapshot()
+
+class LoadSheddingInterceptor(_LoadSheddingMixin, grpc.ServerInterceptor):
+    """
+    Server interceptor giới hạn concurrency và từ chối sớm khi quá tải
+    
+    intercept_service được gọi ngay khi RPC tới (trước khi vào thread pool),
+    nên thời gian từ lúc đó tới khi behavior bắt đầu chạy là thời gian chờ trong hàng đợi.
+    """
+    
+    def intercept_service(self, continuation, handler_call_details):
+        arrived_at = time.monotonic()
+        return wrap_rpc_handler(
+            continuation(handler_call_details),
+            lambda behavior, response_streaming: self._wrap(behavior, response_streaming, arrived_at)
+        )
+    
+    def _wrap(self, behavior, response_streaming, arrived_at):
+        limiter = self.limiter
+        
+        if response_streaming:
+            def guarded(request, context):
+                rejection = self._check_admission(context, arrived_at)
+                if rejection:
+                    context.abort(*rejection)
+                try:
+                    yield from behavior(request, context)
+                finally:
+                    limiter.release(None)
+        else:
+            def guarded(request, context):
+                rejection = self._check_admission(context, arrived_at)
+                if rejection:
+                    context.abort(*rejection)
+                started = time.monotonic()
+                try:
+                    return behavior(request, context)
+                finally:
+                    limiter.release(time.monotonic() - started)
+        
+        return guarded
+
+class AioLoadSheddingInterceptor(_LoadSheddingMixin, grpc.aio.ServerInterceptor):
+    """Phiên bản grpc.aio của LoadSheddingInterceptor, thời gian chờ ở đây là độ trễ của event loop"""
+    
+    async def intercept_service(self, continuation, handler_call_details):
+        arrived_at = time.monotonic()
+        return wrap_rpc_handler(
+            await continuation(handler_call_details),
+            lambda behavior, response_streaming: self._wrap(behavior, response_streaming, arrived_at)
+        )
+    
+    def _wrap(self, behavior, response_streaming, arrived_at):
+        limiter = self.limiter
+        
+        if response_streaming:
+            async def guarded(request, context):
+                rejection = self._check_admission(context, arrived_at)
+                if rejection:
+                    await context.abort(*rejection)
+                try:
+                    result = behavior(request, context)
+                    if hasattr(result, '__aiter__'):
+                        async for response in result:
+                            yield response
+                    elif inspect.isawaitable(result):
+                        await result
+                finally:
+                    limiter.release(None)
+        else:
+            async def guarded(request, context):
+                rejection = self._check_admission(context, arrived_at)
+                if rejection:
+                    await context.abort(*rejection)
+                started = time.monotonic()
+                try:
+                    result = behavior(request, context)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    return result
+                finally:
+                    limiter.release(time.monotonic() - started)
+        
+        return guarded
@@ -0,0 +1,193 @@
+import logging
+import statistics
+import threading
+import time
+
+import grpc
+
+logger = logging.getLogger('capyface.outlier_detection')
+
+# Các status code cho thấy lỗi nằm ở instance chứ không phải ở request
+DEFAULT_ERROR_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.UNKNOWN,
+    grpc.StatusCode.DATA_LOSS,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+})
+
+class _TargetState:
+    __slots__ = ('consecutive_errors', 'ewma', 'requests', 'ejection_count', 'ejected_until')
+    
+    def __init__(self):
+        self.consecutive_errors = 0
+        self.ewma = None
+        # Số call thành công trong interval phân tích hiện tại
+        self.requests = 0
+        self.ejection_count = 0
+        self.ejected_until = 0
+
+class OutlierDetector:
+    """
+    Phát hiện và tạm loại (eject) các instance lỗi hoặc chậm bất thường, tương tự outlier detection của Envoy
+    
+    - Lỗi liên tiếp: instance trả về consecutive_errors lỗi (theo error_codes) liên tiếp thì bị eject.
+    - Latency: mỗi interval giây, instance có EWMA latency lớn hơn latency_factor lần median
+      của các instance cùng service (cần ít nhất min_hosts instance có đủ min_requests call) bị eject.
+    - Thời gian eject là base_ejection_time × 2^(số lần đã bị eject), tối đa max_ejection_time;
+      số lần bị eject giảm dần khi instance hoạt động bình thường trở lại.
+    - Không eject quá max_ejection_percent số instance của một service.
+    """
+    
+    def __init__(self, consecutive_errors=5, latency_factor=5, min_requests=20, min_hosts=3, interval=10,
+                 base_ejection_time=30, max_ejection_time=300, max_ejection_percent=50,
+                 error_codes=DEFAULT_ERROR_CODES, alpha=0.1):
+        """
+        Args:
+            consecutive_errors: Số lỗi liên tiếp để eject, 0 để tắt
+            latency_factor: Hệ số so với median latency để eject, None để tắt
+            min_requests: Số call thành công tối thiểu trong interval để instance được xét latency
+            min_hosts: Số instance tối thiểu có đủ dữ liệu để xét latency
+            interval: Khoảng thời gian giữa các lần phân tích latency (giây)
+            base_ejection_time: Thời gian eject lần đầu (giây)
+            max_ejection_time: Thời gian eject tối đa (giây)
+            max_ejection_percent: Phần trăm tối đa số instance của một service bị eject cùng lúc
+            error_codes: Các grpc.StatusCode tính là lỗi của instance
+            alpha: Hệ số EWMA latency
+        """
+        self.consecutive_errors = consecutive_errors
+        self.latency_factor = latency_factor
+        self.min_requests = min_requests
+        self.min_hosts = min_hosts
+        self.interval = interval
+        self.base_ejection_time = base_ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.max_ejection_percent = max_ejection_percent
+        self.error_codes = frozenset(error_codes)
+        self.alpha = alpha
+        
+        # service_name -> {target: _TargetState}
+        self._states = {}
+        # service_name -> số instance trong registry ở lần chọn gần nhất
+        self._instance_counts = {}
+        # service_name -> thời điểm phân tích latency tiếp theo
+        self._next_analysis = {}
+        self._lock = threading.Lock()
+    
+    def _get_state(self, service_name, target):
+        states = self._states.get(service_name)
+        if states is None:
+            states = self._states[service_name] = {}
+        state = states.get(target)
+        if state is None:
+            state = states[target] = _TargetState()
+        return state
+    
+    def record_success(self, service_name, target, latency):
+        """Ghi nhận call thành công tới target với latency (giây)"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._get_state(service_name, target)
+            state.consecutive_errors = 0
+            state.requests += 1
+            state.ewma = latency if state.ewma is None else state.ewma + self.alpha * (latency - state.ewma)
+            if state.ejection_count and now > state.ejected_until + self.base_ejection_time:
+                # Instance đã hoạt động bình thường một thời gian sau khi được nhận lại
+                state.ejection_count -= 1
+                state.ejected_until = now
+            
+            if now >= self._next_analysis.get(service_name, 0):
+                self._next_analysis[service_name] = now + self.interval
+                self._analyze_latency(service_name, now)
+    
+    def record_failure(self, service_name, target, code):
+        """Ghi nhận call tới target lỗi với grpc.StatusCode code"""
+        if code not in self.error_codes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            state = self._get_state(service_name, target)
+            state.consecutive_errors += 1
+            if self.consecutive_errors and state.consecutive_errors >= self.consecutive_errors \
+                    and state.ejected_until <= now:
+                self._eject(service_name, target, state, now, f"{state.consecutive_errors} consecutive errors")
+    
+    def _analyze_latency(self, service_name, now):
+        """Eject các instance chậm bất thường (gọi khi đang giữ lock)"""
+        states = self._states[service_name]
+        candidates = {
+            target: state for target, state in states.items()
+            if state.requests >= self.min_requests and state.ejected_until <= now
+        }
+        for state in states.values():
+            state.requests = 0
+        if not self.latency_factor or len(candidates) < self.min_hosts:
+            return
+        
+        median = statistics.median(state.ewma for state in candidates.values())
+        for target, state in candidates.items():
+            if median > 0 and state.ewma > median * self.latency_factor:
+                self._eject(
+                    service_name, target, state, now,
+                    f"latency {state.ewma * 1000:.1f}ms > {self.latency_factor}x median {median * 1000:.1f}ms"
+                )
+    
+    def _eject(self, service_name, target, state, now, reason):
+        """Eject target nếu chưa vượt max_ejection_percent (gọi khi đang giữ lock)"""
+        states = self._states[service_name]
+        total = max(len(states), self._instance_counts.get(service_name, 0))
+        ejected = sum(1 for other in states.values() if other.ejected_until > now)
+        if (ejected + 1) * 100 > total * self.max_ejection_percent:
+            logger.warning(f"Not ejecting {target} of {service_name} ({reason}): max ejection percent reached")
+            return
+        
+        duration = min(self.max_ejection_time, self.base_ejection_time * 2 ** state.ejection_count)
+        state.ejected_until = now + duration
+        state.ejection_count += 1
+        state.consecutive_errors = 0
+        state.ewma = None
+        logger.warning(f"Ejected {target} of {service_name} for {duration}s: {reason}")
+    
+    def is_ejected(self, service_name, target):
+        state = self._states.get(service_name, {}).get(target)
+        return state is not None and state.ejected_until > time.monotonic()
+    
+    def filter(self, service_name, instances):
+        """
+        Bỏ các instance đang bị eject khỏi danh sách
+        
+        Args:
+            service_name: Tên service
+            instances: List các InstanceRecord từ registry
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._instance_counts[service_name] = len(instances)
+            states = self._states.get(service_name)
+            if not states:
+                return instances
+            ejected = {target for target, state in states.items() if state.ejected_until > now}
+        
+        if not ejected:
+            return instances
+        available = [instance for instance in instances if instance.target not in ejected]
+        # Danh sách instance có thể đã thay đổi sau khi eject, không bao giờ trả về rỗng
+        return available or instances
+    
+    def snapshot(self):
+        """Trạng thái của các instance đã ghi nhận, theo service"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                service_name: {
+                    target: {
+                        "ejected": state.ejected_until > now,
+                        "ejected_for": round(max(0, state.ejected_until - now), 3),
+                        "ejection_count": state.ejection_count,
+                        "consecutive_errors": state.consecutive_errors,
+                        "ewma_ms": round(state.ewma * 1000, 3) if state.ewma is not None else None,
+                    }
+                    for target, state in states.items()
+                }
+                for service_name, states in self._states.items()
+            }
@@ -0,0 +1,51 @@
+from .service_gateway import service_gateway
+
+# Tên service mặc định của friendship service trong registry
+FRIENDSHIP_SERVICE = "friendship_service"
+
+def iter_friend_id_pages(user_id, page_size=1000, stream=True,
+                         service_name=FRIENDSHIP_SERVICE, gateway=None, timeout=None):
+    """
+    Duyệt danh sách bạn bè theo từng trang một cách lazy
+    
+    Args:
+        user_id: ID của user
+        page_size: Số friend_ids tối đa mỗi trang
+        stream: True để dùng StreamFriends (một RPC), False để dùng GetFriendsPage (mỗi trang một RPC)
+        service_name: Tên friendship service trong registry
+        gateway: ServiceGateway sử dụng, mặc định là singleton service_gateway
+        timeout: Deadline cho cả stream hoặc cho mỗi trang (giây)
+    
+    Yields:
+        List friend_ids của mỗi trang
+    """
+    gateway = gateway or service_gateway
+    
+    if stream:
+        pages = gateway.call_server_stream(
+            service_name, "StreamFriends", timeout=timeout,
+            user_id=user_id, page_size=page_size
+        )
+    else:
+        pages = gateway.call_paginated(
+            service_name, "GetFriendsPage", timeout=timeout,
+            user_id=user_id, page_size=page_size
+        )
+    
+    for page in pages:
+        yield page.friend_ids
+
+def iter_friend_ids(user_id, page_size=1000, stream=True,
+                    service_name=FRIENDSHIP_SERVICE, gateway=None, timeout=None):
+    """
+    Duyệt từng friend_id của user, chỉ giữ một trang trong bộ nhớ tại một thời điểm
+    
+    Args:
+        Giống iter_friend_id_pages
+    
+    Yields:
+        friend_id
+    """
+    for friend_ids in iter_friend_id_pages(user_id, page_size, stream,
+                                           service_name, gateway, timeout):
+        yield from friend_ids
@@ -2,7 +2,9 @@ import os
 import importlib
 import inspect
 import logging
-from google.protobuf.descriptor_pb2 import FileDescriptorProto
+import pkgutil
+from google.protobuf.descriptor import FileDescriptor
+from .service_registry import UNARY_UNARY, UNARY_STREAM, STREAM_UNARY, STREAM_STREAM, locality_from_env
 
 logger = logging.getLogger('capyface.proto_discovery')
 
@@ -56,7 +58,7 @@ class ProtoDiscovery:
         
         # Tìm service descriptor
         for name, obj in inspect.getmembers(module):
-            if name == 'DESCRIPTOR' and isinstance(obj, FileDescriptorProto):
+            if name == 'DESCRIPTOR' and isinstance(obj, FileDescriptor):
                 self._process_descriptor(module_name, obj, module)
     
     def _process_descriptor(self, module_name, descriptor, module):
@@ -69,36 +71,83 @@ class ProtoDiscovery:
             module: Module object
         """
         # Tìm service trong descriptor
-        for service in descriptor.service:
+        for service in descriptor.services_by_name.values():
             service_name = service.name.lower() 
-            grpc_module_name = f"{self.generated_package}.{module_name.replace('_pb2', '_pb2_grpc')}"
-            
-            # Import module grpc
-            try:
-                grpc_module = importlib.import_module(grpc_module_name)
-                stub_class = getattr(grpc_module, f"{service.name}Stub")
-            except (ImportError, AttributeError):
-                logger.error(f"Cannot find stub class for service: {service.name}")
-                continue
-            
-            # Đăng ký service
-            self.registry.register_service(
+            self.register_service_descriptor(
                 service_name=service_name,
+                service=service,
+                module_name=module_name,
                 host=os.environ.get(f"{service_name.upper()}_HOST", "localhost"),
                 port=int(os.environ.get(f"{service_name.upper()}_PORT", 50051)),
-                stub_module=grpc_module_name,
-                stub_class=f"{service.name}Stub",
-                methods={}
+                locality=locality_from_env(service_name.upper())
             )
-            
-            # Đăng ký các methods
-            for method in service.method:
-                input_type = method.input_type.name
-                self.registry.register_method(
-                    service_name=service_name,
-                    method_name=method.name,
-                    request_module=f"{self.generated_package}.{module_name}",
-                    request_class=input_type
-                )
-            
-            logger.info(f"Auto-registered service: {service_name}")
\ No newline at end of file
+    
+    def register_service_descriptor(self, service_name, service, module_name, host, port,
+                                    use_tls=False, locality=None):
+        """
+        Đăng ký một service cùng toàn bộ methods từ service descriptor
+        
+        Methods được ghi cùng lúc với service để các client không thấy
+        trạng thái service chưa có methods.
+        
+        Args:
+            service_name: Tên service trong registry
+            service: Service descriptor
+            module_name: Tên module pb2 (không gồm package)
+            host: Host của service
+            port: Port của service
+            use_tls: Có sử dụng TLS không
+            locality: Dict nhãn region/zone/node, mặc định đọc từ CAPYFACE_REGION/ZONE/NODE
+        
+        Returns:
+            True nếu đăng ký thành công
+        """
+        grpc_module_name = f"{self.generated_package}.{module_name.replace('_pb2', '_pb2_grpc')}"
+        
+        # Import module grpc
+        try:
+            grpc_module = importlib.import_module(grpc_module_name)
+            getattr(grpc_module, f"{service.name}Stub")
+        except (ImportError, AttributeError):
+            logger.error(f"Cannot find stub class for service: {service.name}")
+            return False
+        
+        methods = {
+            method.name: {
+                "request_module": f"{self.generated_package}.{module_name}",
+                "request_class": method.input_type.name,
+                "method_type": self._get_method_type(method)
+            }
+            for method in service.methods
+        }
+        
+        # Đăng ký service cùng các methods
+        self.registry.register_service(
+            service_name=service_name,
+            host=host,
+            port=port,
+            use_tls=use_tls,
+            stub_module=grpc_module_name,
+            stub_class=f"{service.name}Stub",
+            methods=methods,
+            locality=locality
+        )
+        
+        logger.info(f"Auto-registered service: {service_name}")
+        return True
+    
+    @staticmethod
+    def _get_method_type(method):
+        """
+        Xác định kiểu RPC của method từ descriptor
+        
+        Args:
+            method: Method descriptor
+        """
+        if method.client_streaming and method.server_streaming:
+            return STREAM_STREAM
+        if method.client_streaming:
+            return STREAM_UNARY
+        if method.server_streaming:
+            return UNARY_STREAM
+        return UNARY_UNARY
\ No newline at end of file
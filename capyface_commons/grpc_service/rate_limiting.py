@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+
+import grpc
+import redis
+
+logger = logging.getLogger('capyface.rate_limiting')
+
+# GCRA (generic cell rate algorithm): key lưu TAT (theoretical arrival time, micro giây).
+# Thời gian lấy từ TIME của Redis để mọi pod dùng chung một đồng hồ.
+# ARGV: emission interval (micro giây/call), tolerance (= emission × burst), số call.
+# Trả về {1, 0} nếu được phép, {0, số micro giây cần chờ} nếu không.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local quantity = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000000 + tonumber(time[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + emission * quantity
+local wait = new_tat - tolerance - now
+if wait > 0 then
+    return {0, math.ceil(wait)}
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000) + 1)
+return {1, 0}
+"""
+
+class RateLimitExceeded(grpc.RpcError):
+    """Call bị rate limit phía client từ chối, code RESOURCE_EXHAUSTED giống lỗi quota của server"""
+    
+    def __init__(self, key, retry_after):
+        super().__init__(f"Rate limit exceeded for {key}, retry after {retry_after:.3f}s")
+        self.key = key
+        self.retry_after = retry_after
+    
+    def code(self):
+        return grpc.StatusCode.RESOURCE_EXHAUSTED
+    
+    def details(self):
+        return str(self)
+
+class TokenBucket:
+    """Token bucket trong process, thread-safe"""
+    
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate: Số token nạp lại mỗi giây
+            burst: Số token tối đa
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def try_acquire(self, tokens=1):
+        """Lấy tokens, trả về 0 nếu thành công hoặc thời gian cần chờ (giây) nếu chưa đủ token"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+    
+    def refund(self, tokens=1):
+        """Trả lại token đã lấy nhưng không dùng"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + tokens)
+
+class RateLimiter:
+    """
+    Rate limit phía client cho một key (caller, service, method), quota chia sẻ giữa mọi pod
+    
+    Mỗi call lấy một token từ token bucket local rồi từ GCRA trong Redis (một lệnh EVALSHA).
+    Token bucket local có cùng rate/burst với quota chung nên pod đã tự vượt quota bị từ chối
+    ngay không tốn round trip Redis, và khi Redis lỗi mỗi pod vẫn bị giới hạn ở rate
+    (Redis không được hỏi lại trong unavailable_backoff giây).
+    
+    Chế độ block chờ tới khi có quota (tối đa max_wait giây), chế độ fail-fast
+    raise RateLimitExceeded ngay.
+    """
+    
+    def __init__(self, key, rate, burst=None, redis_client=None, block=True, max_wait=1,
+                 unavailable_backoff=5, key_prefix="capyface:ratelimit:"):
+        """
+        Args:
+            key: Tên quota, ví dụ "batch-job:user_service:GetUser"
+            rate: Số call mỗi giây
+            burst: Số call tối đa liên tiếp không chờ, mặc định bằng rate (1 giây quota)
+            redis_client: Client Redis để chia sẻ quota giữa các pod, None để chỉ giới hạn trong process
+            block: True để chờ khi hết quota, False để raise RateLimitExceeded ngay
+            max_wait: Thời gian chờ tối đa ở chế độ block (giây)
+            unavailable_backoff: Sau khi Redis lỗi, chỉ dùng token bucket local trong khoảng này (giây)
+            key_prefix: Prefix của key GCRA trong Redis
+        """
+        if rate <= 0:
+            raise ValueError(f"Invalid rate: {rate}")
+        self.key = key
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.block = block
+        self.max_wait = max_wait
+        self.unavailable_backoff = unavailable_backoff
+        self.redis_key = f"{key_prefix}{key}"
+        
+        self.allowed = 0
+        self.rejected = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+        
+        self._bucket = TokenBucket(rate, self.burst)
+        self._emission = 1_000_000 / rate
+        self._script = redis_client.register_script(GCRA_SCRIPT) if redis_client is not None else None
+        self._redis_retry_at = 0
+    
+    def _try_acquire(self):
+        """Thời gian cần chờ (giây), 0 nếu đã lấy được quota"""
+        wait = self._bucket.try_acquire()
+        if wait or self._script is None or time.monotonic() < self._redis_retry_at:
+            return wait
+        
+        try:
+            allowed, wait_us = self._script(
+                keys=[self.redis_key], args=[self._emission, self._emission * self.burst, 1]
+            )
+        except redis.RedisError as e:
+            self._redis_retry_at = time.monotonic() + self.unavailable_backoff
+            logger.warning(f"Redis unavailable, rate limiting {self.key} locally: {e}")
+            return 0
+        
+        if allowed:
+            return 0
+        # Quota chung đã hết, token local chưa được dùng
+        self._bucket.refund()
+        return int(wait_us) / 1_000_000
+    
+    def acquire(self, block=None, max_wait=None):
+        """
+        Lấy quota cho một call
+        
+        Args:
+            block: Ghi đè chế độ block/fail-fast của limiter
+            max_wait: Ghi đè thời gian chờ tối đa (giây)
+        
+        Returns:
+            Thời gian đã chờ (giây)
+        
+        Raises:
+            RateLimitExceeded: Hết quota (ở chế độ block: không có quota trong max_wait)
+        """
+        block = self.block if block is None else block
+        max_wait = self.max_wait if max_wait is None else max_wait
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            waited = time.monotonic() - started
+            if not wait:
+                with self._lock:
+                    self.allowed += 1
+                    self.waited += waited
+                return waited
+            if not block or waited + wait > max_wait:
+                with self._lock:
+                    self.rejected += 1
+                raise RateLimitExceeded(self.key, wait)
+            time.sleep(wait)
+    
+    def snapshot(self):
+        with self._lock:
+            allowed, rejected, waited = self.allowed, self.rejected, self.waited
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "block": self.block,
+            "distributed": self._script is not None,
+            "allowed": allowed,
+            "rejected": rejected,
+            "waited_ms": round(waited * 1000, 3),
+        }
@@ -0,0 +1,175 @@
+import logging
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+
+logger = logging.getLogger('capyface.service_registry')
+
+# Phiên bản format bản ghi service/instance trong registry, tăng khi đổi field không tương thích.
+# Bản ghi không có schema_version là bản ghi được ghi trước khi có versioning (version 1).
+SCHEMA_VERSION = 1
+
+_EMPTY = MappingProxyType({})
+_set = object.__setattr__
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+def _freeze(mapping, intern_values=False):
+    """Dict chỉ đọc, key (và value nếu là nhãn) được intern"""
+    if not mapping:
+        return _EMPTY
+    if intern_values:
+        return MappingProxyType({_intern(key): _intern(value) for key, value in mapping.items()})
+    return MappingProxyType({_intern(key): value for key, value in mapping.items()})
+
+def _schema_version(data, kind):
+    version = data.get("schema_version") or 1
+    if version > SCHEMA_VERSION:
+        logger.warning(f"{kind} record has schema version {version}, newer than supported "
+                       f"version {SCHEMA_VERSION}; unknown fields are ignored")
+    return version
+
+def json_default(value):
+    """Dùng làm default= của json.dumps để serialize các record"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class _Record(Mapping):
+    """
+    Bản ghi registry bất biến với __slots__
+    
+    Truy cập field bằng attribute (record.host) trên hot path. Vẫn đọc được như dict
+    (record["host"], record.get("load"), dict(record), json.dumps(..., default=json_default))
+    để tương thích với code dùng format dict cũ.
+    """
+    __slots__ = ()
+    _fields = ()
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __getitem__(self, key):
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def __iter__(self):
+        return iter(self._fields)
+    
+    def __len__(self):
+        return len(self._fields)
+    
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+    
+    def __reduce__(self):
+        return type(self).from_dict, (self.to_dict(),)
+    
+    def to_dict(self):
+        """Dict (lồng nhau) cùng format với bản ghi lưu trong registry"""
+        return {
+            name: value.to_dict() if isinstance(value, _Record) else (
+                {key: item.to_dict() if isinstance(item, _Record) else item for key, item in value.items()}
+                if isinstance(value, Mapping) else value
+            )
+            for name, value in ((name, getattr(self, name)) for name in self._fields)
+        }
+    
+    def replace(self, **changes):
+        """Bản ghi mới với một số field thay đổi"""
+        return type(self).from_dict({**{name: getattr(self, name) for name in self._fields}, **changes})
+
+class MethodRecord(_Record):
+    """Cấu hình một method của service"""
+    __slots__ = ('request_module', 'request_class', 'method_type')
+    _fields = __slots__
+    
+    def __init__(self, request_module, request_class, method_type):
+        _set(self, 'request_module', _intern(request_module))
+        _set(self, 'request_class', _intern(request_class))
+        _set(self, 'method_type', _intern(method_type))
+    
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        # Các method đăng ký trước khi hỗ trợ streaming được coi là unary (UNARY_UNARY)
+        return cls(data.get("request_module"), data.get("request_class"), data.get("method_type") or "unary_unary")
+
+class ServiceRecord(_Record):
+    """Cấu hình service: stub và các method"""
+    __slots__ = ('schema_version', 'host', 'port', 'use_tls', 'stub_module', 'stub_class', 'methods', 'locality')
+    _fields = __slots__
+    
+    def __init__(self, host, port, use_tls=False, stub_module=None, stub_class=None, methods=None,
+                 locality=None, schema_version=SCHEMA_VERSION):
+        _set(self, 'schema_version', schema_version)
+        _set(self, 'host', _intern(host))
+        _set(self, 'port', port)
+        _set(self, 'use_tls', bool(use_tls))
+        _set(self, 'stub_module', _intern(stub_module))
+        _set(self, 'stub_class', _intern(stub_class))
+        _set(self, 'methods', MappingProxyType({
+            _intern(name): MethodRecord.from_dict(method) for name, method in (methods or {}).items()
+        }) if methods else _EMPTY)
+        _set(self, 'locality', _freeze(locality, intern_values=True))
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Tạo từ dict trong registry (trả về chính data nếu đã là ServiceRecord)"""
+        if isinstance(data, cls):
+            return data
+        return cls(
+            data.get("host"), data.get("port"), data.get("use_tls", False), data.get("stub_module"),
+            data.get("stub_class"), data.get("methods"), data.get("locality"), _schema_version(data, "Service")
+        )
+
+class InstanceRecord(_Record):
+    """Một instance (replica) của service; target là "host:port" dùng làm key của channel/thống kê"""
+    __slots__ = ('schema_version', 'instance_id', 'host', 'port', 'use_tls', 'unix_socket', 'metadata',
+                 'locality', 'load', 'registered_at', 'target')
+    _fields = __slots__[:-1]
+    
+    def __init__(self, instance_id, host, port, use_tls=False, unix_socket=None, metadata=None, locality=None,
+                 load=None, registered_at=None, schema_version=SCHEMA_VERSION):
+        _set(self, 'schema_version', schema_version)
+        _set(self, 'host', _intern(host))
+        _set(self, 'port', port)
+        _set(self, 'target', sys.intern(f"{host}:{port}"))
+        _set(self, 'instance_id', _intern(instance_id) or self.target)
+        _set(self, 'use_tls', bool(use_tls))
+        _set(self, 'unix_socket', unix_socket)
+        _set(self, 'metadata', _freeze(metadata))
+        _set(self, 'locality', _freeze(locality, intern_values=True))
+        _set(self, 'load', _freeze(load) if load else None)
+        _set(self, 'registered_at', registered_at)
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Tạo từ dict trong registry (trả về chính data nếu đã là InstanceRecord)"""
+        if isinstance(data, cls):
+            return data
+        return cls(
+            data.get("instance_id"), data.get("host"), data.get("port"), data.get("use_tls", False),
+            data.get("unix_socket"), data.get("metadata"), data.get("locality"), data.get("load"),
+            data.get("registered_at"), _schema_version(data, "Instance")
+        )
+
+def snapshot_from_dict(data):
+    """Chuyển snapshot {"services": {...}, "instances": {...}} dạng dict sang record"""
+    return {
+        "services": {
+            service_name: ServiceRecord.from_dict(service_info)
+            for service_name, service_info in (data.get("services") or {}).items()
+        },
+        "instances": {
+            service_name: [InstanceRecord.from_dict(instance) for instance in instances]
+            for service_name, instances in (data.get("instances") or {}).items()
+        },
+    }
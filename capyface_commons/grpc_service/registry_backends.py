@@ -0,0 +1,329 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from .records import ServiceRecord, InstanceRecord, snapshot_from_dict
+from .registry_base import BaseServiceRegistry, UNARY_UNARY, read_file_mapped, load_yaml
+
+logger = logging.getLogger('capyface.service_registry')
+
+class InMemoryServiceRegistry(BaseServiceRegistry):
+    """
+    Registry trong bộ nhớ của process, cùng semantics TTL/heartbeat với RedisServiceRegistry
+    
+    Dùng cho unit test, chạy local không cần Redis, hoặc làm layer local của LayeredServiceRegistry.
+    
+    Lưu trực tiếp ServiceRecord/InstanceRecord bất biến nên đọc không cần copy;
+    các thao tác ghi luôn thay bằng record mới.
+    """
+    
+    def __init__(self, service_ttl=300):
+        """
+        Args:
+            service_ttl: Thời gian sống của service/instance nếu không có heartbeat (giây)
+        """
+        self.service_ttl = service_ttl
+        # service_name -> (expires_at, service_info)
+        self._services = {}
+        # service_name -> {instance_id: (expires_at, instance_info)}
+        self._instances = {}
+        self._lock = threading.Lock()
+    
+    def _expires_at(self):
+        return time.monotonic() + self.service_ttl
+    
+    def register_service(self, service_name, host, port, use_tls=False,
+                         stub_module=None, stub_class=None, methods=None, locality=None):
+        """Đăng ký service, tham số giống RedisServiceRegistry.register_service"""
+        service_info = ServiceRecord.from_dict(
+            self._build_service_info(host, port, use_tls, stub_module, stub_class, methods, locality)
+        )
+        with self._lock:
+            self._services[service_name] = (self._expires_at(), service_info)
+        logger.info(f"Registered service: {service_name} at {host}:{port}")
+    
+    def register_method(self, service_name, method_name, request_module, request_class,
+                        method_type=UNARY_UNARY):
+        """Đăng ký method cho service, tham số giống RedisServiceRegistry.register_method"""
+        method_info = self._build_method_info(request_module, request_class, method_type)
+        with self._lock:
+            entry = self._services.get(service_name)
+            if not entry or entry[0] <= time.monotonic():
+                logger.error(f"Service {service_name} not found in registry")
+                return False
+            service_info = entry[1].replace(methods={**entry[1].methods, method_name: method_info})
+            self._services[service_name] = (entry[0], service_info)
+        logger.info(f"Registered method: {service_name}.{method_name}")
+        return True
+    
+    def get_service_config(self, service_name):
+        """Lấy cấu hình của service"""
+        entry = self._services.get(service_name)
+        if not entry or entry[0] <= time.monotonic():
+            logger.warning(f"Service {service_name} not found in registry")
+            return None
+        return entry[1]
+    
+    def get_all_services(self):
+        """Lấy cấu hình của tất cả services"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                service_name: service_info
+                for service_name, (expires_at, service_info) in self._services.items()
+                if expires_at > now
+            }
+    
+    def register_instance(self, service_name, host, port, instance_id=None,
+                          use_tls=False, metadata=None, locality=None, unix_socket=None):
+        """Đăng ký một instance của service, trả về instance_id"""
+        instance_id = instance_id or f"{host}:{port}"
+        instance_info = InstanceRecord.from_dict(self._build_instance_info(
+            instance_id, host, port, use_tls, metadata, locality, unix_socket
+        ))
+        with self._lock:
+            self._instances.setdefault(service_name, {})[instance_id] = (self._expires_at(), instance_info)
+        logger.info(f"Registered instance {instance_id} of service {service_name}")
+        return instance_id
+    
+    def deregister_instance(self, service_name, instance_id):
+        """Hủy đăng ký một instance của service"""
+        with self._lock:
+            self._instances.get(service_name, {}).pop(instance_id, None)
+        logger.info(f"Deregistered instance {instance_id} of service {service_name}")
+    
+    def update_instance_load(self, service_name, instance_id, load):
+        """Cập nhật trạng thái tải của instance, giữ nguyên TTL"""
+        with self._lock:
+            entry = self._instances.get(service_name, {}).get(instance_id)
+            if not entry or entry[0] <= time.monotonic():
+                logger.warning(f"Cannot update load - Instance {instance_id} of {service_name} not found in registry")
+                return False
+            self._instances[service_name][instance_id] = (
+                entry[0], entry[1].replace(load=dict(load, updated_at=time.time()))
+            )
+        return True
+    
+    def get_instances(self, service_name):
+        """Lấy danh sách các instance còn sống của service, xóa các instance đã hết TTL"""
+        now = time.monotonic()
+        with self._lock:
+            instances = self._instances.get(service_name)
+            if not instances:
+                return []
+            for instance_id in [key for key, (expires_at, _) in instances.items() if expires_at <= now]:
+                del instances[instance_id]
+            return [instances[key][1] for key in sorted(instances)]
+    
+    def heartbeat(self, service_name, instance_id=None):
+        """Gia hạn TTL của service (và instance nếu có)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._services.get(service_name)
+            if not entry or entry[0] <= now:
+                logger.warning(f"Cannot send heartbeat - Service {service_name} not found in registry")
+                return False
+            self._services[service_name] = (self._expires_at(), entry[1])
+            
+            if instance_id:
+                instance_entry = self._instances.get(service_name, {}).get(instance_id)
+                if not instance_entry or instance_entry[0] <= now:
+                    logger.warning(f"Cannot send heartbeat - Instance {instance_id} of {service_name} not found in registry")
+                    return False
+                self._instances[service_name][instance_id] = (self._expires_at(), instance_entry[1])
+        
+        logger.debug(f"Heartbeat sent for service {service_name}")
+        return True
+
+class FileServiceRegistry(BaseServiceRegistry):
+    """
+    Registry tĩnh đọc từ file JSON/YAML (read-only), dùng cho local dev hoặc override cấu hình
+    
+    Format file giống output của export_snapshot():
+        
+        {"services": {"user_service": {"host": ..., "port": ..., "stub_module": ..., "stub_class": ...,
+                                       "methods": {...}}},
+         "instances": {"user_service": [{"instance_id": ..., "host": ..., "port": ...}]}}
+    
+    File được đọc qua mmap và tự đọc lại khi mtime thay đổi (kiểm tra tối đa mỗi reload_interval giây);
+    mỗi lần đọc file tạo record một lần.
+    """
+    
+    def __init__(self, path, reload_interval=1):
+        """
+        Args:
+            path: Đường dẫn file .json, .yaml hoặc .yml
+            reload_interval: Khoảng thời gian tối thiểu giữa các lần kiểm tra file thay đổi (giây),
+                None để chỉ đọc một lần
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self._data = {"services": {}, "instances": {}}
+        self._mtime = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        content, stat = read_file_mapped(self.path)
+        
+        if self.path.endswith(('.yaml', '.yml')):
+            data = load_yaml(content) or {}
+        else:
+            data = json.loads(content) if content else {}
+        
+        self._data = snapshot_from_dict(data)
+        self._mtime = stat.st_mtime_ns
+        logger.info(f"Loaded {len(self._data['services'])} services from {self.path}")
+    
+    def _maybe_reload(self):
+        if self.reload_interval is None:
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.reload_interval
+            try:
+                if os.stat(self.path).st_mtime_ns != self._mtime:
+                    self._load()
+            except (OSError, ValueError) as e:
+                # Giữ cấu hình cũ nếu file tạm thời không đọc được (đang ghi dở, ...)
+                logger.error(f"Error reloading registry file {self.path}: {e}")
+    
+    def get_service_config(self, service_name):
+        """Lấy cấu hình của service"""
+        self._maybe_reload()
+        service_info = self._data["services"].get(service_name)
+        if service_info is None:
+            # File thường chỉ khai báo một phần services (ví dụ làm layer override) nên không cảnh báo
+            logger.debug(f"Service {service_name} not found in {self.path}")
+        return service_info
+    
+    def get_all_services(self):
+        """Lấy cấu hình của tất cả services"""
+        self._maybe_reload()
+        return dict(self._data["services"])
+    
+    def get_instances(self, service_name):
+        """Lấy danh sách instance khai báo trong file"""
+        self._maybe_reload()
+        return self._data["instances"].get(service_name, [])
+    
+    def heartbeat(self, service_name, instance_id=None):
+        # Cấu hình tĩnh không có TTL
+        return service_name in self._data["services"]
+    
+    def _read_only(self, *args, **kwargs):
+        raise NotImplementedError(f"FileServiceRegistry ({self.path}) is read-only")
+    
+    register_service = _read_only
+    register_method = _read_only
+    register_instance = _read_only
+    deregister_instance = _read_only
+    update_instance_load = _read_only
+
+class LayeredServiceRegistry(BaseServiceRegistry):
+    """
+    Kết hợp nhiều registry theo thứ tự ưu tiên, với cache read-through trong bộ nhớ
+    
+    Đọc: lấy từ cache nếu còn hạn, nếu không thì hỏi lần lượt từng layer và dùng cấu hình
+    service đầu tiên tìm thấy. Instance luôn được lấy từ chính layer đã cung cấp cấu hình service,
+    để layer override (ví dụ file trỏ service về localhost) không bị instance của layer sau
+    (Redis production) ghi đè; layer đó không khai báo instance thì gateway dùng host/port của cấu hình.
+    Ghi: chuyển cho writer (mặc định layer cuối, thường là Redis làm source of truth) và xóa cache
+    của service đó.
+    
+    Ví dụ: LayeredServiceRegistry([FileServiceRegistry("overrides.yaml"), service_registry], cache_ttl=5)
+    """
+    
+    def __init__(self, layers, cache_ttl=5, writer=None):
+        """
+        Args:
+            layers: List registry theo thứ tự ưu tiên giảm dần
+            cache_ttl: Thời gian cache kết quả đọc (giây), 0 để tắt cache
+            writer: Registry nhận các thao tác ghi, mặc định là layer cuối
+        """
+        if not layers:
+            raise ValueError("LayeredServiceRegistry requires at least one layer")
+        self.layers = list(layers)
+        self.cache_ttl = cache_ttl
+        self.writer = writer or self.layers[-1]
+        # (kind, service_name) -> (expires_at, value)
+        self._cache = {}
+    
+    def _read_through(self, kind, service_name, read):
+        key = (kind, service_name)
+        cached = self._cache.get(key)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        value = read()
+        if value and self.cache_ttl:
+            self._cache[key] = (now + self.cache_ttl, value)
+        return value
+    
+    def _resolve(self, service_name):
+        """(layer, cấu hình service) của layer đầu tiên có service, None nếu không layer nào có"""
+        def read():
+            for layer in self.layers:
+                config = layer.get_service_config(service_name)
+                if config:
+                    return layer, config
+            return None
+        
+        return self._read_through("config", service_name, read)
+    
+    def invalidate(self, service_name=None):
+        """Xóa cache của một service hoặc toàn bộ"""
+        if service_name is None:
+            self._cache.clear()
+            return
+        self._cache.pop(("config", service_name), None)
+        self._cache.pop(("instances", service_name), None)
+    
+    def get_service_config(self, service_name):
+        resolved = self._resolve(service_name)
+        return resolved[1] if resolved else None
+    
+    def get_instances(self, service_name):
+        resolved = self._resolve(service_name)
+        if not resolved:
+            return []
+        layer = resolved[0]
+        return self._read_through("instances", service_name, lambda: layer.get_instances(service_name)) or []
+    
+    def get_all_services(self):
+        """Hợp cấu hình của tất cả layer, layer đứng trước được ưu tiên"""
+        services = {}
+        for layer in reversed(self.layers):
+            services.update(layer.get_all_services())
+        return services
+    
+    def register_service(self, service_name, *args, **kwargs):
+        self.invalidate(service_name)
+        return self.writer.register_service(service_name, *args, **kwargs)
+    
+    def register_method(self, service_name, *args, **kwargs):
+        self.invalidate(service_name)
+        return self.writer.register_method(service_name, *args, **kwargs)
+    
+    def register_instance(self, service_name, *args, **kwargs):
+        self.invalidate(service_name)
+        return self.writer.register_instance(service_name, *args, **kwargs)
+    
+    def deregister_instance(self, service_name, instance_id):
+        self.invalidate(service_name)
+        return self.writer.deregister_instance(service_name, instance_id)
+    
+    def update_instance_load(self, service_name, instance_id, load):
+        return self.writer.update_instance_load(service_name, instance_id, load)
+    
+    def heartbeat(self, service_name, instance_id=None):
+        return self.writer.heartbeat(service_name, instance_id)
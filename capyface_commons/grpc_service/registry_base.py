@@ -0,0 +1,192 @@
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+from .records import SCHEMA_VERSION
+
+logger = logging.getLogger('capyface.service_registry')
+
+# Các kiểu RPC được hỗ trợ (tương ứng với channel.unary_unary, channel.unary_stream, ...)
+UNARY_UNARY = "unary_unary"
+UNARY_STREAM = "unary_stream"
+STREAM_UNARY = "stream_unary"
+STREAM_STREAM = "stream_stream"
+METHOD_TYPES = (UNARY_UNARY, UNARY_STREAM, STREAM_UNARY, STREAM_STREAM)
+
+# Các nhãn locality của service/instance, từ rộng đến hẹp
+LOCALITY_LABELS = ("region", "zone", "node")
+
+def locality_from_env(prefix=None):
+    """
+    Nhãn locality của process từ biến môi trường CAPYFACE_REGION, CAPYFACE_ZONE, CAPYFACE_NODE
+    
+    Args:
+        prefix: Nếu có (ví dụ USER_SERVICE), USER_SERVICE_ZONE, ... được ưu tiên hơn biến chung
+    
+    Returns:
+        Dict chỉ gồm các nhãn có giá trị, ví dụ {"region": "ap-southeast-1", "zone": "ap-southeast-1a"}
+    """
+    locality = {}
+    for label in LOCALITY_LABELS:
+        value = ((prefix and os.environ.get(f"{prefix}_{label.upper()}"))
+                 or os.environ.get(f"CAPYFACE_{label.upper()}"))
+        if value:
+            locality[label] = value
+    return locality
+
+def read_file_mapped(path):
+    """Đọc toàn bộ file qua mmap, trả về (bytes, os.stat_result)"""
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return b"", stat
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[:], stat
+
+def load_yaml(content):
+    """Parse nội dung YAML, cần PyYAML (pip install "capyface-commons[yaml]")"""
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError('PyYAML is required to read YAML files, install "capyface-commons[yaml]"') from None
+    return yaml.safe_load(content)
+
+def write_file_atomic(path, content):
+    """
+    Ghi file bằng cách ghi ra file tạm cùng thư mục rồi rename,
+    để process khác không bao giờ đọc phải file ghi dở
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class BaseServiceRegistry:
+    """
+    Interface chung của các registry backend (Redis, in-memory, file, layered)
+    
+    ServiceGateway chỉ cần get_service_config và get_instances; GrpcServer cần thêm
+    các method đăng ký/heartbeat. Cấu hình service và instance được lưu dưới dạng dict
+    có cùng format (kèm schema_version) ở mọi backend, và được đọc ra dưới dạng
+    ServiceRecord/InstanceRecord bất biến, tạo một lần cho mỗi phiên bản dữ liệu.
+    """
+    
+    def register_service(self, service_name, host, port, use_tls=False,
+                         stub_module=None, stub_class=None, methods=None, locality=None):
+        raise NotImplementedError
+    
+    def register_method(self, service_name, method_name, request_module, request_class,
+                        method_type=UNARY_UNARY):
+        raise NotImplementedError
+    
+    def get_service_config(self, service_name):
+        raise NotImplementedError
+    
+    def get_all_services(self):
+        raise NotImplementedError
+    
+    def register_instance(self, service_name, host, port, instance_id=None,
+                          use_tls=False, metadata=None, locality=None, unix_socket=None):
+        raise NotImplementedError
+    
+    def deregister_instance(self, service_name, instance_id):
+        raise NotImplementedError
+    
+    def update_instance_load(self, service_name, instance_id, load):
+        raise NotImplementedError
+    
+    def get_instances(self, service_name):
+        raise NotImplementedError
+    
+    def heartbeat(self, service_name, instance_id=None):
+        raise NotImplementedError
+    
+    def export_snapshot(self):
+        """Toàn bộ cấu hình service và instance, cùng format với file của FileServiceRegistry"""
+        services = self.get_all_services()
+        return {
+            "services": services,
+            "instances": {
+                service_name: self.get_instances(service_name) for service_name in services
+            },
+        }
+    
+    @staticmethod
+    def _build_service_info(host, port, use_tls=False, stub_module=None, stub_class=None, methods=None,
+                            locality=None):
+        return {
+            "schema_version": SCHEMA_VERSION,
+            "host": host,
+            "port": port,
+            "use_tls": use_tls,
+            "stub_module": stub_module,
+            "stub_class": stub_class,
+            "methods": methods or {},
+            "locality": locality_from_env() if locality is None else locality
+        }
+    
+    @staticmethod
+    def _build_method_info(request_module, request_class, method_type=UNARY_UNARY):
+        if method_type not in METHOD_TYPES:
+            raise ValueError(f"Invalid method type: {method_type}")
+        return {
+            "request_module": request_module,
+            "request_class": request_class,
+            "method_type": method_type
+        }
+    
+    @staticmethod
+    def _build_instance_info(instance_id, host, port, use_tls=False, metadata=None, locality=None,
+                             unix_socket=None):
+        return {
+            "schema_version": SCHEMA_VERSION,
+            "instance_id": instance_id,
+            "host": host,
+            "port": port,
+            "use_tls": use_tls,
+            "unix_socket": unix_socket,
+            "metadata": metadata or {},
+            "locality": locality_from_env() if locality is None else locality,
+            "registered_at": time.time()
+        }
+    
+    def start_heartbeat(self, service_name, interval=60, instance_id=None, stop_event=None, on_expired=None):
+        """
+        Bắt đầu gửi heartbeat định kỳ cho service
+        
+        Args:
+            service_name: Tên service cần gửi heartbeat
+            interval: Khoảng thời gian giữa các lần gửi heartbeat (giây)
+            instance_id: Nếu có, gửi heartbeat cho cả instance
+            stop_event: threading.Event để dừng heartbeat
+            on_expired: Hàm được gọi khi heartbeat thất bại vì service/instance không còn trong registry
+                (đã hết TTL, ví dụ sau khi Redis mất kết nối lâu hơn TTL hoặc bị restart), dùng để đăng ký lại
+        """
+        stop_event = stop_event or threading.Event()
+        
+        def heartbeat_worker():
+            while not stop_event.is_set():
+                try:
+                    if not self.heartbeat(service_name, instance_id) and on_expired and not stop_event.is_set():
+                        on_expired()
+                    stop_event.wait(interval)
+                except Exception as e:
+                    logger.error(f"Error in heartbeat for {service_name}: {e}")
+                    stop_event.wait(5)  # Ngủ một chút khi có lỗi
+        
+        # Khởi động thread
+        thread = threading.Thread(target=heartbeat_worker, daemon=True)
+        thread.start()
+        logger.info(f"Started heartbeat for {service_name} with interval {interval}s")
+        return thread
@@ -0,0 +1,454 @@
+import asyncio
+import importlib
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+from .interceptors import InFlightTracker, InFlightInterceptor, AioInFlightInterceptor
+from .load_shedding import LoadSheddingInterceptor, AioLoadSheddingInterceptor
+from .proto_discovery import ProtoDiscovery
+from .service_registry import service_registry, locality_from_env
+
+try:
+    from grpc_health.v1 import health, health_pb2, health_pb2_grpc
+except ImportError:  # grpcio-health-checking là optional dependency
+    health = None
+
+try:
+    from grpc_reflection.v1alpha import reflection
+except ImportError:  # grpcio-reflection là optional dependency
+    reflection = None
+
+logger = logging.getLogger('capyface.grpc_server')
+
+# Cấu hình mặc định cho server, khớp giới hạn message với ServiceGateway
+DEFAULT_SERVER_OPTIONS = [
+    ('grpc.max_receive_message_length', 100 * 1024 * 1024),  # 100MB max message
+    ('grpc.max_send_message_length', 100 * 1024 * 1024),     # 100MB max message
+    ('grpc.keepalive_time_ms', 60000),                        # Ping client mỗi 60s
+    ('grpc.keepalive_timeout_ms', 20000),
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.min_ping_interval_without_data_ms', 30000),
+    ('grpc.http2.max_pings_without_data', 0),
+]
+
+def default_max_workers():
+    """Số worker mặc định: các service chủ yếu chờ I/O (DB, Redis) nên dùng nhiều thread hơn số CPU"""
+    return min(64, (os.cpu_count() or 1) * 8)
+
+class _ServicerEntry:
+    """Thông tin một servicer đã thêm vào server"""
+    
+    __slots__ = ('add_to_server', 'servicer', 'service_name', 'service', 'pb2_module')
+    
+    def __init__(self, add_to_server, servicer, service_name, service, pb2_module):
+        self.add_to_server = add_to_server
+        self.servicer = servicer
+        self.service_name = service_name
+        self.service = service
+        self.pb2_module = pb2_module
+
+class _BaseGrpcServer:
+    """Phần dùng chung giữa GrpcServer và AioGrpcServer"""
+    
+    def __init__(self, host=None, port=None, advertise_host=None, max_workers=None,
+                 maximum_concurrent_rpcs=None, options=None, interceptors=None,
+                 enable_health=True, enable_reflection=True, registry=None, auto_register=True,
+                 heartbeat_interval=60, grace_period=10, drain_delay=0, instance_metadata=None,
+                 load_shedding=None, load_report_interval=5, locality=None, unix_socket=None):
+        """
+        Args:
+            host: Địa chỉ bind, mặc định GRPC_HOST hoặc [::]
+            port: Port bind, mặc định GRPC_PORT hoặc 50051 (0 để chọn port ngẫu nhiên)
+            advertise_host: Host đăng ký vào registry, mặc định GRPC_ADVERTISE_HOST hoặc hostname
+            max_workers: Số thread xử lý RPC (chỉ áp dụng cho server sync)
+            maximum_concurrent_rpcs: Số RPC đồng thời tối đa, vượt quá sẽ trả RESOURCE_EXHAUSTED
+            options: Channel options bổ sung/ghi đè DEFAULT_SERVER_OPTIONS
+            interceptors: Danh sách server interceptors bổ sung
+            enable_health: Bật grpc.health.v1 (cần grpcio-health-checking)
+            enable_reflection: Bật server reflection (cần grpcio-reflection)
+            registry: Registry để đăng ký, mặc định là service_registry
+            auto_register: Có tự động đăng ký vào registry không
+            heartbeat_interval: Khoảng thời gian giữa các heartbeat (giây)
+            grace_period: Thời gian tối đa chờ các RPC đang chạy khi shutdown (giây)
+            drain_delay: Thời gian chờ sau khi hủy đăng ký để client cập nhật trước khi ngừng nhận RPC (giây)
+            instance_metadata: Dict metadata của instance ghi vào registry
+            load_shedding: True để bật load shedding với cấu hình mặc định, hoặc
+                LoadSheddingInterceptor/AioLoadSheddingInterceptor đã cấu hình
+            load_report_interval: Khoảng thời gian publish trạng thái tải vào registry (giây)
+            locality: Dict nhãn region/zone/node của instance, mặc định đọc từ CAPYFACE_REGION/ZONE/NODE
+            unix_socket: Đường dẫn Unix domain socket lắng nghe thêm (mặc định GRPC_UNIX_SOCKET),
+                ghi vào registry để client cùng node kết nối không qua TCP
+        """
+        self.host = host or os.environ.get('GRPC_HOST', '[::]')
+        self.port = int(port if port is not None else os.environ.get('GRPC_PORT', 50051))
+        self.advertise_host = (advertise_host or os.environ.get('GRPC_ADVERTISE_HOST')
+                               or socket.gethostname())
+        self.max_workers = max_workers or default_max_workers()
+        self.maximum_concurrent_rpcs = maximum_concurrent_rpcs
+        self.options = self._merge_options(options)
+        self.interceptors = list(interceptors or [])
+        self.enable_health = enable_health
+        self.enable_reflection = enable_reflection
+        self.registry = registry or service_registry
+        self.auto_register = auto_register
+        self.heartbeat_interval = heartbeat_interval
+        self.grace_period = grace_period
+        self.drain_delay = drain_delay
+        self.instance_metadata = instance_metadata or {}
+        self.load_shedding = load_shedding
+        self.load_report_interval = load_report_interval
+        self.locality = locality_from_env() if locality is None else locality
+        self.unix_socket = unix_socket or os.environ.get('GRPC_UNIX_SOCKET')
+        
+        self.tracker = InFlightTracker()
+        self.servicers = []
+        self.server = None
+        self.health_servicer = None
+        self.bound_port = None
+        self.instance_id = None
+        
+        self._heartbeat_stop = threading.Event()
+        self._stop_lock = threading.Lock()
+        self._stopping = False
+    
+    @staticmethod
+    def _merge_options(options):
+        merged = dict(DEFAULT_SERVER_OPTIONS)
+        merged.update(dict(options or []))
+        return list(merged.items())
+    
+    @property
+    def in_flight(self):
+        """Số RPC đang được xử lý"""
+        return self.tracker.count
+    
+    def add_servicer(self, add_to_server, servicer, service_name=None):
+        """
+        Thêm servicer vào server
+        
+        Args:
+            add_to_server: Hàm add_XxxServicer_to_server trong module *_pb2_grpc
+            servicer: Instance của servicer
+            service_name: Tên service trong registry, mặc định là tên service trong proto viết thường
+        """
+        if self.server is not None:
+            raise RuntimeError("Cannot add servicer after server has started")
+        
+        # add_UserServiceServicer_to_server -> UserService
+        proto_name = add_to_server.__name__[len('add_'):-len('Servicer_to_server')]
+        pb2_module = importlib.import_module(add_to_server.__module__[:-len('_grpc')])
+        service = pb2_module.DESCRIPTOR.services_by_name[proto_name]
+        
+        self.servicers.append(_ServicerEntry(
+            add_to_server, servicer, service_name or proto_name.lower(), service, pb2_module
+        ))
+        return self
+    
+    def _full_service_names(self):
+        return [entry.service.full_name for entry in self.servicers]
+    
+    def _add_reflection(self):
+        if not self.enable_reflection:
+            return
+        if reflection is None:
+            logger.warning("grpcio-reflection is not installed, server reflection disabled")
+            return
+        
+        service_names = self._full_service_names() + [reflection.SERVICE_NAME]
+        if self.health_servicer is not None:
+            service_names.append(health.SERVICE_NAME)
+        reflection.enable_server_reflection(service_names, self.server)
+    
+    def _add_unix_socket(self):
+        if not self.unix_socket:
+            return
+        # Xóa socket còn sót lại từ lần chạy trước, nếu không bind sẽ lỗi
+        if os.path.exists(self.unix_socket):
+            os.unlink(self.unix_socket)
+        self.server.add_insecure_port(f"unix:{self.unix_socket}")
+    
+    def _register(self):
+        """Đăng ký các service và instance vào registry, bắt đầu heartbeat"""
+        if not self.auto_register:
+            return
+        
+        self.instance_id = f"{self.advertise_host}:{self.bound_port}"
+        for entry in self.servicers:
+            self._register_entry(entry)
+            self.registry.start_heartbeat(
+                entry.service_name,
+                interval=self.heartbeat_interval,
+                instance_id=self.instance_id,
+                stop_event=self._heartbeat_stop,
+                on_expired=lambda entry=entry: self._reregister(entry)
+            )
+        
+        self._start_load_reporter()
+    
+    def _register_entry(self, entry):
+        """Đăng ký cấu hình service (từ proto descriptor) và instance của một servicer"""
+        package, module_name = entry.pb2_module.__name__.rsplit('.', 1)
+        ProtoDiscovery(self.registry, generated_package=package).register_service_descriptor(
+            service_name=entry.service_name,
+            service=entry.service,
+            module_name=module_name,
+            host=self.advertise_host,
+            port=self.bound_port,
+            locality=self.locality
+        )
+        self.registry.register_instance(
+            entry.service_name,
+            self.advertise_host,
+            self.bound_port,
+            instance_id=self.instance_id,
+            metadata=self.instance_metadata,
+            locality=self.locality,
+            unix_socket=self.unix_socket
+        )
+    
+    def _reregister(self, entry):
+        """Đăng ký lại khi heartbeat thấy service/instance đã hết TTL trong registry"""
+        logger.warning(f"Registration of {entry.service_name} ({self.instance_id}) expired, re-registering")
+        self._register_entry(entry)
+    
+    def _start_load_reporter(self):
+        """Định kỳ publish trạng thái load shedding vào bản ghi instance trong registry"""
+        if not self.auto_register or not self.load_shedding:
+            return
+        
+        def report_worker():
+            while not self._heartbeat_stop.wait(self.load_report_interval):
+                load = self.load_shedding.snapshot()
+                for entry in self.servicers:
+                    try:
+                        self.registry.update_instance_load(entry.service_name, self.instance_id, load)
+                    except Exception as e:
+                        logger.error(f"Error reporting load for {entry.service_name}: {e}")
+        
+        threading.Thread(target=report_worker, name='grpc-load-reporter', daemon=True).start()
+    
+    def _deregister(self):
+        """Dừng heartbeat và hủy đăng ký instance khỏi registry"""
+        self._heartbeat_stop.set()
+        if not self.auto_register or self.instance_id is None:
+            return
+        
+        for entry in self.servicers:
+            try:
+                self.registry.deregister_instance(entry.service_name, self.instance_id)
+            except Exception as e:
+                logger.error(f"Error deregistering {entry.service_name}: {e}")
+    
+    def _begin_stop(self):
+        """Đánh dấu bắt đầu shutdown, trả về False nếu đã shutdown trước đó"""
+        with self._stop_lock:
+            if self._stopping:
+                return False
+            self._stopping = True
+            return True
+
+class GrpcServer(_BaseGrpcServer):
+    """
+    gRPC server (sync) với thread pool, health check, reflection,
+    tự động đăng ký registry và graceful drain khi shutdown
+    
+    Ví dụ:
+        server = GrpcServer(port=50051)
+        server.add_servicer(user_service_pb2_grpc.add_UserServiceServicer_to_server, UserServicer())
+        server.serve()
+    """
+    
+    def start(self):
+        """Khởi động server và đăng ký vào registry"""
+        executor = futures.ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='grpc-worker'
+        )
+        if self.load_shedding is True:
+            self.load_shedding = LoadSheddingInterceptor()
+        interceptors = [InFlightInterceptor(self.tracker)]
+        if self.load_shedding:
+            interceptors.append(self.load_shedding)
+        
+        self.server = grpc.server(
+            executor,
+            interceptors=interceptors + self.interceptors,
+            options=self.options,
+            maximum_concurrent_rpcs=self.maximum_concurrent_rpcs
+        )
+        
+        for entry in self.servicers:
+            entry.add_to_server(entry.servicer, self.server)
+        
+        if self.enable_health:
+            if health is None:
+                logger.warning("grpcio-health-checking is not installed, health service disabled")
+            else:
+                self.health_servicer = health.HealthServicer(
+                    experimental_non_blocking=True,
+                    experimental_thread_pool=futures.ThreadPoolExecutor(max_workers=1)
+                )
+                health_pb2_grpc.add_HealthServicer_to_server(self.health_servicer, self.server)
+        
+        self._add_reflection()
+        
+        self.bound_port = self.server.add_insecure_port(f"{self.host}:{self.port}")
+        self._add_unix_socket()
+        self.server.start()
+        
+        if self.health_servicer is not None:
+            for name in self._full_service_names() + ['']:
+                self.health_servicer.set(name, health_pb2.HealthCheckResponse.SERVING)
+        
+        self._register()
+        logger.info(f"gRPC server started on {self.host}:{self.bound_port} "
+                    f"with {self.max_workers} workers")
+        return self
+    
+    def stop(self, grace=None):
+        """
+        Graceful shutdown
+        
+        Thứ tự: health NOT_SERVING -> hủy đăng ký registry -> chờ drain_delay
+        -> ngừng nhận RPC mới -> chờ các RPC đang chạy hoàn thành trong grace
+        
+        Args:
+            grace: Thời gian tối đa chờ các RPC đang chạy (giây), mặc định grace_period
+        """
+        if self.server is None or not self._begin_stop():
+            return
+        
+        grace = self.grace_period if grace is None else grace
+        deadline = time.monotonic() + grace
+        logger.info(f"Shutting down gRPC server, {self.in_flight} RPCs in flight")
+        
+        if self.health_servicer is not None:
+            self.health_servicer.enter_graceful_shutdown()
+        self._deregister()
+        
+        if self.drain_delay:
+            time.sleep(min(self.drain_delay, grace))
+        
+        stopped = self.server.stop(max(0, deadline - time.monotonic()))
+        if self.tracker.wait_idle(max(0, deadline - time.monotonic())):
+            logger.info("All in-flight RPCs drained")
+        else:
+            logger.warning(f"Grace period exceeded, cancelling {self.in_flight} in-flight RPCs")
+        stopped.wait()
+        logger.info("gRPC server stopped")
+    
+    def wait_for_termination(self, timeout=None):
+        return self.server.wait_for_termination(timeout)
+    
+    def serve(self):
+        """Khởi động server, xử lý SIGTERM/SIGINT bằng graceful shutdown và chờ tới khi dừng"""
+        if self.server is None:
+            self.start()
+        
+        def handle_signal(signum, frame):
+            logger.info(f"Received signal {signum}")
+            threading.Thread(target=self.stop, name='grpc-shutdown').start()
+        
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, handle_signal)
+            signal.signal(signal.SIGINT, handle_signal)
+        
+        self.wait_for_termination()
+
+class AioGrpcServer(_BaseGrpcServer):
+    """
+    Phiên bản grpc.aio của GrpcServer, các servicer dùng async def
+    
+    Ví dụ:
+        server = AioGrpcServer(port=50051)
+        server.add_servicer(user_service_pb2_grpc.add_UserServiceServicer_to_server, UserServicer())
+        asyncio.run(server.serve())
+    """
+    
+    async def start(self):
+        """Khởi động server và đăng ký vào registry"""
+        if self.load_shedding is True:
+            self.load_shedding = AioLoadSheddingInterceptor()
+        interceptors = [AioInFlightInterceptor(self.tracker)]
+        if self.load_shedding:
+            interceptors.append(self.load_shedding)
+        
+        self.server = grpc.aio.server(
+            interceptors=interceptors + self.interceptors,
+            options=self.options,
+            maximum_concurrent_rpcs=self.maximum_concurrent_rpcs
+        )
+        
+        for entry in self.servicers:
+            entry.add_to_server(entry.servicer, self.server)
+        
+        if self.enable_health:
+            if health is None:
+                logger.warning("grpcio-health-checking is not installed, health service disabled")
+            else:
+                self.health_servicer = health.aio.HealthServicer()
+                health_pb2_grpc.add_HealthServicer_to_server(self.health_servicer, self.server)
+        
+        self._add_reflection()
+        
+        self.bound_port = self.server.add_insecure_port(f"{self.host}:{self.port}")
+        self._add_unix_socket()
+        await self.server.start()
+        
+        if self.health_servicer is not None:
+            for name in self._full_service_names() + ['']:
+                await self.health_servicer.set(name, health_pb2.HealthCheckResponse.SERVING)
+        
+        # Registry dùng Redis client sync nên chạy trong executor để không block event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._register)
+        logger.info(f"gRPC aio server started on {self.host}:{self.bound_port}")
+        return self
+    
+    async def stop(self, grace=None):
+        """Graceful shutdown, giống GrpcServer.stop"""
+        if self.server is None or not self._begin_stop():
+            return
+        
+        grace = self.grace_period if grace is None else grace
+        deadline = time.monotonic() + grace
+        logger.info(f"Shutting down gRPC aio server, {self.in_flight} RPCs in flight")
+        
+        if self.health_servicer is not None:
+            await self.health_servicer.enter_graceful_shutdown()
+        await asyncio.get_running_loop().run_in_executor(None, self._deregister)
+        
+        if self.drain_delay:
+            await asyncio.sleep(min(self.drain_delay, grace))
+        
+        stopping = asyncio.ensure_future(self.server.stop(max(0, deadline - time.monotonic())))
+        if await self.tracker.async_wait_idle(max(0, deadline - time.monotonic())):
+            logger.info("All in-flight RPCs drained")
+        else:
+            logger.warning(f"Grace period exceeded, cancelling {self.in_flight} in-flight RPCs")
+        await stopping
+        logger.info("gRPC aio server stopped")
+    
+    async def wait_for_termination(self, timeout=None):
+        return await self.server.wait_for_termination(timeout)
+    
+    async def serve(self):
+        """Khởi động server, xử lý SIGTERM/SIGINT bằng graceful shutdown và chờ tới khi dừng"""
+        if self.server is None:
+            await self.start()
+        
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, lambda: asyncio.ensure_future(self.stop()))
+            except (NotImplementedError, RuntimeError):
+                # Không hỗ trợ signal handler (Windows hoặc không phải main thread)
+                pass
+        
+        await self.wait_for_termination()
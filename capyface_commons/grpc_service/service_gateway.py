@@ -1,8 +1,25 @@
-from .service_registry import service_registry
+from .service_registry import (
+    service_registry, UNARY_UNARY, UNARY_STREAM, STREAM_UNARY, STREAM_STREAM
+)
+from .batching import MicroBatcher, DEFAULT_BATCH_SPECS
+from .load_balancer import LoadBalancer
+from .call_stats import CallStats, AdaptiveTimeout
+from .outlier_detection import OutlierDetector
+from .subsetting import RendezvousSubsetter
+from .inprocess import InProcessChannel, INPROCESS_HOST, INPROCESS_PORT
+from .records import ServiceRecord, InstanceRecord
+from .rate_limiting import RateLimiter
+from .admission import PriorityAdmission
+from .traffic_recorder import TrafficRecorder
+from .proto_discovery import ProtoDiscovery
+from .registry_backends import InMemoryServiceRegistry
 import grpc
 import importlib
 import logging
+import os
+import threading
 import time
+from concurrent import futures
 
 logger = logging.getLogger('capyface.service_gateway')
 
@@ -11,33 +28,179 @@ class ServiceGateway:
     Gateway tập trung cho các gRPC services với hỗ trợ timeout và error handling nâng cao
     """
     _instance = None
+    _instance_lock = threading.Lock()
+    # Instance duy nhất của các service đăng ký bằng register_local
+    _inprocess_instance = InstanceRecord(INPROCESS_HOST, INPROCESS_HOST, INPROCESS_PORT)
     
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
-            cls._instance = super(ServiceGateway, cls).__new__(cls)
-            cls._instance._initialized = False
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(ServiceGateway, cls).__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
     
     def __init__(self, 
                  default_timeout=5,  # Mặc định 5 giây
                  max_retries=3,      # Số lần thử lại
-                 retry_delay=1):     # Thời gian chờ giữa các lần thử
+                 retry_delay=1,      # Thời gian chờ giữa các lần thử
+                 default_stream_timeout=300,  # Deadline mặc định cho streaming call
+                 instance_refresh_interval=5,  # Chu kỳ làm mới danh sách instance
+                 registry=None):  # Registry backend, mặc định là Redis service_registry
         if self._initialized:
             return
+        
+        with self._instance_lock:
+            # Thread khác có thể đã khởi tạo xong trong lúc chờ lock
+            if self._initialized:
+                return
+            
+            self.registry = registry or service_registry
+            self.channels = {}
+            self.stubs = {}
+            self.default_timeout = default_timeout
+            self.max_retries = max_retries
+            self.retry_delay = retry_delay
+            self.default_stream_timeout = default_stream_timeout
+            self.batchers = {}
+            # Rate limit phía client: (service_name, method_name hoặc None cho cả service) -> RateLimiter
+            self.rate_limiters = {}
+            self.balancer = LoadBalancer()
+            # Latency theo method, outstanding request theo target và chính sách timeout
+            self.call_stats = CallStats()
+            self.timeout_policy = None
+            # Tạm loại các instance lỗi liên tiếp hoặc chậm bất thường
+            self.outlier_detector = OutlierDetector()
+            # Giới hạn call đồng thời mỗi target với hàng đợi theo priority (tắt mặc định)
+            self.admission = None
+            # Ghi mẫu traffic để replay (start_recording)
+            self.recorder = None
+            # Chỉ kết nối tới một tập con instance của mỗi service (tắt nếu không đặt GRPC_SUBSET_SIZE)
+            subset_size = os.environ.get('GRPC_SUBSET_SIZE')
+            self.subsetter = RendezvousSubsetter(int(subset_size)) if subset_size else None
+            self.instance_refresh_interval = instance_refresh_interval
+            self._instances = {}
+            # Cache cho call_raw: (service_name, method_name) -> path, (target, path) -> callable
+            self._method_paths = {}
+            self._raw_methods = {}
+            # Service đóng gói trong cùng process: service_name -> cấu hình service, gọi qua InProcessChannel
+            self._local_services = {}
+            self._inprocess_channel = InProcessChannel()
+            # Lock cho việc tạo channel/stub, chỉ dùng ở cold path
+            self._stub_lock = threading.Lock()
+            # PID của process tạo ra các channel và các channel kế thừa từ process cha
+            self._pid = os.getpid()
+            self._inherited_channels = []
             
-        self.registry = service_registry
+            self._initialized = True
+        logger.info("ServiceGateway initialized")
+    
+    def _reset_after_fork(self):
+        """
+        Bỏ toàn bộ channel/stub kế thừa từ process cha, gọi trong process con sau fork
+        (đăng ký qua os.register_at_fork)
+        
+        Channel gRPC không dùng được sau fork (pre-fork server như gunicorn, Celery prefork),
+        nên process con tạo lại khi cần. Channel cũ vẫn được giữ reference và không close,
+        vì close hay garbage collect chúng trong process con sẽ đụng tới state của process cha.
+        """
+        logger.info(f"Process forked (pid {self._pid} -> {os.getpid()}), recreating gRPC channels")
+        self._inherited_channels.extend(self.channels.values())
         self.channels = {}
         self.stubs = {}
-        self.default_timeout = default_timeout
-        self.max_retries = max_retries
-        self.retry_delay = retry_delay
+        self._raw_methods = {}
+        self._instances = {}
+        self._stub_lock = threading.Lock()
+        self.call_stats = CallStats(window=self.call_stats.window)
+        if self.admission is not None:
+            self.admission = PriorityAdmission(self.admission.max_concurrency, self.admission.max_queue)
+        # File log của process cha không được ghi xen kẽ từ process con
+        self.recorder = None
+        self.batchers = {
+            key: MicroBatcher(self, batcher.service_name, batcher.spec,
+                              window=batcher.window, max_batch_size=batcher.max_batch_size)
+            for key, batcher in self.batchers.items()
+        }
+        self._pid = os.getpid()
+    
+    def use_registry(self, registry):
+        """
+        Đổi registry backend (ví dụ InMemoryServiceRegistry cho unit test,
+        LayeredServiceRegistry để lookup local trước khi hỏi Redis)
         
-        self._initialized = True
-        logger.info("ServiceGateway initialized")
+        :param registry: Registry cài đặt BaseServiceRegistry
+        """
+        with self._stub_lock:
+            self.registry = registry
+            self.stubs = {}
+            self._method_paths = {}
+            self._instances = {}
+        logger.info(f"ServiceGateway using {type(registry).__name__}")
+    
+    def register_local(self, add_to_server, servicer, service_name=None):
+        """
+        Đăng ký servicer chạy trong cùng process: các call tới service được gọi trực tiếp
+        servicer qua InProcessChannel (không qua socket, không serialize message) thay vì
+        tìm instance trong registry
+        
+        :param add_to_server: Hàm add_XxxServicer_to_server trong module *_pb2_grpc
+        :param servicer: Instance của servicer (sync)
+        :param service_name: Tên service, mặc định là tên service trong proto viết thường
+        """
+        # add_UserServiceServicer_to_server -> UserService
+        proto_name = add_to_server.__name__[len('add_'):-len('Servicer_to_server')]
+        pb2_module = importlib.import_module(add_to_server.__module__[:-len('_grpc')])
+        service = pb2_module.DESCRIPTOR.services_by_name[proto_name]
+        service_name = service_name or proto_name.lower()
+        
+        # Dựng cấu hình service (stub, methods) từ descriptor, giống khi GrpcServer đăng ký vào registry
+        package, module_name = pb2_module.__name__.rsplit('.', 1)
+        local_registry = InMemoryServiceRegistry()
+        ProtoDiscovery(local_registry, generated_package=package).register_service_descriptor(
+            service_name=service_name,
+            service=service,
+            module_name=module_name,
+            host=INPROCESS_HOST,
+            port=INPROCESS_PORT,
+            locality={}
+        )
+        
+        with self._stub_lock:
+            add_to_server(servicer, self._inprocess_channel)
+            self._local_services[service_name] = local_registry.get_service_config(service_name)
+            self.stubs = {key: stub for key, stub in self.stubs.items() if key[0] != service_name}
+            self._method_paths = {key: path for key, path in self._method_paths.items() if key[0] != service_name}
+        logger.info(f"Registered in-process service: {service_name}")
+    
+    def unregister_local(self, service_name):
+        """Bỏ servicer in-process, các call tiếp theo đi qua registry như bình thường"""
+        with self._stub_lock:
+            self._local_services.pop(service_name, None)
+            self.stubs = {key: stub for key, stub in self.stubs.items() if key[0] != service_name}
+            self._method_paths = {key: path for key, path in self._method_paths.items() if key[0] != service_name}
+    
+    def _get_service_config(self, service_name):
+        """Cấu hình service (ServiceRecord): service in-process trước, sau đó registry"""
+        service_config = self._local_services.get(service_name)
+        if service_config is not None:
+            return service_config
+        service_config = self.registry.get_service_config(service_name)
+        # Registry tự viết có thể vẫn trả về dict
+        return ServiceRecord.from_dict(service_config) if service_config else None
     
-    def _create_channel(self, host, port, use_tls=False):
-        """Tạo channel với cấu hình kết nối"""
-        target = f"{host}:{port}"
+    def _is_same_node(self, instance):
+        """Instance có chạy cùng node với process này không (theo nhãn locality node)"""
+        node = self.balancer.locality.get("node")
+        return bool(node) and instance.locality.get("node") == node
+    
+    def _create_channel(self, host, port, use_tls=False, unix_socket=None):
+        """
+        Tạo channel với cấu hình kết nối
+        
+        Nếu có unix_socket thì kết nối qua Unix domain socket thay vì TCP host:port.
+        """
+        target = f"unix:{unix_socket}" if unix_socket else f"{host}:{port}"
         
         # Cấu hình channel options
         channel_options = [
@@ -60,109 +223,834 @@ class ServiceGateway:
             logger.error(f"Error creating gRPC channel to {target}: {e}")
             raise
     
+    def _get_instances(self, service_name):
+        """
+        Lấy danh sách instance của service, cache trong instance_refresh_interval
+        
+        Service chỉ đăng ký bằng register_service (không có instance) được coi
+        như một instance duy nhất với host/port của service. Service đăng ký bằng
+        register_local chỉ có một instance in-process.
+        """
+        if service_name in self._local_services:
+            return [self._inprocess_instance]
+        
+        cached = self._instances.get(service_name)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        try:
+            instances = [InstanceRecord.from_dict(instance) for instance in self.registry.get_instances(service_name)]
+            if not instances:
+                service_config = self._get_service_config(service_name)
+                if not service_config:
+                    raise ValueError(f"Service {service_name} not registered")
+                instances = [InstanceRecord(
+                    None, service_config.host, service_config.port, service_config.use_tls,
+                    locality=service_config.locality
+                )]
+        except ValueError:
+            raise
+        except Exception as e:
+            # Registry lỗi tạm thời thì dùng danh sách cũ nếu có
+            if cached:
+                logger.warning(f"Error refreshing instances of {service_name}, using cached list: {e}")
+                return cached[1]
+            raise
+        
+        if self.subsetter is not None:
+            instances = self.subsetter.select(service_name, instances)
+        self._instances[service_name] = (now + self.instance_refresh_interval, instances)
+        if self.subsetter is not None:
+            self._release_unused_channels()
+        return instances
+    
+    def _release_unused_channels(self):
+        """
+        Bỏ channel tới các target không còn trong subset của service nào
+        
+        Channel được close sau default_stream_timeout để các call/stream đang chạy trên đó kết thúc.
+        """
+        in_use = {instance.target for _, instances in list(self._instances.values()) for instance in instances}
+        with self._stub_lock:
+            unused = [target for target in self.channels if target not in in_use]
+            if not unused:
+                return
+            channels = [self.channels.pop(target) for target in unused]
+            unused = set(unused)
+            for key in [key for key in self.stubs if key[1] in unused]:
+                del self.stubs[key]
+            for key in [key for key in self._raw_methods if key[0] in unused]:
+                del self._raw_methods[key]
+        
+        logger.info(f"Releasing channels to {len(channels)} targets outside the subset: {sorted(unused)}")
+        timer = threading.Timer(self.default_stream_timeout, lambda: [channel.close() for channel in channels])
+        timer.daemon = True
+        timer.start()
+    
+    def _get_channel(self, instance):
+        """
+        Lấy channel tới instance, tạo mới (dưới lock, double-check) nếu chưa có
+        
+        Instance cùng node có đăng ký Unix domain socket (và không dùng TLS) được kết nối qua socket đó.
+        Target (key của channel, thống kê, outlier detection) vẫn là host:port.
+        """
+        if instance is self._inprocess_instance:
+            return instance.target, self._inprocess_channel
+        
+        target = instance.target
+        channel = self.channels.get(target)
+        if channel is not None:
+            return target, channel
+        
+        use_tls = instance.use_tls
+        unix_socket = instance.unix_socket
+        if not unix_socket or use_tls or not self._is_same_node(instance) or not os.path.exists(unix_socket):
+            unix_socket = None
+        
+        with self._stub_lock:
+            channel = self.channels.get(target)
+            if channel is None:
+                channel = self._create_channel(instance.host, instance.port, use_tls, unix_socket)
+                self.channels[target] = channel
+        return target, channel
+    
+    def _pick_instance(self, service_name):
+        """
+        Chọn instance qua load balancer, bỏ qua instance đang bị eject,
+        ưu tiên instance cùng zone và có ít request đang chờ
+        """
+        all_instances = self._get_instances(service_name)
+        instances = all_instances
+        if self.outlier_detector is not None:
+            instances = self.outlier_detector.filter(service_name, all_instances)
+        return self.balancer.pick(
+            service_name, instances, outstanding=self.call_stats.outstanding, all_instances=all_instances
+        )
+    
     def _get_stub(self, service_name):
-        """Lấy stub cho service với caching"""
+        """Chọn instance và lấy stub tương ứng"""
+        return self._pick_stub(service_name)[1]
+    
+    def _pick_stub(self, service_name):
+        """
+        Chọn instance qua load balancer và lấy stub tương ứng với caching
+        
+        Warm path chỉ đọc dict, không lock. Cold path tạo channel/stub dưới lock
+        với double-check để nhiều thread cùng cold start không tạo channel trùng.
+        
+        :return: (target, stub)
+        """
+        return self._get_instance_stub(service_name, self._pick_instance(service_name))
+    
+    def _get_instance_stub(self, service_name, instance):
+        """Lấy stub tới một instance cụ thể, tạo channel/stub nếu chưa có"""
         # Kiểm tra xem đã có stub chưa
-        if service_name in self.stubs:
-            return self.stubs[service_name]
+        target = instance.target
+        stub_key = (service_name, target)
+        stub = self.stubs.get(stub_key)
+        if stub is not None:
+            return target, stub
         
-        # Lấy cấu hình từ registry
-        service_config = self.registry.get_service_config(service_name)
+        # Lấy cấu hình từ registry (ngoài lock để không chặn các service khác)
+        service_config = self._get_service_config(service_name)
         if not service_config:
             raise ValueError(f"Service {service_name} not registered")
         
-        # Tạo channel
-        host = service_config["host"]
-        port = service_config["port"]
-        use_tls = service_config.get("use_tls", False)
-        
-        # Tạo hoặc lấy channel đã tồn tại
-        target = f"{host}:{port}"
-        if target not in self.channels:
-            self.channels[target] = self._create_channel(host, port, use_tls)
-        
         # Import stub class
         try:
-            stub_module = importlib.import_module(service_config["stub_module"])
-            stub_class = getattr(stub_module, service_config["stub_class"])
+            stub_module = importlib.import_module(service_config.stub_module)
+            stub_class = getattr(stub_module, service_config.stub_class)
         except (ImportError, AttributeError) as e:
             logger.error(f"Error importing stub for {service_name}: {e}")
             raise
         
-        # Tạo stub
-        self.stubs[service_name] = stub_class(self.channels[target])
-        return self.stubs[service_name]
+        # Tạo hoặc lấy channel đã tồn tại
+        _, channel = self._get_channel(instance)
+        
+        with self._stub_lock:
+            stub = self.stubs.get(stub_key)
+            if stub is None:
+                # Tạo stub
+                stub = stub_class(channel)
+                self.stubs[stub_key] = stub
+        return target, stub
     
-    def call(self, service_name, method_name, timeout=None, **kwargs):
+    def warmup(self, services=None, timeout=10, max_workers=16):
         """
-        Gọi method từ service với hỗ trợ retry và timeout
+        Chuẩn bị trước cho các service để call đầu tiên sau khi deploy không phải chờ:
+        đọc cấu hình từ registry, import stub và request class, tạo channel/stub tới
+        mọi instance (trong subset) và chờ các channel READY, song song theo target
         
-        :param service_name: Tên service
-        :param method_name: Tên method
-        :param timeout: Thời gian timeout (giây)
-        :param kwargs: Các tham số cho method
-        :return: Kết quả gọi method
+        Dùng được cho readiness probe: report["ready"] là True khi mọi service có ít nhất
+        một instance kết nối được.
+        
+        :param services: List tên service, mặc định là tất cả service trong registry và service in-process
+        :param timeout: Thời gian chờ tối đa cho toàn bộ warmup (giây)
+        :param max_workers: Số target kết nối song song tối đa
+        :return: Dict {"ready", "elapsed_ms", "services": {service: {"instances", "ready_instances", "error"}},
+                 "targets": {target: {"ready", "elapsed_ms", "error"}}}
         """
-        # Sử dụng timeout mặc định nếu không được cung cấp
-        if timeout is None:
-            timeout = self.default_timeout
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        if services is None:
+            services = sorted(set(self.registry.get_all_services()) | set(self._local_services))
+        
+        report = {"ready": True, "services": {}, "targets": {}}
+        jobs = {}
+        for service_name in services:
+            try:
+                service_config = self._get_service_config(service_name)
+                if not service_config:
+                    raise ValueError(f"Service {service_name} not registered")
+                for method_name, method_config in service_config.methods.items():
+                    self._get_request_class(method_config)
+                    if method_config.method_type == UNARY_UNARY:
+                        self._get_method_path(service_name, method_name)
+                instances = self._get_instances(service_name)
+            except Exception as e:
+                logger.warning(f"Warmup of {service_name} failed: {e}")
+                report["ready"] = False
+                report["services"][service_name] = {"instances": 0, "ready_instances": 0, "error": str(e)}
+                continue
+            
+            report["services"][service_name] = {"instances": len(instances), "ready_instances": 0, "error": None}
+            for instance in instances:
+                jobs.setdefault(instance.target, []).append((service_name, instance))
         
-        # Lấy stub
-        stub = self._get_stub(service_name)
+        def connect(entries):
+            target_started = time.perf_counter()
+            for service_name, instance in entries:
+                self._get_instance_stub(service_name, instance)
+            _, channel = self._get_channel(entries[0][1])
+            if channel is not self._inprocess_channel:
+                grpc.channel_ready_future(channel).result(timeout=max(0, deadline - time.monotonic()))
+            return round((time.perf_counter() - target_started) * 1000, 3)
         
-        # Lấy thông tin method
-        service_config = self.registry.get_service_config(service_name)
-        method_config = service_config.get("methods", {}).get(method_name)
+        if jobs:
+            with futures.ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+                pending = {target: executor.submit(connect, entries) for target, entries in jobs.items()}
+                for target, future in pending.items():
+                    try:
+                        report["targets"][target] = {"ready": True, "elapsed_ms": future.result(), "error": None}
+                    except Exception as e:
+                        error = "timeout" if isinstance(e, grpc.FutureTimeoutError) else str(e)
+                        logger.warning(f"Warmup of {target} failed: {error}")
+                        report["targets"][target] = {"ready": False, "elapsed_ms": None, "error": error}
+                        continue
+                    for service_name, _ in jobs[target]:
+                        report["services"][service_name]["ready_instances"] += 1
+        
+        for service_name, service_report in report["services"].items():
+            if not service_report["ready_instances"]:
+                report["ready"] = False
+        
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(f"Warmup of {len(report['services'])} services and {len(jobs)} targets "
+                    f"finished in {report['elapsed_ms']}ms (ready: {report['ready']})")
+        return report
+    
+    def _get_method_path(self, service_name, method_name):
+        """
+        Đường dẫn gRPC (/package.Service/Method) của method unary, lấy từ descriptor
+        của module pb2 tương ứng với stub đã đăng ký
+        """
+        path = self._method_paths.get((service_name, method_name))
+        if path is not None:
+            return path
+        
+        service_config = self._get_service_config(service_name)
+        if not service_config:
+            raise ValueError(f"Service {service_name} not registered")
+        
+        try:
+            pb2_module = importlib.import_module(service_config.stub_module[:-len("_grpc")])
+            service_descriptor = pb2_module.DESCRIPTOR.services_by_name[service_config.stub_class[:-len("Stub")]]
+        except (ImportError, KeyError) as e:
+            logger.error(f"Error resolving descriptor for {service_name}: {e}")
+            raise ValueError(f"Cannot resolve proto descriptor for service {service_name}")
+        
+        method = service_descriptor.methods_by_name.get(method_name)
+        if method is None:
+            raise ValueError(f"Method {method_name} not found in {service_descriptor.full_name}")
+        if method.client_streaming or method.server_streaming:
+            raise ValueError(f"Method {service_name}.{method_name} is not unary")
+        
+        path = f"/{service_descriptor.full_name}/{method_name}"
+        self._method_paths[(service_name, method_name)] = path
+        return path
+    
+    def _get_raw_method(self, service_name, method_path):
+        """
+        Chọn instance và lấy unary callable không serialize/deserialize (bytes vào, bytes ra)
+        
+        :return: (target, callable)
+        """
+        target, channel = self._get_channel(self._pick_instance(service_name))
+        
+        method = self._raw_methods.get((target, method_path))
+        if method is None:
+            # Không truyền serializer: request và response được gửi nguyên dạng bytes
+            method = channel.unary_unary(method_path)
+            self._raw_methods[(target, method_path)] = method
+        return target, method
+    
+    def _timed_call(self, target, service_name, method_name, method, request, priority=None, **kwargs):
+        """
+        Gọi unary method (một lần thử), ghi nhận outstanding request của target, latency của method
+        và kết quả cho outlier detection
+        
+        Nếu bật priority admission, call chờ slot của target trước (thời gian chờ tính vào timeout).
+        """
+        admission = self.admission
+        if admission is not None:
+            timeout = kwargs.get('timeout')
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            admission.acquire(target, priority, deadline)
+            if deadline is not None:
+                kwargs['timeout'] = max(0, deadline - time.monotonic())
+        
+        detector = self.outlier_detector
+        self.call_stats.begin(target)
+        started = time.perf_counter()
+        latency = None
+        try:
+            response = method(request, **kwargs)
+            latency = time.perf_counter() - started
+        except grpc.RpcError as e:
+            if detector is not None:
+                detector.record_failure(service_name, target, e.code())
+            raise
+        finally:
+            self.call_stats.end(target, service_name, method_name, latency)
+            if admission is not None:
+                admission.release(target, latency)
+        
+        if detector is not None:
+            detector.record_success(service_name, target, latency)
+        return response
+    
+    def use_adaptive_timeouts(self, percentile=99, multiplier=3, min_timeout=0.05, max_timeout=None,
+                              min_samples=100):
+        """
+        Dùng timeout theo latency thực tế của từng method thay cho default_timeout
+        khi call không truyền timeout: percentile × multiplier, giới hạn trong [min_timeout, max_timeout]
+        
+        :param percentile: Percentile latency làm cơ sở
+        :param multiplier: Hệ số nhân
+        :param min_timeout: Timeout tối thiểu (giây)
+        :param max_timeout: Timeout tối đa (giây), mặc định là default_timeout
+        :param min_samples: Số mẫu tối thiểu trước khi áp dụng cho một method
+        """
+        self.timeout_policy = AdaptiveTimeout(percentile, multiplier, min_timeout, max_timeout, min_samples)
+    
+    def disable_adaptive_timeouts(self):
+        """Quay lại dùng default_timeout cho mọi method"""
+        self.timeout_policy = None
+    
+    def use_outlier_detection(self, consecutive_errors=5, latency_factor=5, base_ejection_time=30,
+                              max_ejection_time=300, max_ejection_percent=50, **kwargs):
+        """
+        Cấu hình lại outlier detection (mặc định đã bật), xóa trạng thái eject hiện tại
+        
+        :param consecutive_errors: Số lỗi liên tiếp để eject instance, 0 để tắt
+        :param latency_factor: Eject instance có latency lớn hơn hệ số này lần median của service, None để tắt
+        :param base_ejection_time: Thời gian eject lần đầu (giây), tăng gấp đôi sau mỗi lần bị eject lại
+        :param max_ejection_time: Thời gian eject tối đa (giây)
+        :param max_ejection_percent: Phần trăm tối đa số instance của một service bị eject cùng lúc
+        :param kwargs: Các tham số khác của OutlierDetector
+        """
+        self.outlier_detector = OutlierDetector(
+            consecutive_errors=consecutive_errors, latency_factor=latency_factor,
+            base_ejection_time=base_ejection_time, max_ejection_time=max_ejection_time,
+            max_ejection_percent=max_ejection_percent, **kwargs
+        )
+    
+    def disable_outlier_detection(self):
+        """Gửi request tới mọi instance trong registry bất kể lỗi/latency"""
+        self.outlier_detector = None
+    
+    def use_subsetting(self, subset_size, client_id=None):
+        """
+        Chỉ kết nối tới tập con subset_size instance của mỗi service, chọn bằng rendezvous hashing
+        để subset ổn định và thay đổi tối thiểu khi instance tham gia/rời đi
+        
+        :param subset_size: Số instance tối đa mỗi service, None để tắt
+        :param client_id: ID ổn định của client, mặc định là hostname (tên pod)
+        """
+        self.subsetter = (
+            RendezvousSubsetter(subset_size, client_id, locality=self.balancer.locality)
+            if subset_size else None
+        )
+        # Tính lại danh sách instance ở lần gọi tiếp theo
+        self._instances = {}
+    
+    def use_priority_admission(self, max_concurrency=64, max_queue=256):
+        """
+        Giới hạn số call unary đồng thời tới mỗi target; call vượt giới hạn chờ trong hàng đợi
+        theo priority (tham số priority của call/call_raw) và bị loại khi không còn kịp deadline,
+        để traffic interactive giữ được latency khi service đích bão hòa
+        
+        :param max_concurrency: Số call đồng thời tối đa tới mỗi target
+        :param max_queue: Số call chờ tối đa của mỗi target
+        """
+        self.admission = PriorityAdmission(max_concurrency, max_queue)
+    
+    def disable_priority_admission(self):
+        """Bỏ giới hạn call đồng thời, call đang chờ vẫn được xử lý bởi admission cũ"""
+        self.admission = None
+    
+    def start_recording(self, path, sample_rate=0.01, max_bytes=1024 * 1024 * 1024):
+        """
+        Ghi mẫu các call unary (call, call_raw) ra file log nhị phân để replay bằng
+        capyface-bench replay; dừng recording đang chạy nếu có
+        
+        :param path: File log
+        :param sample_rate: Tỉ lệ call được ghi (0-1)
+        :param max_bytes: Dừng ghi khi file đạt kích thước này (bytes)
+        :return: TrafficRecorder
+        """
+        self.stop_recording()
+        self.recorder = TrafficRecorder(path, sample_rate=sample_rate, max_bytes=max_bytes)
+        logger.info(f"Recording {sample_rate:.2%} of calls to {path}")
+        return self.recorder
+    
+    def stop_recording(self):
+        """Dừng ghi traffic và đóng file log"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+    
+    def _get_default_timeout(self, service_name, method_name):
+        """Timeout cho call không truyền timeout"""
+        if self.timeout_policy is None:
+            return self.default_timeout
+        return self.timeout_policy.timeout_for(
+            self.call_stats.get_method(service_name, method_name), self.default_timeout
+        )
+    
+    def get_stats(self):
+        """
+        Thống kê của gateway: latency (EWMA, p50, p99) và timeout đang áp dụng của từng method,
+        số request đang chờ theo target và trạng thái outlier detection của từng instance
+        """
+        stats = self.call_stats.snapshot(self.timeout_policy, self.default_timeout)
+        if self.outlier_detector is not None:
+            stats["outliers"] = self.outlier_detector.snapshot()
+        if self.admission is not None:
+            stats["admission"] = self.admission.snapshot()
+        if self.rate_limiters:
+            stats["rate_limits"] = {limiter.key: limiter.snapshot() for limiter in self.rate_limiters.values()}
+        return stats
+    
+    def _get_method_config(self, service_name, method_name, method_type=UNARY_UNARY):
+        """Lấy cấu hình method và kiểm tra kiểu RPC"""
+        service_config = self._get_service_config(service_name)
+        method_config = service_config.methods.get(method_name) if service_config else None
         
         if not method_config:
             raise ValueError(f"Method {method_name} not registered for service {service_name}")
         
-        # Import request class
+        # Các method đăng ký trước khi hỗ trợ streaming được coi là unary (MethodRecord mặc định UNARY_UNARY)
+        registered_type = method_config.method_type
+        if registered_type != method_type:
+            raise ValueError(
+                f"Method {service_name}.{method_name} is {registered_type}, not {method_type}"
+            )
+        
+        return method_config
+    
+    def _get_request_class(self, method_config):
+        """Import request class của method"""
         try:
-            request_module = importlib.import_module(method_config["request_module"])
-            request_class = getattr(request_module, method_config["request_class"])
+            request_module = importlib.import_module(method_config.request_module)
+            return getattr(request_module, method_config.request_class)
         except (ImportError, AttributeError) as e:
             logger.error(f"Error importing request class: {e}")
             raise
+    
+    @staticmethod
+    def _build_request(request_class, request):
+        """Tạo request object từ dict hoặc giữ nguyên nếu đã là message"""
+        if isinstance(request, request_class):
+            return request
+        return request_class(**request)
+    
+    def _should_retry(self, error, attempt):
+        """
+        Quyết định có retry sau lỗi gRPC hay không, chờ backoff nếu có
+        
+        :param error: grpc.RpcError
+        :param attempt: Lần thử hiện tại (bắt đầu từ 0)
+        :return: True nếu nên thử lại
+        """
+        logger.warning(f"gRPC call failed (attempt {attempt + 1}): {error}")
+        
+        # Kiểm tra mã lỗi để quyết định retry
+        if error.code() not in [
+            grpc.StatusCode.UNAVAILABLE,      # Service không khả dụng
+            grpc.StatusCode.DEADLINE_EXCEEDED,# Hết thời gian chờ
+            grpc.StatusCode.INTERNAL,         # Lỗi nội bộ
+        ]:
+            # Các lỗi khác không retry
+            return False
+        
+        if attempt >= self.max_retries - 1:
+            # Lần thử cuối
+            logger.error(f"Final attempt failed: {error}")
+            return False
+        
+        time.sleep(self.retry_delay * (2 ** attempt))  # Exponential backoff
+        return True
+    
+    def enable_batching(self, service_name, method_name, spec=None, window=0.002, max_batch_size=100):
+        """
+        Bật micro-batching: các call đồng thời tới method trong cùng cửa sổ
+        sẽ được gộp thành một batch RPC
+        
+        :param service_name: Tên service
+        :param method_name: Tên method đơn lẻ (ví dụ AreFriends)
+        :param spec: BatchSpec, mặc định lấy theo DEFAULT_BATCH_SPECS
+        :param window: Thời gian tối đa chờ gộp call (giây)
+        :param max_batch_size: Số call tối đa trong một batch
+        """
+        spec = spec or DEFAULT_BATCH_SPECS.get(method_name)
+        if spec is None:
+            raise ValueError(f"No batch spec for method {method_name}")
+        
+        self.batchers[(service_name, method_name)] = MicroBatcher(
+            self, service_name, spec, window=window, max_batch_size=max_batch_size
+        )
+        logger.info(f"Enabled batching for {service_name}.{method_name} via {spec.batch_method}")
+    
+    def disable_batching(self, service_name, method_name):
+        """Tắt micro-batching cho method"""
+        self.batchers.pop((service_name, method_name), None)
+    
+    def enable_rate_limit(self, service_name, rate, method_name=None, burst=None, block=True, max_wait=1,
+                          caller=None, distributed=True):
+        """
+        Giới hạn số call mỗi giây từ caller tới service (hoặc một method), quota chia sẻ giữa
+        mọi pod của caller qua Redis của registry (ví dụ để batch job không làm nghẽn traffic interactive)
+        
+        :param service_name: Tên service
+        :param rate: Số call mỗi giây
+        :param method_name: Tên method, None để áp dụng cho mọi method chưa có rate limit riêng
+        :param burst: Số call tối đa liên tiếp không chờ, mặc định bằng rate
+        :param block: True để chờ khi hết quota (tối đa max_wait giây), False để raise RateLimitExceeded ngay
+        :param max_wait: Thời gian chờ tối đa ở chế độ block (giây)
+        :param caller: Tên caller (key của quota), mặc định CAPYFACE_CALLER hoặc "default"
+        :param distributed: False để chỉ giới hạn trong process; registry không dùng Redis thì luôn là local
+        """
+        caller = caller or os.environ.get('CAPYFACE_CALLER', 'default')
+        redis_client = getattr(self.registry, 'redis', None) if distributed else None
+        self.rate_limiters[(service_name, method_name)] = RateLimiter(
+            f"{caller}:{service_name}:{method_name or '*'}", rate, burst=burst, redis_client=redis_client,
+            block=block, max_wait=max_wait
+        )
+        logger.info(f"Enabled rate limit of {rate}/s for {caller} -> {service_name}.{method_name or '*'}")
+    
+    def disable_rate_limit(self, service_name, method_name=None):
+        """Bỏ rate limit của service (method_name=None) hoặc của method"""
+        self.rate_limiters.pop((service_name, method_name), None)
+    
+    def _acquire_rate_limit(self, service_name, method_name, timeout):
+        """
+        Lấy quota nếu method (hoặc cả service) có rate limit, raise RateLimitExceeded nếu hết quota
+        
+        :return: timeout còn lại sau khi trừ thời gian chờ quota
+        """
+        limiter = self.rate_limiters.get((service_name, method_name)) or self.rate_limiters.get((service_name, None))
+        if limiter is None:
+            return timeout
+        waited = limiter.acquire()
+        return timeout if timeout is None else max(0, timeout - waited)
+    
+    def call(self, service_name, method_name, timeout=None, request=None, priority=None, **kwargs):
+        """
+        Gọi method từ service với hỗ trợ retry và timeout
+        
+        :param service_name: Tên service
+        :param method_name: Tên method
+        :param timeout: Thời gian timeout (giây)
+        :param request: Request message đã tạo sẵn (dùng thay cho kwargs, không copy)
+        :param priority: "high", "normal" (mặc định) hoặc "low", dùng khi bật use_priority_admission
+        :param kwargs: Các tham số cho method
+        :return: Kết quả gọi method
+        """
+        # Sử dụng timeout mặc định (hoặc adaptive timeout) nếu không được cung cấp
+        if timeout is None:
+            timeout = self._get_default_timeout(service_name, method_name)
+        if self.rate_limiters:
+            timeout = self._acquire_rate_limit(service_name, method_name, timeout)
+        
+        # Gộp vào batch RPC nếu method đã bật micro-batching
+        batcher = self.batchers.get((service_name, method_name))
+        if batcher is not None and request is None:
+            return batcher.submit(timeout=timeout, priority=priority, **kwargs)
         
-        # Tạo request object
-        request = request_class(**kwargs)
+        return self._call_unary(service_name, method_name, timeout, request, priority, **kwargs)
+    
+    def _call_unary(self, service_name, method_name, timeout, request=None, priority=None, **kwargs):
+        """
+        Gọi unary method với retry, không qua rate limit và micro-batching
+        
+        MicroBatcher dùng trực tiếp cho batch RPC: quota đã được lấy theo từng call đơn lẻ trong batch.
+        Nếu đang ghi traffic, cả call (gồm các lần retry) được ghi thành một mẫu.
+        """
+        # Lấy thông tin method và tạo request object
+        method_config = self._get_method_config(service_name, method_name)
+        if request is None:
+            request = self._get_request_class(method_config)(**kwargs)
         
-        # Lấy method từ stub
-        method = getattr(stub, method_name)
+        recorder = self.recorder
+        started = time.perf_counter()
         
         # Thực hiện gọi method với retry
         for attempt in range(self.max_retries):
             try:
+                # Chọn instance ở mỗi lần thử để retry có thể sang instance khác
+                target, stub = self._pick_stub(service_name)
+                
                 # Gọi method với timeout
-                response = method(request, timeout=timeout)
-                return response
+                response = self._timed_call(
+                    target, service_name, method_name, getattr(stub, method_name), request,
+                    priority=priority, timeout=timeout
+                )
             
             except grpc.RpcError as e:
-                # Xử lý các lỗi gRPC cụ thể
-                logger.warning(f"gRPC call failed (attempt {attempt + 1}): {e}")
-                
-                # Kiểm tra mã lỗi để quyết định retry
-                if e.code() in [
-                    grpc.StatusCode.UNAVAILABLE,      # Service không khả dụng
-                    grpc.StatusCode.DEADLINE_EXCEEDED,# Hết thời gian chờ
-                    grpc.StatusCode.INTERNAL,         # Lỗi nội bộ
-                ]:
-                    # Nếu chưa phải lần thử cuối, chờ và thử lại
-                    if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay * (2 ** attempt))  # Exponential backoff
-                    else:
-                        # Lần thử cuối, raise exception
-                        logger.error(f"Final attempt failed: {e}")
-                        raise
-                else:
-                    # Các lỗi khác không retry
+                if not self._should_retry(e, attempt):
+                    if recorder is not None:
+                        recorder.record(service_name, method_name, request, time.perf_counter() - started, e.code())
                     raise
             
             except Exception as e:
                 # Bắt các ngoại lệ không mong muốn
                 logger.error(f"Unexpected error in service call: {e}")
                 raise
+            
+            else:
+                if recorder is not None:
+                    recorder.record(service_name, method_name, request, time.perf_counter() - started)
+                return response
+    
+    def call_raw(self, service_name, method_name, payload, timeout=None, metadata=None, priority=None):
+        """
+        Gọi method unary với request đã serialize và nhận response dạng bytes,
+        không parse/serialize protobuf (dùng cho API gateway proxy payload)
+        
+        :param service_name: Tên service
+        :param method_name: Tên method
+        :param payload: Request đã serialize (bytes) hoặc protobuf message
+        :param timeout: Thời gian timeout (giây)
+        :param metadata: gRPC metadata gửi kèm
+        :param priority: "high", "normal" (mặc định) hoặc "low", dùng khi bật use_priority_admission
+        :return: Response đã serialize (bytes)
+        """
+        if timeout is None:
+            timeout = self._get_default_timeout(service_name, method_name)
+        if hasattr(payload, 'SerializeToString'):
+            payload = payload.SerializeToString()
+        elif not isinstance(payload, bytes):
+            payload = bytes(payload)
+        if self.rate_limiters:
+            timeout = self._acquire_rate_limit(service_name, method_name, timeout)
+        
+        method_path = self._get_method_path(service_name, method_name)
+        recorder = self.recorder
+        started = time.perf_counter()
+        
+        for attempt in range(self.max_retries):
+            try:
+                # Chọn instance ở mỗi lần thử để retry có thể sang instance khác
+                target, method = self._get_raw_method(service_name, method_path)
+                response = self._timed_call(
+                    target, service_name, method_name, method, payload,
+                    priority=priority, timeout=timeout, metadata=metadata
+                )
+            
+            except grpc.RpcError as e:
+                if not self._should_retry(e, attempt):
+                    if recorder is not None:
+                        recorder.record(service_name, method_name, payload, time.perf_counter() - started, e.code())
+                    raise
+            
+            else:
+                # Ghi một mẫu cho cả call, không phải cho từng lần retry
+                if recorder is not None:
+                    recorder.record(service_name, method_name, payload, time.perf_counter() - started)
+                return response
+    
+    def call_server_stream(self, service_name, method_name, timeout=None, **kwargs):
+        """
+        Gọi method server-streaming, trả về generator các response
+        
+        Chỉ retry khi lỗi xảy ra trước khi nhận được response đầu tiên,
+        tránh việc trả trùng dữ liệu cho caller. Các lần retry dùng chung deadline của cả call.
+        
+        Stream được tính vào số request đang chờ của instance và lỗi được ghi nhận cho outlier detection,
+        nhưng không được tính vào latency của method và không đi qua priority admission
+        (stream giữ slot quá lâu so với call unary).
+        
+        :param service_name: Tên service
+        :param method_name: Tên method
+        :param timeout: Deadline cho toàn bộ stream (giây)
+        :param kwargs: Các tham số cho method
+        :return: Generator các response message
+        """
+        if timeout is None:
+            timeout = self.default_stream_timeout
+        
+        if self.rate_limiters:
+            timeout = self._acquire_rate_limit(service_name, method_name, timeout)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        method_config = self._get_method_config(service_name, method_name, UNARY_STREAM)
+        request = self._get_request_class(method_config)(**kwargs)
+        
+        for attempt in range(self.max_retries):
+            received = False
+            target, stub = self._pick_stub(service_name)
+            response_stream = getattr(stub, method_name)(request, timeout=self._remaining(deadline))
+            self.call_stats.begin(target)
+            try:
+                for response in response_stream:
+                    received = True
+                    yield response
+                return
+            
+            except grpc.RpcError as e:
+                self._record_stream_failure(service_name, target, e)
+                if received or self._remaining(deadline) == 0 or not self._should_retry(e, attempt):
+                    raise
+            
+            finally:
+                # Hủy RPC nếu caller dừng đọc giữa chừng (no-op khi stream đã kết thúc)
+                response_stream.cancel()
+                self.call_stats.end(target)
+    
+    @staticmethod
+    def _remaining(deadline):
+        """Thời gian còn lại tới deadline (giây), None nếu không có deadline"""
+        return None if deadline is None else max(0, deadline - time.monotonic())
+    
+    def _record_stream_failure(self, service_name, target, error):
+        """Ghi nhận lỗi của stream cho outlier detection"""
+        detector = self.outlier_detector
+        if detector is not None:
+            detector.record_failure(service_name, target, error.code())
+    
+    def call_paginated(self, service_name, method_name, cursor_field="cursor",
+                       next_cursor_field="next_cursor", timeout=None, **kwargs):
+        """
+        Gọi method unary có phân trang theo cursor, trả về generator các trang
+        
+        Mỗi trang chỉ được request khi caller đọc tới, nên bộ nhớ sử dụng
+        bị giới hạn bởi kích thước một trang.
+        
+        :param service_name: Tên service
+        :param method_name: Tên method
+        :param cursor_field: Tên field cursor trong request
+        :param next_cursor_field: Tên field cursor kế tiếp trong response
+        :param timeout: Thời gian timeout cho mỗi trang (giây)
+        :param kwargs: Các tham số cho method (có thể gồm cursor bắt đầu)
+        :return: Generator các response message
+        """
+        cursor = kwargs.pop(cursor_field, "")
+        while True:
+            page = self.call(service_name, method_name, timeout=timeout,
+                             **{cursor_field: cursor}, **kwargs)
+            yield page
+            
+            cursor = getattr(page, next_cursor_field)
+            if not cursor:
+                return
+    
+    def call_stream(self, service_name, method_name, requests, timeout=None):
+        """
+        Gọi method client-streaming
+        
+        Giống call_server_stream: được tính vào số request đang chờ và outlier detection,
+        không tính vào latency của method và không qua priority admission.
+        
+        :param service_name: Tên service
+        :param method_name: Tên method
+        :param requests: Iterable các request (dict hoặc message)
+        :param timeout: Deadline cho toàn bộ stream (giây), dùng chung cho các lần retry
+        :return: Response message
+        """
+        if timeout is None:
+            timeout = self.default_stream_timeout
+        
+        if self.rate_limiters:
+            timeout = self._acquire_rate_limit(service_name, method_name, timeout)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        method_config = self._get_method_config(service_name, method_name, STREAM_UNARY)
+        request_class = self._get_request_class(method_config)
+        
+        # Iterator chỉ đọc được một lần nên chỉ retry khi requests là list/tuple
+        retries = self.max_retries if isinstance(requests, (list, tuple)) else 1
+        
+        for attempt in range(retries):
+            target, stub = self._pick_stub(service_name)
+            self.call_stats.begin(target)
+            try:
+                return getattr(stub, method_name)(
+                    (self._build_request(request_class, r) for r in requests),
+                    timeout=self._remaining(deadline)
+                )
+            
+            except grpc.RpcError as e:
+                self._record_stream_failure(service_name, target, e)
+                if (attempt >= retries - 1 or self._remaining(deadline) == 0
+                        or not self._should_retry(e, attempt)):
+                    raise
+            
+            finally:
+                self.call_stats.end(target)
+    
+    def call_bidi(self, service_name, method_name, requests, timeout=None):
+        """
+        Gọi method bidirectional-streaming, trả về generator các response
+        
+        Không retry vì không thể phát lại stream request một cách an toàn. Giống call_server_stream:
+        được tính vào số request đang chờ và outlier detection, không tính vào latency của method
+        và không qua priority admission.
+        
+        :param service_name: Tên service
+        :param method_name: Tên method
+        :param requests: Iterable các request (dict hoặc message)
+        :param timeout: Deadline cho toàn bộ stream (giây)
+        :return: Generator các response message
+        """
+        if timeout is None:
+            timeout = self.default_stream_timeout
+        
+        if self.rate_limiters:
+            timeout = self._acquire_rate_limit(service_name, method_name, timeout)
+        
+        target, stub = self._pick_stub(service_name)
+        method_config = self._get_method_config(service_name, method_name, STREAM_STREAM)
+        request_class = self._get_request_class(method_config)
+        
+        response_stream = getattr(stub, method_name)(
+            (self._build_request(request_class, r) for r in requests),
+            timeout=timeout
+        )
+        self.call_stats.begin(target)
+        try:
+            yield from response_stream
+        except grpc.RpcError as e:
+            self._record_stream_failure(service_name, target, e)
+            raise
+        finally:
+            response_stream.cancel()
+            self.call_stats.end(target)
 
 # Singleton instance
-service_gateway = ServiceGateway()
\ No newline at end of file
+service_gateway = ServiceGateway()
+
+# Process con của pre-fork server không được dùng lại channel của process cha
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=service_gateway._reset_after_fork)
\ No newline at end of file
@@ -5,47 +5,286 @@ import logging
 import os
 import time
 import threading
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import RedisClusterException
+from redis.retry import Retry
+
+from .registry_base import (
+    BaseServiceRegistry, UNARY_UNARY, UNARY_STREAM, STREAM_UNARY, STREAM_STREAM, METHOD_TYPES,
+    LOCALITY_LABELS, locality_from_env, read_file_mapped, write_file_atomic
+)
+from .records import ServiceRecord, InstanceRecord, json_default, snapshot_from_dict
 
 logger = logging.getLogger('capyface.service_registry')
 
-class RedisServiceRegistry:
+def _env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+class _LazyRedisCluster:
+    """
+    RedisCluster được tạo ở lần dùng đầu tiên thay vì khi khởi tạo registry
+    
+    Constructor của RedisCluster đọc topology của cluster, nên nếu tạo ngay thì import package
+    sẽ lỗi khi Redis không truy cập được. Lỗi tạo client được chuyển thành redis.ConnectionError
+    để registry phục vụ dữ liệu last-known-good như mọi lỗi Redis khác, và được thử lại ở lần dùng sau.
+    """
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+    
+    def _get_client(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        self._client = self._factory()
+                    except RedisClusterException as e:
+                        raise redis.ConnectionError(f"Redis Cluster unavailable: {e}") from e
+                client = self._client
+        return client
+    
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+class RedisServiceRegistry(BaseServiceRegistry):
     """Quản lý đăng ký các gRPC services sử dụng Redis"""
     
     _instance = None
+    _instance_lock = threading.Lock()
     
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
-            cls._instance = super(RedisServiceRegistry, cls).__new__(cls)
-            cls._instance._initialized = False
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(RedisServiceRegistry, cls).__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
     
-    def __init__(self, host=None, port=None, db=0, password=None):
+    def __init__(self, host=None, port=None, db=0, password=None, max_connections=None,
+                 socket_timeout=None, socket_connect_timeout=None, health_check_interval=30,
+                 retries=1, sentinels=None, sentinel_master=None, cluster=None,
+                 client_cache=None, unavailable_backoff=5, snapshot_path=None, snapshot_interval=60,
+                 revalidate_interval=None):
+        """
+        Args:
+            host, port, db, password: Kết nối Redis (mặc định REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD)
+            max_connections: Số connection tối đa của pool (REDIS_MAX_CONNECTIONS, mặc định 50);
+                khi hết connection, call chờ tối đa socket_timeout thay vì mở thêm
+            socket_timeout: Timeout đọc/ghi (giây) (REDIS_SOCKET_TIMEOUT, mặc định 1)
+            socket_connect_timeout: Timeout kết nối (giây) (REDIS_SOCKET_CONNECT_TIMEOUT, mặc định 1)
+            health_check_interval: Ping connection đã idle quá khoảng này (giây) trước khi dùng lại
+            retries: Số lần retry khi lỗi kết nối/timeout (exponential backoff)
+            sentinels: List (host, port) của Redis Sentinel, hoặc chuỗi "host:port,host:port" (REDIS_SENTINELS)
+            sentinel_master: Tên master trong Sentinel (REDIS_SENTINEL_MASTER, mặc định mymaster)
+            cluster: Dùng Redis Cluster (REDIS_CLUSTER)
+            client_cache: Bật client-side caching qua RESP3 tracking (REDIS_CLIENT_CACHE), cần Redis 6+
+            unavailable_backoff: Khi Redis lỗi, phục vụ cấu hình last-known-good trong khoảng này (giây)
+                trước khi thử lại Redis
+            snapshot_path: File lưu snapshot last-known-good trên disk (REGISTRY_SNAPSHOT_PATH);
+                nếu có, snapshot được nạp ngay khi khởi tạo và đồng bộ định kỳ trong background
+            snapshot_interval: Chu kỳ đồng bộ snapshot với Redis và ghi ra disk (giây)
+            revalidate_interval: Dữ liệu đọc lại khi generation không đổi được dùng tối đa khoảng này (giây)
+                trước khi đọc đầy đủ lại, để phát hiện instance hết TTL (REGISTRY_REVALIDATE_INTERVAL, mặc định 30)
+        """
         if self._initialized:
             return
+        
+        with self._instance_lock:
+            # Thread khác có thể đã khởi tạo xong trong lúc chờ lock
+            if self._initialized:
+                return
+            
+            # Đọc cấu hình từ biến môi trường nếu không được cung cấp
+            self.redis_host = host or os.environ.get('REDIS_HOST', 'localhost')
+            self.redis_port = port or int(os.environ.get('REDIS_PORT', 6379))
+            self.redis_db = db or int(os.environ.get('REDIS_DB', 0))
+            self.redis_password = password or os.environ.get('REDIS_PASSWORD', None)
+            
+            self.max_connections = max_connections or int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+            self.socket_timeout = socket_timeout or _env_float('REDIS_SOCKET_TIMEOUT', 1)
+            self.socket_connect_timeout = socket_connect_timeout or _env_float('REDIS_SOCKET_CONNECT_TIMEOUT', 1)
+            self.health_check_interval = health_check_interval
+            self.retries = retries
+            
+            sentinels = sentinels or os.environ.get('REDIS_SENTINELS')
+            if isinstance(sentinels, str):
+                sentinels = [
+                    (address.rsplit(':', 1)[0], int(address.rsplit(':', 1)[1]))
+                    for address in sentinels.split(',') if address.strip()
+                ]
+            self.sentinels = sentinels
+            self.sentinel_master = sentinel_master or os.environ.get('REDIS_SENTINEL_MASTER', 'mymaster')
+            self.cluster = _env_flag('REDIS_CLUSTER') if cluster is None else cluster
+            self.client_cache = _env_flag('REDIS_CLIENT_CACHE') if client_cache is None else client_cache
+            
+            # Khởi tạo Redis client
+            self.redis = self._create_client()
+            
+            # Cấu hình/instance đọc thành công gần nhất, dùng khi Redis không truy cập được
+            self.unavailable_backoff = unavailable_backoff
+            self._last_known_configs = {}
+            self._last_known_instances = {}
+            # Redis key -> (JSON thô, record), chỉ parse lại khi nội dung key thay đổi
+            self._parsed_records = {}
+            # service_name -> (generation, hạn revalidate, giá trị) cho cấu hình và danh sách instance;
+            # chỉ đọc lại khi generation tương ứng (cấu hình hoặc instance) của service thay đổi
+            self.revalidate_interval = revalidate_interval or _env_float('REGISTRY_REVALIDATE_INTERVAL', 30)
+            self._config_generations = {}
+            self._instance_generations = {}
+            self._exported = None
+            self._redis_retry_at = 0
+            # Bị clear khi đang phục vụ từ snapshot trên disk và chưa đồng bộ được với Redis
+            self._reconciled = threading.Event()
+            self._reconciled.set()
+            self.snapshot_path = snapshot_path or os.environ.get('REGISTRY_SNAPSHOT_PATH')
+            self.snapshot_interval = snapshot_interval
+            self._snapshot_sync = None
             
-        # Đọc cấu hình từ biến môi trường nếu không được cung cấp
-        self.redis_host = host or os.environ.get('REDIS_HOST', 'localhost')
-        self.redis_port = port or int(os.environ.get('REDIS_PORT', 6379))
-        self.redis_db = db or int(os.environ.get('REDIS_DB', 0))
-        self.redis_password = password or os.environ.get('REDIS_PASSWORD', None)
-        
-        # Khởi tạo Redis client
-        self.redis = redis.Redis(
+            # Key prefix cho các services
+            self.service_key_prefix = "capyface:service:"
+            # Key prefix cho từng instance và set index các instance của service
+            self.instance_key_prefix = "capyface:instance:"
+            self.instance_set_prefix = "capyface:instances:"
+            # Generation của từng service và version của toàn registry, tăng mỗi lần ghi;
+            # generation riêng cho cấu hình và cho instance để cập nhật tải không làm mất cache cấu hình
+            self.generation_key_prefix = "capyface:generation:"
+            self.config_generation_key_prefix = "capyface:config-generation:"
+            self.instances_generation_key_prefix = "capyface:instances-generation:"
+            self.registry_version_key = "capyface:registry:version"
+            self.service_ttl = 300  # 5 phút
+            # Snapshot registry trong shared memory (chia sẻ giữa các process của pre-fork server)
+            self.shared_snapshot = None
+            
+            self._initialized = True
+        logger.info(f"RedisServiceRegistry initialized with Redis at {self.redis_host}:{self.redis_port}")
+        
+        if self.snapshot_path:
+            self.load_snapshot()
+            self.start_snapshot_sync()
+    
+    def _create_client(self):
+        """Tạo Redis client (standalone, Sentinel hoặc Cluster) với pool, timeout và retry"""
+        connection_kwargs = {
+            "password": self.redis_password,
+            "socket_timeout": self.socket_timeout,
+            "socket_connect_timeout": self.socket_connect_timeout,
+            "socket_keepalive": True,
+            "health_check_interval": self.health_check_interval,
+            "retry": Retry(ExponentialBackoff(cap=1, base=0.05), self.retries),
+            "retry_on_error": [redis.ConnectionError, redis.TimeoutError],
+            "decode_responses": True,  # Tự động decode response thành string
+        }
+        if self.client_cache:
+            from redis.cache import CacheConfig
+            # Server gửi invalidation qua RESP3 push khi key đã cache bị thay đổi
+            connection_kwargs.update(protocol=3, cache_config=CacheConfig())
+        
+        if self.cluster:
+            from redis.cluster import RedisCluster
+            logger.info(f"Using Redis Cluster via {self.redis_host}:{self.redis_port}")
+            # Tạo khi dùng lần đầu: constructor kết nối tới cluster, không được làm lỗi lúc import
+            return _LazyRedisCluster(lambda: RedisCluster(
+                host=self.redis_host,
+                port=self.redis_port,
+                max_connections=self.max_connections,
+                **connection_kwargs
+            ))
+        
+        if self.sentinels:
+            from redis.sentinel import Sentinel
+            logger.info(f"Using Redis Sentinel master {self.sentinel_master} via {self.sentinels}")
+            sentinel = Sentinel(
+                self.sentinels,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_connect_timeout,
+            )
+            return sentinel.master_for(
+                self.sentinel_master,
+                db=self.redis_db,
+                max_connections=self.max_connections,
+                **connection_kwargs
+            )
+        
+        pool = redis.BlockingConnectionPool(
             host=self.redis_host,
             port=self.redis_port,
             db=self.redis_db,
-            password=self.redis_password,
-            decode_responses=True  # Tự động decode response thành string
+            max_connections=self.max_connections,
+            timeout=self.socket_timeout,  # Thời gian chờ connection rảnh khi pool đã đầy
+            **connection_kwargs
         )
+        return redis.Redis(connection_pool=pool)
+    
+    def _read_with_fallback(self, last_known, service_name, fetch):
+        """
+        Đọc từ Redis, nếu Redis lỗi thì trả về giá trị last-known-good
         
-        # Key prefix cho các services
-        self.service_key_prefix = "capyface:service:"
+        Sau một lần lỗi, các lần đọc trong unavailable_backoff giây dùng luôn last-known-good
+        để call của gateway không phải chờ timeout Redis mỗi lần. Khi vừa nạp snapshot từ disk,
+        last-known-good được dùng cho tới khi đồng bộ xong với Redis.
+        """
+        if service_name in last_known and (
+                not self._reconciled.is_set() or time.monotonic() < self._redis_retry_at):
+            return last_known[service_name]
         
-        self._initialized = True
-        logger.info(f"RedisServiceRegistry initialized with Redis at {self.redis_host}:{self.redis_port}")
+        try:
+            value = fetch(service_name)
+        except redis.RedisError as e:
+            if service_name not in last_known:
+                raise
+            self._redis_retry_at = time.monotonic() + self.unavailable_backoff
+            logger.warning(f"Redis unavailable, serving last-known-good registry data for {service_name}: {e}")
+            return last_known[service_name]
+        
+        if value:
+            last_known[service_name] = value
+        else:
+            last_known.pop(service_name, None)
+        return value
+    
+    def _bump_generation(self, pipe, service_name, config=False, instances=False):
+        """
+        Tăng generation của service, generation của phần thay đổi (cấu hình và/hoặc instance)
+        và version của registry trong cùng pipeline (MULTI/EXEC) với thao tác ghi
+        """
+        pipe.incr(f"{self.generation_key_prefix}{service_name}")
+        if config:
+            pipe.incr(f"{self.config_generation_key_prefix}{service_name}")
+        if instances:
+            pipe.incr(f"{self.instances_generation_key_prefix}{service_name}")
+        pipe.incr(self.registry_version_key)
+    
+    def _fetch_if_changed(self, cache, generation_key_prefix, service_name, fetch):
+        """
+        Đọc lại bằng fetch chỉ khi generation (theo generation_key_prefix) của service đã thay đổi
+        (hoặc quá revalidate_interval), ngược lại trả về giá trị đọc lần trước với chi phí một lệnh GET
+        
+        Service chưa có generation (đăng ký bởi client cũ) luôn được đọc lại.
+        """
+        generation = self.redis.get(f"{generation_key_prefix}{service_name}")
+        now = time.monotonic()
+        cached = cache.get(service_name)
+        if generation is not None and cached is not None and cached[0] == generation and now < cached[1]:
+            return cached[2]
+        
+        # Generation được đọc trước dữ liệu: thay đổi xảy ra trong lúc đọc sẽ được đọc lại ở lần sau
+        value = fetch(service_name)
+        if generation is not None:
+            cache[service_name] = (generation, now + self.revalidate_interval, value)
+        else:
+            cache.pop(service_name, None)
+        return value
     
     def register_service(self, service_name, host, port, use_tls=False,
-                       stub_module=None, stub_class=None, methods=None):
+                       stub_module=None, stub_class=None, methods=None, locality=None):
         """
         Đăng ký service với registry
         
@@ -57,27 +296,25 @@ class RedisServiceRegistry:
             stub_module: Module chứa gRPC stub
             stub_class: Tên class của stub
             methods: Dict chứa thông tin các methods
+            locality: Dict nhãn region/zone/node, mặc định đọc từ CAPYFACE_REGION/ZONE/NODE
         """
         # Tạo thông tin service
-        service_info = {
-            "host": host,
-            "port": port,
-            "use_tls": use_tls,
-            "stub_module": stub_module,
-            "stub_class": stub_class,
-            "methods": methods or {}
-        }
+        service_info = self._build_service_info(host, port, use_tls, stub_module, stub_class, methods, locality)
         
         # Lưu vào Redis với TTL (ví dụ: 5 phút)
-        self.redis.setex(
+        pipe = self.redis.pipeline()
+        pipe.setex(
             f"{self.service_key_prefix}{service_name}",
-            300,  # 5 phút (300 giây)
+            self.service_ttl,
             json.dumps(service_info)
         )
+        self._bump_generation(pipe, service_name, config=True)
+        pipe.execute()
         
         logger.info(f"Registered service: {service_name} at {host}:{port}")
     
-    def register_method(self, service_name, method_name, request_module, request_class):
+    def register_method(self, service_name, method_name, request_module, request_class,
+                        method_type=UNARY_UNARY):
         """
         Đăng ký method cho service
         
@@ -86,7 +323,10 @@ class RedisServiceRegistry:
             method_name: Tên method
             request_module: Module chứa request class
             request_class: Tên class của request
+            method_type: Kiểu RPC (unary_unary, unary_stream, stream_unary, stream_stream)
         """
+        method_info = self._build_method_info(request_module, request_class, method_type)
+        
         # Kiểm tra xem service có tồn tại không
         service_key = f"{self.service_key_prefix}{service_name}"
         service_info_json = self.redis.get(service_key)
@@ -103,49 +343,381 @@ class RedisServiceRegistry:
             service_info["methods"] = {}
         
         # Thêm method
-        service_info["methods"][method_name] = {
-            "request_module": request_module,
-            "request_class": request_class
-        }
+        service_info["methods"][method_name] = method_info
         
         # Cập nhật lại vào Redis
-        self.redis.setex(
+        pipe = self.redis.pipeline()
+        pipe.setex(
             service_key,
-            300,  # 5 phút TTL
+            self.service_ttl,
             json.dumps(service_info)
         )
+        self._bump_generation(pipe, service_name, config=True)
+        pipe.execute()
         
         logger.info(f"Registered method: {service_name}.{method_name}")
         return True
     
+    def _reset_after_fork(self):
+        """
+        Bỏ các connection Redis kế thừa từ process cha, gọi trong process con sau fork
+        (đăng ký qua os.register_at_fork). Connection mới được tạo lại khi cần.
+        """
+        connection_pool = getattr(self.redis, 'connection_pool', None)
+        if connection_pool is not None:
+            connection_pool.reset()
+        else:
+            # RedisCluster có pool riêng cho từng node
+            self.redis.disconnect_connection_pools()
+        
+        # Thread đồng bộ snapshot chỉ chạy ở process cha: N worker cùng quét Redis và ghi disk
+        # mỗi chu kỳ sẽ làm mất tác dụng của việc chia sẻ snapshot. Process con đọc Redis như bình thường
+        # (hoặc snapshot trong shared memory) và dùng snapshot đã nạp khi Redis lỗi.
+        sync = self._snapshot_sync
+        self._snapshot_sync = None
+        self._reconciled.set()
+        if sync is not None and sync[2]:
+            self.start_snapshot_sync(interval=sync[0], stop_event=sync[1], in_children=True)
+    
+    def load_snapshot(self, path=None):
+        """
+        Nạp snapshot last-known-good từ disk để phục vụ ngay khi khởi động (kể cả khi Redis lỗi)
+        
+        Args:
+            path: File snapshot, mặc định snapshot_path
+        
+        Returns:
+            True nếu nạp được snapshot
+        """
+        path = path or self.snapshot_path
+        try:
+            content, _ = read_file_mapped(path)
+            data = json.loads(content)
+        except FileNotFoundError:
+            logger.info(f"No registry snapshot at {path}")
+            return False
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading registry snapshot from {path}: {e}")
+            return False
+        
+        data = snapshot_from_dict(data)
+        self._last_known_configs = data["services"]
+        self._last_known_instances = {
+            service_name: instances for service_name, instances in data["instances"].items() if instances
+        }
+        self._reconciled.clear()
+        logger.info(f"Loaded registry snapshot with {len(self._last_known_configs)} services from {path}")
+        return True
+    
+    def save_snapshot(self, path=None, data=None):
+        """
+        Ghi snapshot ra disk (ghi file tạm rồi rename nên không bao giờ để lại file ghi dở)
+        
+        Args:
+            path: File snapshot, mặc định snapshot_path
+            data: Dữ liệu từ export_snapshot(), mặc định đọc lại từ Redis
+        """
+        path = path or self.snapshot_path
+        data = data if data is not None else self.export_snapshot()
+        write_file_atomic(path, json.dumps(data, separators=(',', ':'), default=json_default).encode())
+        logger.debug(f"Saved registry snapshot with {len(data['services'])} services to {path}")
+    
+    def reconcile(self):
+        """
+        Đọc lại toàn bộ registry từ Redis và thay thế last-known-good
+        
+        Returns:
+            Dữ liệu snapshot vừa đọc
+        """
+        data = self.export_snapshot()
+        self._last_known_configs = dict(data["services"])
+        self._last_known_instances = {
+            service_name: instances for service_name, instances in data["instances"].items() if instances
+        }
+        if not self._reconciled.is_set():
+            logger.info("Registry reconciled with Redis")
+            self._reconciled.set()
+        return data
+    
+    def start_snapshot_sync(self, interval=None, stop_event=None, in_children=False):
+        """
+        Bắt đầu thread đồng bộ với Redis và ghi snapshot ra disk định kỳ
+        
+        Args:
+            interval: Chu kỳ đồng bộ (giây), mặc định snapshot_interval
+            stop_event: threading.Event để dừng thread
+            in_children: Chạy lại thread (cùng interval và stop_event) trong mỗi process con sau fork;
+                mặc định chỉ process cha đồng bộ
+        """
+        interval = interval or self.snapshot_interval
+        stop_event = stop_event or threading.Event()
+        self._snapshot_sync = (interval, stop_event, in_children)
+        
+        def sync_worker():
+            while True:
+                try:
+                    self.save_snapshot(data=self.reconcile())
+                except Exception as e:
+                    logger.error(f"Error syncing registry snapshot: {e}")
+                if stop_event.wait(interval):
+                    break
+        
+        thread = threading.Thread(target=sync_worker, daemon=True)
+        thread.start()
+        logger.info(f"Started registry snapshot sync to {self.snapshot_path} with interval {interval}s")
+        return thread
+    
+    def use_shared_snapshot(self, snapshot):
+        """
+        Đọc cấu hình service và danh sách instance từ snapshot trong shared memory thay vì Redis
+        
+        Args:
+            snapshot: SharedRegistrySnapshot (None để tắt), nếu snapshot quá cũ hoặc không có
+                service cần tìm thì vẫn đọc từ Redis
+        """
+        self.shared_snapshot = snapshot
+    
+    def export_snapshot(self):
+        """
+        Đọc toàn bộ cấu hình service và instance từ Redis để publish vào snapshot
+        
+        Nếu version của registry không đổi từ lần export trước (và chưa quá revalidate_interval),
+        trả về lại kết quả lần trước thay vì đọc lại mọi service.
+        """
+        version = self.get_registry_version()
+        now = time.monotonic()
+        exported = self._exported
+        if version and exported is not None and exported[0] == version and now < exported[1]:
+            return exported[2]
+        
+        services = self.get_all_services()
+        data = {
+            "services": services,
+            "instances": {
+                service_name: self._fetch_instances(service_name) for service_name in services
+            },
+        }
+        self._exported = (version, now + self.revalidate_interval, data)
+        return data
+    
+    def get_generation(self, service_name):
+        """
+        Generation của service: tăng mỗi lần cấu hình hoặc danh sách instance của service thay đổi
+        
+        Returns:
+            Số nguyên, 0 nếu service chưa từng được ghi kể từ khi có generation
+        """
+        return int(self.redis.get(f"{self.generation_key_prefix}{service_name}") or 0)
+    
+    def get_generations(self, service_names):
+        """Generation của nhiều service trong một lệnh MGET, dạng dict service_name -> generation"""
+        service_names = list(service_names)
+        if not service_names:
+            return {}
+        mget = self.redis.mget_nonatomic if self.cluster else self.redis.mget
+        values = mget([f"{self.generation_key_prefix}{service_name}" for service_name in service_names])
+        return {service_name: int(value or 0) for service_name, value in zip(service_names, values)}
+    
+    def get_registry_version(self):
+        """Version của toàn registry: tăng mỗi lần bất kỳ service nào thay đổi"""
+        return int(self.redis.get(self.registry_version_key) or 0)
+    
     def get_service_config(self, service_name):
         """Lấy cấu hình của service"""
-        service_key = f"{self.service_key_prefix}{service_name}"
-        service_info_json = self.redis.get(service_key)
+        if self.shared_snapshot is not None:
+            config = self.shared_snapshot.get_service_config(service_name)
+            if config is not None:
+                return config
         
-        if not service_info_json:
-            logger.warning(f"Service {service_name} not found in registry")
+        return self._read_with_fallback(
+            self._last_known_configs, service_name,
+            lambda name: self._fetch_if_changed(
+                self._config_generations, self.config_generation_key_prefix, name, self._fetch_service_config
+            )
+        )
+    
+    def _parse_record(self, key, raw, record_class):
+        """
+        Chuyển JSON thô của key thành record, dùng lại record cũ nếu nội dung key không đổi
+        
+        Args:
+            key: Redis key
+            raw: Giá trị đọc được (None nếu key không tồn tại)
+            record_class: ServiceRecord hoặc InstanceRecord
+        """
+        if not raw:
+            self._parsed_records.pop(key, None)
             return None
         
-        return json.loads(service_info_json)
+        cached = self._parsed_records.get(key)
+        if cached is not None and cached[0] == raw:
+            return cached[1]
+        record = record_class.from_dict(json.loads(raw))
+        self._parsed_records[key] = (raw, record)
+        return record
+    
+    def _fetch_service_config(self, service_name):
+        """Đọc cấu hình (ServiceRecord) của service từ Redis"""
+        service_key = f"{self.service_key_prefix}{service_name}"
+        service_info = self._parse_record(service_key, self.redis.get(service_key), ServiceRecord)
+        
+        if service_info is None:
+            logger.warning(f"Service {service_name} not found in registry")
+        return service_info
     
     def get_all_services(self):
         """Lấy cấu hình của tất cả services"""
         # Lấy tất cả keys có prefix là service_key_prefix
-        service_keys = self.redis.keys(f"{self.service_key_prefix}*")
+        # SCAN thay cho KEYS để không block Redis server khi có nhiều key
+        service_keys = self.redis.scan_iter(match=f"{self.service_key_prefix}*", count=500)
         
         services = {}
         for key in service_keys:
             service_name = key.replace(self.service_key_prefix, '')
-            service_info = self.get_service_config(service_name)
+            service_info = self._fetch_service_config(service_name)
             if service_info:
                 services[service_name] = service_info
         
         return services
     
-    def heartbeat(self, service_name):
+    def register_instance(self, service_name, host, port, instance_id=None,
+                          use_tls=False, metadata=None, locality=None, unix_socket=None):
+        """
+        Đăng ký một instance (replica) của service
+        
+        Mỗi instance có key riêng với TTL riêng nên một replica dừng lại
+        không làm mất đăng ký của các replica khác.
+        
+        Args:
+            service_name: Tên service
+            host: Host của instance
+            port: Port của instance
+            instance_id: ID của instance, mặc định là host:port
+            use_tls: Có sử dụng TLS không
+            metadata: Dict thông tin bổ sung của instance
+            locality: Dict nhãn region/zone/node, mặc định đọc từ CAPYFACE_REGION/ZONE/NODE
+            unix_socket: Đường dẫn Unix domain socket instance cũng lắng nghe, client cùng node
+                sẽ kết nối qua socket này thay vì TCP
+        
+        Returns:
+            instance_id đã đăng ký
+        """
+        instance_id = instance_id or f"{host}:{port}"
+        instance_info = self._build_instance_info(
+            instance_id, host, port, use_tls, metadata, locality, unix_socket
+        )
+        
+        pipe = self.redis.pipeline()
+        pipe.setex(
+            f"{self.instance_key_prefix}{service_name}:{instance_id}",
+            self.service_ttl,
+            json.dumps(instance_info)
+        )
+        pipe.sadd(f"{self.instance_set_prefix}{service_name}", instance_id)
+        self._bump_generation(pipe, service_name, instances=True)
+        pipe.execute()
+        
+        logger.info(f"Registered instance {instance_id} of service {service_name}")
+        return instance_id
+    
+    def deregister_instance(self, service_name, instance_id):
+        """
+        Hủy đăng ký một instance của service (ví dụ khi shutdown)
+        
+        Args:
+            service_name: Tên service
+            instance_id: ID của instance
+        """
+        pipe = self.redis.pipeline()
+        pipe.delete(f"{self.instance_key_prefix}{service_name}:{instance_id}")
+        pipe.srem(f"{self.instance_set_prefix}{service_name}", instance_id)
+        self._bump_generation(pipe, service_name, instances=True)
+        pipe.execute()
+        
+        logger.info(f"Deregistered instance {instance_id} of service {service_name}")
+    
+    def update_instance_load(self, service_name, instance_id, load):
+        """
+        Cập nhật trạng thái tải của instance (ví dụ từ LoadSheddingInterceptor)
+        để ServiceGateway tránh các instance đang quá tải
+        
+        Args:
+            service_name: Tên service
+            instance_id: ID của instance
+            load: Dict trạng thái tải (limit, in_flight, utilization, shedding, ...)
+        """
+        instance_key = f"{self.instance_key_prefix}{service_name}:{instance_id}"
+        instance_info_json = self.redis.get(instance_key)
+        
+        if not instance_info_json:
+            logger.warning(f"Cannot update load - Instance {instance_id} of {service_name} not found in registry")
+            return False
+        
+        instance_info = json.loads(instance_info_json)
+        instance_info["load"] = dict(load, updated_at=time.time())
+        
+        # Giữ nguyên TTL, TTL chỉ được gia hạn bởi heartbeat; chỉ cache instance bị đọc lại, cấu hình thì không
+        pipe = self.redis.pipeline()
+        pipe.set(instance_key, json.dumps(instance_info), keepttl=True)
+        self._bump_generation(pipe, service_name, instances=True)
+        pipe.execute()
+        return True
+    
+    def get_instances(self, service_name):
+        """
+        Lấy danh sách các instance còn sống của service
+        
+        Các instance đã hết TTL được xóa khỏi set index.
+        """
+        if self.shared_snapshot is not None:
+            instances = self.shared_snapshot.get_instances(service_name)
+            if instances is not None:
+                return instances
+        
+        return self._read_with_fallback(
+            self._last_known_instances, service_name,
+            lambda name: self._fetch_if_changed(
+                self._instance_generations, self.instances_generation_key_prefix, name, self._fetch_instances
+            )
+        )
+    
+    def _fetch_instances(self, service_name):
+        """Đọc danh sách instance (InstanceRecord) của service từ Redis"""
+        set_key = f"{self.instance_set_prefix}{service_name}"
+        instance_ids = sorted(self.redis.smembers(set_key))
+        if not instance_ids:
+            return []
+        
+        # Các key instance có thể nằm ở nhiều slot khác nhau khi dùng Redis Cluster
+        mget = self.redis.mget_nonatomic if self.cluster else self.redis.mget
+        instance_keys = [f"{self.instance_key_prefix}{service_name}:{instance_id}" for instance_id in instance_ids]
+        values = mget(instance_keys)
+        
+        instances = []
+        expired = []
+        for instance_id, instance_key, value in zip(instance_ids, instance_keys, values):
+            instance = self._parse_record(instance_key, value, InstanceRecord)
+            if instance is not None:
+                instances.append(instance)
+            else:
+                expired.append(instance_id)
+        
+        if expired:
+            # Instance hết TTL không tự tăng generation, client phát hiện ra thì tăng cho các client khác
+            pipe = self.redis.pipeline()
+            pipe.srem(set_key, *expired)
+            self._bump_generation(pipe, service_name, instances=True)
+            pipe.execute()
+        
+        return instances
+    
+    def heartbeat(self, service_name, instance_id=None):
         """
         Cập nhật thời gian sống của service (heartbeat)
+        
+        Args:
+            service_name: Tên service
+            instance_id: Nếu có, cập nhật cả TTL của instance
         """
         service_key = f"{self.service_key_prefix}{service_name}"
         service_info_json = self.redis.get(service_key)
@@ -155,32 +727,19 @@ class RedisServiceRegistry:
             return False
         
         # Cập nhật TTL
-        self.redis.expire(service_key, 300)  # 5 phút
-        logger.debug(f"Heartbeat sent for service {service_name}")
-        return True
-    
-    def start_heartbeat(self, service_name, interval=60):
-        """
-        Bắt đầu gửi heartbeat định kỳ cho service
+        self.redis.expire(service_key, self.service_ttl)
         
-        Args:
-            service_name: Tên service cần gửi heartbeat
-            interval: Khoảng thời gian giữa các lần gửi heartbeat (giây)
-        """
-        def heartbeat_worker():
-            while True:
-                try:
-                    self.heartbeat(service_name)
-                    time.sleep(interval)
-                except Exception as e:
-                    logger.error(f"Error in heartbeat for {service_name}: {e}")
-                    time.sleep(5)  # Ngủ một chút khi có lỗi
+        if instance_id and not self.redis.expire(
+                f"{self.instance_key_prefix}{service_name}:{instance_id}", self.service_ttl):
+            logger.warning(f"Cannot send heartbeat - Instance {instance_id} of {service_name} not found in registry")
+            return False
         
-        # Khởi động thread
-        thread = threading.Thread(target=heartbeat_worker, daemon=True)
-        thread.start()
-        logger.info(f"Started heartbeat for {service_name} with interval {interval}s")
-        return thread
+        logger.debug(f"Heartbeat sent for service {service_name}")
+        return True
 
 # Singleton instance
-service_registry = RedisServiceRegistry()
\ No newline at end of file
+service_registry = RedisServiceRegistry()
+
+# Process con của pre-fork server không được dùng lại connection Redis của process cha
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=service_registry._reset_after_fork)
\ No newline at end of file
@@ -0,0 +1,133 @@
+import json
+import logging
+import mmap
+import struct
+import threading
+import time
+
+from .records import json_default, snapshot_from_dict
+
+logger = logging.getLogger('capyface.shared_snapshot')
+
+# Header: sequence number (uint64) + độ dài payload (uint32)
+_HEADER = struct.Struct('<QI')
+_SEQUENCE = struct.Struct('<Q')
+
+class SharedRegistrySnapshot:
+    """
+    Snapshot của registry (cấu hình service và danh sách instance) trong shared memory
+    
+    Dùng cho pre-fork server (gunicorn, Celery prefork): process master tạo snapshot
+    trước khi fork và refresh định kỳ từ Redis, các process con đọc trực tiếp từ vùng nhớ
+    anonymous mmap dùng chung thay vì mỗi process tự truy vấn Redis.
+    
+    Chỉ có một writer (master). Reader dùng seqlock: sequence lẻ nghĩa là đang ghi,
+    sequence thay đổi trong lúc đọc thì đọc lại. Payload được decode thành record một lần
+    và cache theo sequence nên lần đọc không có thay đổi chỉ tốn một lần unpack header.
+    """
+    
+    def __init__(self, size=4 * 1024 * 1024, max_age=30):
+        """
+        Args:
+            size: Dung lượng vùng nhớ (bytes), gồm cả header
+            max_age: Snapshot cũ hơn khoảng này (giây) bị bỏ qua, ví dụ khi master ngừng refresh
+        """
+        self.size = size
+        self.max_age = max_age
+        self._buffer = mmap.mmap(-1, size)
+        self._write_lock = threading.Lock()
+        self._cached_sequence = 0
+        self._cached_data = None
+    
+    def publish(self, data):
+        """
+        Ghi snapshot mới (chỉ gọi từ process master)
+        
+        Args:
+            data: Dict {"services": {...}, "instances": {...}}
+        """
+        payload = json.dumps({**data, "updated_at": time.time()}, default=json_default).encode()
+        if _HEADER.size + len(payload) > self.size:
+            logger.error(f"Registry snapshot of {len(payload)} bytes exceeds shared memory size {self.size}")
+            raise ValueError(f"Registry snapshot too large: {len(payload)} bytes")
+        
+        with self._write_lock:
+            sequence = _SEQUENCE.unpack_from(self._buffer, 0)[0]
+            # Sequence lẻ: reader biết đang có ghi và sẽ đọc lại
+            _SEQUENCE.pack_into(self._buffer, 0, sequence + 1)
+            self._buffer[_HEADER.size:_HEADER.size + len(payload)] = payload
+            _HEADER.pack_into(self._buffer, 0, sequence + 2, len(payload))
+    
+    def read(self, retries=100):
+        """
+        Đọc snapshot hiện tại
+        
+        Returns:
+            Dict snapshot, hoặc None nếu chưa publish, quá cũ hoặc không đọc được
+            một bản nhất quán sau số lần thử
+        """
+        for _ in range(retries):
+            sequence, length = _HEADER.unpack_from(self._buffer, 0)
+            if sequence == 0:
+                return None
+            if sequence & 1:
+                time.sleep(0)
+                continue
+            
+            if sequence == self._cached_sequence:
+                data = self._cached_data
+            else:
+                payload = self._buffer[_HEADER.size:_HEADER.size + length]
+                if _SEQUENCE.unpack_from(self._buffer, 0)[0] != sequence:
+                    continue
+                data = json.loads(payload)
+                data = dict(snapshot_from_dict(data), updated_at=data["updated_at"])
+                self._cached_sequence, self._cached_data = sequence, data
+            
+            if time.time() - data["updated_at"] > self.max_age:
+                return None
+            return data
+        
+        logger.warning("Could not read a consistent registry snapshot")
+        return None
+    
+    def get_service_config(self, service_name):
+        """Cấu hình service trong snapshot, None nếu không có"""
+        data = self.read()
+        return data["services"].get(service_name) if data else None
+    
+    def get_instances(self, service_name):
+        """Danh sách instance của service trong snapshot, None nếu không có"""
+        data = self.read()
+        return data["instances"].get(service_name) if data else None
+    
+    def refresh(self, registry):
+        """Đọc lại toàn bộ registry từ Redis và publish"""
+        self.publish(registry.export_snapshot())
+    
+    def start_refresher(self, registry, interval=5, stop_event=None):
+        """
+        Bắt đầu thread refresh snapshot định kỳ trong process master
+        
+        Thread không tồn tại trong process con sau fork nên chỉ master ghi snapshot.
+        
+        Args:
+            registry: RedisServiceRegistry để đọc dữ liệu
+            interval: Khoảng thời gian giữa các lần refresh (giây)
+            stop_event: threading.Event để dừng thread
+        """
+        stop_event = stop_event or threading.Event()
+        
+        def refresh_worker():
+            while True:
+                try:
+                    self.refresh(registry)
+                except Exception as e:
+                    logger.error(f"Error refreshing registry snapshot: {e}")
+                if stop_event.wait(interval):
+                    break
+        
+        thread = threading.Thread(target=refresh_worker, daemon=True)
+        thread.start()
+        logger.info(f"Started registry snapshot refresher with interval {interval}s")
+        return thread
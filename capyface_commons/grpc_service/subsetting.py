@@ -0,0 +1,59 @@
+import hashlib
+import socket
+
+from .registry_base import locality_from_env
+
+class RendezvousSubsetter:
+    """
+    Chọn một tập con cố định gồm subset_size instance của mỗi service cho client (subsetting)
+    
+    Dùng rendezvous hashing: mỗi instance có điểm hash(client_id, service, instance_id),
+    client giữ subset_size instance có điểm cao nhất. Subset không đổi giữa các lần refresh,
+    và khi một instance tham gia/rời đi chỉ có client chứa instance đó trong subset bị thay đổi
+    một phần tử. Với nhiều client, số connection tới mỗi instance xấp xỉ
+    số client × subset_size / số instance.
+    
+    Nếu biết zone của client, instance cùng zone được chọn trước để zone-aware routing
+    vẫn có instance local trong subset.
+    """
+    
+    def __init__(self, subset_size, client_id=None, locality=None):
+        """
+        Args:
+            subset_size: Số instance tối đa mỗi service
+            client_id: ID ổn định của client, mặc định là hostname (tên pod)
+            locality: Dict nhãn region/zone của client, mặc định đọc từ CAPYFACE_REGION/ZONE
+        """
+        if subset_size < 1:
+            raise ValueError(f"Invalid subset size: {subset_size}")
+        self.subset_size = subset_size
+        self.client_id = client_id or socket.gethostname()
+        self.locality = locality_from_env() if locality is None else locality
+    
+    def _score(self, service_name, instance):
+        digest = hashlib.blake2b(
+            f"{self.client_id}/{service_name}/{instance.instance_id}".encode(), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, 'big')
+    
+    def select(self, service_name, instances):
+        """
+        Args:
+            service_name: Tên service
+            instances: List các InstanceRecord từ registry
+        
+        Returns:
+            List tối đa subset_size instance, giữ thứ tự của instances
+        """
+        if len(instances) <= self.subset_size:
+            return instances
+        
+        zone = self.locality.get("zone")
+        ranked = sorted(
+            range(len(instances)),
+            key=lambda index: (
+                zone is not None and instances[index].locality.get("zone") != zone,
+                -self._score(service_name, instances[index]),
+            )
+        )
+        return [instances[index] for index in sorted(ranked[:self.subset_size])]
@@ -0,0 +1,334 @@
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent import futures
+
+import grpc
+
+logger = logging.getLogger('capyface.token_cache')
+
+try:
+    import jwt
+except ImportError:  # PyJWT là optional dependency, chỉ cần cho fast path
+    jwt = None
+
+USER_SERVICE = "user_service"
+REVOCATION_CHANNEL = "capyface:token:revoked"
+
+class TokenValidationTimeout(grpc.RpcError):
+    """Hết timeout khi đang chờ RPC ValidateToken của request khác cho cùng token, code DEADLINE_EXCEEDED"""
+    
+    def code(self):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+    
+    def details(self):
+        return str(self)
+
+def _token_expiry(token):
+    """
+    Đọc claim exp (epoch giây) của JWT mà không verify chữ ký, chỉ dùng để giới hạn TTL cache
+    
+    Returns:
+        exp hoặc None nếu token không phải JWT hoặc không có exp
+    """
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def _default_claims_to_user(claims):
+    return {
+        "id": str(claims.get("user_id") or claims.get("sub") or ""),
+        "username": claims.get("username", ""),
+        "email": claims.get("email", ""),
+    }
+
+class TokenValidationCache:
+    """
+    Cache phía client cho UserService.ValidateToken
+    
+    - Key là SHA-256 của token (không giữ token gốc trong bộ nhớ).
+    - Kết quả hợp lệ được cache tối đa ttl giây và không quá claim exp của token;
+      kết quả không hợp lệ được cache negative_ttl giây. Giới hạn max_size theo LRU.
+    - Nhiều request đồng thời với cùng token chỉ tạo một RPC.
+    - Thu hồi token/user (logout, đổi mật khẩu) được publish qua Redis pub/sub tới mọi process.
+      Khi mất kết nối pub/sub, toàn bộ cache bị xóa vì có thể đã bỏ lỡ thông báo thu hồi.
+    - Fast path (tùy chọn, cần PyJWT): nếu có jwt_key, token được verify chữ ký tại chỗ
+      và không cần gọi RPC; user được dựng từ claims.
+    
+    Response trả về được chia sẻ giữa các lần gọi, không được sửa.
+    """
+    
+    def __init__(self, gateway=None, max_size=10000, ttl=60, negative_ttl=5,
+                 service_name=USER_SERVICE, redis_client=None, revocation_channel=REVOCATION_CHANNEL,
+                 jwt_key=None, jwt_algorithms=("HS256",), claims_to_user=None,
+                 revocation_retention=24 * 3600):
+        """
+        Args:
+            gateway: ServiceGateway, mặc định là singleton service_gateway
+            max_size: Số token tối đa trong cache
+            ttl: Thời gian cache tối đa của kết quả hợp lệ (giây)
+            negative_ttl: Thời gian cache của kết quả không hợp lệ (giây), 0 để không cache
+            service_name: Tên service có method ValidateToken
+            redis_client: Redis client cho pub/sub thu hồi, mặc định dùng client của service_registry
+            revocation_channel: Tên channel pub/sub
+            jwt_key: Secret/public key để verify JWT tại chỗ (bật fast path)
+            jwt_algorithms: Các thuật toán JWT được chấp nhận
+            claims_to_user: Hàm chuyển JWT claims thành dict các field của User
+            revocation_retention: Thời gian giữ thông tin thu hồi theo user cho fast path (giây)
+        """
+        if gateway is None:
+            from .service_gateway import service_gateway
+            gateway = service_gateway
+        if jwt_key is not None and jwt is None:
+            logger.warning("PyJWT is not installed, local JWT validation fast path is disabled")
+            jwt_key = None
+        
+        self.gateway = gateway
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.service_name = service_name
+        self.redis_client = redis_client
+        self.revocation_channel = revocation_channel
+        self.jwt_key = jwt_key
+        self.jwt_algorithms = list(jwt_algorithms)
+        self.claims_to_user = claims_to_user or _default_claims_to_user
+        self.revocation_retention = revocation_retention
+        
+        # token_hash -> (expires_at, user_id, response)
+        self._entries = OrderedDict()
+        # Request đang chờ RPC: token_hash -> Future
+        self._pending = {}
+        # Thu hồi cho fast path: token_hash -> hạn (epoch), user_id -> thời điểm thu hồi (epoch)
+        self._revoked_tokens = {}
+        self._revoked_users = {}
+        # Thời điểm (epoch) toàn bộ cache bị xóa lần cuối
+        self._cleared_at = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def _get_redis(self):
+        if self.redis_client is None:
+            from .service_registry import service_registry
+            self.redis_client = service_registry.redis
+        return self.redis_client
+    
+    def validate(self, token, timeout=None):
+        """
+        Validate token, dùng cache/fast path nếu có thể
+        
+        Args:
+            token: Access token
+            timeout: Timeout của RPC ValidateToken (giây), cũng là thời gian tối đa chờ RPC của request
+                khác đang validate cùng token
+        
+        Returns:
+            ValidateTokenResponse
+        
+        Raises:
+            TokenValidationTimeout: Hết timeout khi đang chờ RPC của request khác cho cùng token
+        """
+        token_hash = self.hash_token(token)
+        
+        if self.jwt_key is not None:
+            response = self._validate_locally(token, token_hash)
+            if response is not None:
+                return response
+        
+        now = time.monotonic()
+        if timeout is None:
+            timeout = self.gateway._get_default_timeout(self.service_name, "ValidateToken")
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(token_hash)
+                self.hits += 1
+                return entry[2]
+            
+            self.misses += 1
+            future = self._pending.get(token_hash)
+            leader = future is None
+            if leader:
+                future = self._pending[token_hash] = futures.Future()
+        
+        if not leader:
+            try:
+                return future.result(timeout=max(0, now + timeout - time.monotonic()))
+            except futures.TimeoutError:
+                raise TokenValidationTimeout(
+                    f"Timed out after {timeout}s waiting for ValidateToken of another request"
+                ) from None
+        
+        # Thu hồi xảy ra trong lúc RPC đang chạy không được bị kết quả cũ ghi đè
+        started = time.time()
+        try:
+            response = self.gateway.call(self.service_name, "ValidateToken", timeout=timeout, token=token)
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(token_hash, None)
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            self._pending.pop(token_hash, None)
+            self._store(token_hash, token, response, started)
+        future.set_result(response)
+        return response
+    
+    def _store(self, token_hash, token, response, started):
+        """
+        Lưu kết quả vào cache (gọi khi đang giữ lock)
+        
+        Kết quả hợp lệ không được lưu nếu token đã bị thu hồi, hoặc user/toàn bộ cache bị thu hồi
+        từ lúc bắt đầu RPC (started, epoch): response có thể được tạo trước thời điểm thu hồi.
+        """
+        if response.is_valid:
+            if (token_hash in self._revoked_tokens or self._cleared_at >= started
+                    or self._revoked_users.get(response.user.id, 0) >= started):
+                return
+            ttl = self.ttl
+            expiry = _token_expiry(token)
+            if expiry is not None:
+                ttl = min(ttl, expiry - time.time())
+        else:
+            ttl = self.negative_ttl
+        if ttl <= 0:
+            return
+        
+        user_id = response.user.id if response.is_valid else None
+        self._entries[token_hash] = (time.monotonic() + ttl, user_id, response)
+        self._entries.move_to_end(token_hash)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def _validate_locally(self, token, token_hash):
+        """
+        Verify JWT tại chỗ
+        
+        Returns:
+            ValidateTokenResponse, hoặc None nếu token không phải JWT hợp lệ với key, hoặc user đã bị
+            thu hồi mà không xác định được token được cấp trước hay sau đó (khi đó vẫn hỏi user-service)
+        """
+        from capyface_commons.generated import user_service_pb2
+        
+        try:
+            claims = jwt.decode(token, self.jwt_key, algorithms=self.jwt_algorithms)
+        except jwt.ExpiredSignatureError:
+            return user_service_pb2.ValidateTokenResponse(is_valid=False)
+        except jwt.InvalidTokenError:
+            return None
+        
+        if token_hash in self._revoked_tokens:
+            return user_service_pb2.ValidateTokenResponse(is_valid=False)
+        user = self.claims_to_user(claims)
+        revoked_at = self._revoked_users.get(user["id"])
+        if revoked_at is not None:
+            issued_at = claims.get("iat")
+            # iat tính theo giây nguyên: token không có iat hoặc được cấp trong cùng giây với
+            # thời điểm thu hồi có thể là token mới (đăng nhập lại), để user-service quyết định
+            if issued_at is None or int(issued_at) == int(revoked_at):
+                return None
+            if issued_at < revoked_at:
+                return user_service_pb2.ValidateTokenResponse(is_valid=False)
+        
+        with self._lock:
+            self.hits += 1
+        return user_service_pb2.ValidateTokenResponse(is_valid=True, user=user_service_pb2.User(**user))
+    
+    def invalidate(self, token_hash=None, user_id=None):
+        """
+        Xóa cache local theo token hash, theo user, hoặc toàn bộ nếu không truyền gì
+        (gọi bởi listener khi nhận thông báo thu hồi)
+        """
+        now = time.time()
+        with self._lock:
+            if token_hash is None and user_id is None:
+                self._entries.clear()
+                self._cleared_at = now
+                return
+            
+            if token_hash is not None:
+                self._entries.pop(token_hash, None)
+                self._revoked_tokens[token_hash] = now + self.revocation_retention
+            if user_id is not None:
+                for key in [key for key, entry in self._entries.items() if entry[1] == user_id]:
+                    del self._entries[key]
+                self._revoked_users[user_id] = now
+            
+            # Dọn thông tin thu hồi đã hết hạn
+            self._revoked_tokens = {
+                key: expires_at for key, expires_at in self._revoked_tokens.items() if expires_at > now
+            }
+            self._revoked_users = {
+                key: revoked_at for key, revoked_at in self._revoked_users.items()
+                if revoked_at + self.revocation_retention > now
+            }
+    
+    def revoke_token(self, token):
+        """Thu hồi một token (ví dụ khi logout) trên mọi process qua pub/sub"""
+        token_hash = self.hash_token(token)
+        self.invalidate(token_hash=token_hash)
+        self._get_redis().publish(self.revocation_channel, json.dumps({"token_hash": token_hash}))
+    
+    def revoke_user(self, user_id):
+        """Thu hồi mọi token của user (ví dụ khi đổi mật khẩu) trên mọi process qua pub/sub"""
+        self.invalidate(user_id=str(user_id))
+        self._get_redis().publish(self.revocation_channel, json.dumps({"user_id": str(user_id)}))
+    
+    def _handle_message(self, message):
+        if message.get("type") != "message":
+            return
+        try:
+            data = json.loads(message["data"])
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid token revocation message: {message['data']!r}")
+            return
+        self.invalidate(token_hash=data.get("token_hash"), user_id=data.get("user_id"))
+    
+    def start_revocation_listener(self, stop_event=None):
+        """
+        Bắt đầu thread nghe thông báo thu hồi token qua Redis pub/sub
+        
+        Args:
+            stop_event: threading.Event để dừng thread
+        """
+        stop_event = stop_event or threading.Event()
+        
+        def listener_worker():
+            while not stop_event.is_set():
+                pubsub = self._get_redis().pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(self.revocation_channel)
+                    # Có thể đã bỏ lỡ thông báo trong lúc chưa subscribe
+                    self.invalidate()
+                    while not stop_event.is_set():
+                        message = pubsub.get_message(timeout=1.0)
+                        if message:
+                            self._handle_message(message)
+                except Exception as e:
+                    logger.error(f"Token revocation listener error: {e}")
+                    self.invalidate()
+                    stop_event.wait(1)
+                finally:
+                    pubsub.close()
+        
+        thread = threading.Thread(target=listener_worker, daemon=True)
+        thread.start()
+        logger.info(f"Started token revocation listener on {self.revocation_channel}")
+        return thread
+    
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
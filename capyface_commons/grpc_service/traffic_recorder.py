@@ -0,0 +1,182 @@
+import logging
+import os
+import random
+import struct
+import threading
+import time
+
+import grpc
+
+logger = logging.getLogger('capyface.traffic_recorder')
+
+# Header: magic, version, thời điểm bắt đầu ghi (epoch giây), sample rate
+MAGIC = b"CAPYREC"
+VERSION = 1
+_HEADER = struct.Struct('<7sBdd')
+# Mỗi record: độ dài body (uint32) rồi body gồm offset so với lúc bắt đầu ghi (giây), latency (micro giây),
+# status code, độ dài tên service, tên method và request đã serialize, sau đó là các phần đó
+_LENGTH = struct.Struct('<I')
+_RECORD = struct.Struct('<dIBHHI')
+
+_STATUS_CODES = {code.value[0]: code for code in grpc.StatusCode}
+
+class TrafficRecord:
+    """Một call đã ghi lại"""
+    __slots__ = ('offset', 'service_name', 'method_name', 'payload', 'latency', 'code')
+    
+    def __init__(self, offset, service_name, method_name, payload, latency, code=grpc.StatusCode.OK):
+        self.offset = offset
+        self.service_name = service_name
+        self.method_name = method_name
+        self.payload = payload
+        self.latency = latency
+        self.code = code
+    
+    @property
+    def name(self):
+        return f"{self.service_name}.{self.method_name}"
+
+class TrafficRecorder:
+    """
+    Ghi mẫu các call unary của ServiceGateway (service, method, request đã serialize, latency, status)
+    ra file log nhị phân length-prefixed để replay bằng capyface-bench replay
+    
+    Chỉ call được chọn mẫu mới bị serialize và ghi; ghi qua buffer của file dưới lock.
+    Mỗi call được ghi một lần (latency và status của cả call, gồm các lần retry).
+    File log chứa request nguyên vẹn (ví dụ token của ValidateToken) nên chỉ owner đọc/ghi được (0600).
+    """
+    
+    def __init__(self, path, sample_rate=0.01, max_bytes=1024 * 1024 * 1024):
+        """
+        Args:
+            path: File log (ghi đè nếu đã tồn tại)
+            sample_rate: Tỉ lệ call được ghi (0-1)
+            max_bytes: Dừng ghi khi file đạt kích thước này, None để không giới hạn
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f"Invalid sample rate: {sample_rate}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.recorded = 0
+        self.bytes_written = _HEADER.size
+        self._started = time.monotonic()
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        if hasattr(os, 'fchmod'):
+            # File đã tồn tại giữ nguyên quyền cũ khi mở với O_CREAT
+            os.fchmod(fd, 0o600)
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, time.time(), sample_rate))
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def record(self, service_name, method_name, request, latency, code=grpc.StatusCode.OK):
+        """
+        Ghi call nếu được chọn mẫu
+        
+        Args:
+            service_name: Tên service
+            method_name: Tên method
+            request: Request message hoặc bytes đã serialize
+            latency: Latency của call (giây)
+            code: grpc.StatusCode kết quả của call
+        """
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        offset = time.monotonic() - self._started
+        payload = request if isinstance(request, bytes) else request.SerializeToString()
+        service = service_name.encode()
+        method = method_name.encode()
+        body_length = _RECORD.size + len(service) + len(method) + len(payload)
+        frame = b"".join((
+            _LENGTH.pack(body_length),
+            _RECORD.pack(offset, min(int(latency * 1_000_000), 0xFFFFFFFF), code.value[0],
+                         len(service), len(method), len(payload)),
+            service, method, payload,
+        ))
+        
+        with self._lock:
+            if self._closed:
+                return
+            if self.max_bytes is not None and self.bytes_written + len(frame) > self.max_bytes:
+                logger.warning(f"Traffic log {self.path} reached {self.max_bytes} bytes, recording stopped")
+                self._close()
+                return
+            self._file.write(frame)
+            self.bytes_written += len(frame)
+            self.recorded += 1
+    
+    def _close(self):
+        self._closed = True
+        self._file.close()
+    
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._close()
+                logger.info(f"Recorded {self.recorded} calls ({self.bytes_written} bytes) to {self.path}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+class TrafficLogReader:
+    """
+    Đọc file log của TrafficRecorder
+        
+        with TrafficLogReader("traffic.log") as log:
+            for record in log:
+                ...
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        header = self._file.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            self._file.close()
+            raise ValueError(f"Not a traffic log: {path}")
+        _, version, self.started_at, self.sample_rate = _HEADER.unpack(header)
+        if version > VERSION:
+            self._file.close()
+            raise ValueError(f"Unsupported traffic log version {version}: {path}")
+    
+    def __iter__(self):
+        read = self._file.read
+        while True:
+            length = read(_LENGTH.size)
+            if len(length) < _LENGTH.size:
+                return
+            body = read(_LENGTH.unpack(length)[0])
+            if len(body) < _RECORD.size:
+                # Record cuối bị ghi dở (process bị dừng giữa chừng)
+                logger.warning(f"Truncated record at end of {self.path}")
+                return
+            offset, latency, code, service_length, method_length, payload_length = _RECORD.unpack_from(body)
+            start = _RECORD.size
+            service_end = start + service_length
+            method_end = service_end + method_length
+            if len(body) < method_end + payload_length:
+                logger.warning(f"Truncated record at end of {self.path}")
+                return
+            yield TrafficRecord(
+                offset,
+                body[start:service_end].decode(),
+                body[service_end:method_end].decode(),
+                body[method_end:method_end + payload_length],
+                latency / 1_000_000,
+                _STATUS_CODES.get(code, grpc.StatusCode.UNKNOWN),
+            )
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
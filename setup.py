@@ -15,6 +15,29 @@ setup(
         "protobuf>=5.26.1",
         "redis>=5.2.0",
     ],
+    extras_require={
+        "server": [
+            "grpcio-health-checking>=1.71.0",
+            "grpcio-reflection>=1.71.0",
+        ],
+        "auth": [
+            "PyJWT>=2.0",
+        ],
+        "yaml": [
+            "PyYAML>=5.1",
+        ],
+        "bench": [
+            "pytest>=7.0",
+            "pytest-benchmark>=4.0",
+            "fakeredis>=2.20",
+            "PyYAML>=5.1",
+        ],
+    },
+    entry_points={
+        "console_scripts": [
+            "capyface-bench=capyface_commons.bench.cli:main",
+        ],
+    },
     author="CapyFace Team",
     author_email="sang080304@gmail.com",
     description="Shared utilities for CapyFace microservices",